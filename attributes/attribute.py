@@ -5,9 +5,11 @@ used to calculate character growth and affect outcomes, such as dealing more
 damage, making an athletics check to vault over a wall, etc.
 """
 from modifier_handler import ModifierHandler
+from observer import Observable
 from observer_constants import NotifyType
+from threshold import ThresholdSet
 from evennia.utils.utils import lazy_property
-from save_wrapper import save_attr
+from save_wrapper import batch, save_attr
 
 
 class AttributeException(Exception):
@@ -16,7 +18,7 @@ class AttributeException(Exception):
         self.msg = msg
 
 
-class Attribute(object):
+class Attribute(Observable):
     """
     Properties:
     name (string) - name of the attribute
@@ -26,13 +28,35 @@ class Attribute(object):
     modifiers (ModifierHandler) - stores all the modifiers
     attrobj (Attribute objref) - Evennia database attribute direct object
                                  reference, used to save changes to the handler
+    cache_hits (int) - number of cur_val reads served from the cache
+    cache_misses (int) - number of cur_val reads that had to be recalculated
+
+    cur_val is cached, and the cache is only invalidated when the base, the
+    bounds or the modifiers of the attribute change. Watchers registered with
+    add_watcher are called with the attribute on every such change.
+
+    Subscribers, see observer.py, are notified of the changes once per tick.
+    Threshold triggers, see threshold.py, fire as soon as cur_val crosses
+    their level.
     """
+    # per-process state that is never compared or persisted
+    _TRANSIENT = ('_cached_cur_val', '_dirty', 'cache_hits', 'cache_misses',
+                  '_watchers', '_parent', '_subscribers', '_published',
+                  '_thresholds')
+
     def __init__(self, attrobj, **kwargs):
+        self._reset_cache()
+        self._watchers = []
+        self._parent = None
+        self._subscribers = []
+        self._published = None
+        self._thresholds = None
         self._name = kwargs.get('name')
         self._base = kwargs.get('base')
-        self.min = kwargs.get('min')
-        self.max = kwargs.get('max')
-        self.modifiers = ModifierHandler(kwargs.get('modifiers', []))
+        self._min = kwargs.get('min')
+        self._max = kwargs.get('max')
+        self.modifiers = ModifierHandler(kwargs.get('modifiers', []),
+                                         owner=self)
         self.attrobj = attrobj
 
     @property
@@ -41,9 +65,17 @@ class Attribute(object):
 
     @property
     def cur_val(self):
+        # drops expired modifiers, which invalidates the cache
+        self.modifiers._check_expiry()
+        if not self._dirty:
+            self.cache_hits += 1
+            return self._cached_cur_val
+        self.cache_misses += 1
         mod_val = self._get_modified_val()
-        cur_val = self.base + mod_val
-        return self._check_bounds(cur_val)
+        cur_val = self._check_bounds(self.base + mod_val)
+        self._cached_cur_val = cur_val
+        self._dirty = False
+        return cur_val
 
     @property
     def base(self):
@@ -53,6 +85,119 @@ class Attribute(object):
     def base(self, new_val):
         new_val = self._check_bounds(new_val)
         self._base = new_val
+        self._invalidate()
+
+    @property
+    def min(self):
+        return self._min
+
+    @min.setter
+    def min(self, new_val):
+        self._min = new_val
+        self._invalidate()
+
+    @property
+    def max(self):
+        return self._max
+
+    @max.setter
+    def max(self, new_val):
+        self._max = new_val
+        self._invalidate()
+
+    def _reset_cache(self):
+        """Drop the cached cur_val and zero the cache counters.
+
+        Arguments: None
+
+        Returns: None
+        """
+        self._cached_cur_val = None
+        self._dirty = True
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def _invalidate(self):
+        """Mark the cached cur_val as stale.
+
+        Called whenever the base, bounds or modifiers change.
+
+        Arguments: None
+
+        Returns: None
+        """
+        self._dirty = True
+        for watcher in list(self._watchers):
+            watcher(self)
+        if self._thresholds is not None:
+            self._thresholds.update(self.cur_val)
+        self._publish_change()
+
+    def add_threshold(self, level, callback, direction):
+        """Register a callable to be called when cur_val crosses a level.
+
+        Thresholds are not persisted and must be registered again after a
+        reload.
+
+        Example:
+        attr.add_threshold(80, exhausted, Crossing.RISING)
+
+        Arguments:
+        level (number) - level to watch
+        callback (callable) - called with the attribute, the level, the old
+                              cur_val and the new cur_val
+        direction (Crossing) - FALLING or RISING
+
+        Returns: None
+        """
+        if self._thresholds is None:
+            self._thresholds = ThresholdSet(self, self.cur_val)
+        self._thresholds.add(level, callback, direction)
+
+    def remove_threshold(self, level, callback):
+        """Unregister a callable previously passed to add_threshold.
+
+        Arguments:
+        level (number) - watched level
+        callback (callable) - registered callback
+
+        Returns: None
+        """
+        if self._thresholds is None:
+            raise ValueError("{} has no threshold at {}".format(callback,
+                                                                level))
+        self._thresholds.remove(level, callback)
+
+    def _observed_values(self):
+        return {
+                NotifyType.CUR_VAL: self.cur_val,
+                NotifyType.BASE: self.base,
+                NotifyType.MIN: self.min,
+                NotifyType.MAX: self.max
+        }
+
+    def add_watcher(self, watcher):
+        """Register a callable to be called whenever the attribute changes.
+
+        Watchers are not persisted and must be registered again after a
+        reload.
+
+        Arguments:
+        watcher (callable) - called with the attribute as its only argument
+
+        Returns: None
+        """
+        self._watchers.append(watcher)
+
+    def remove_watcher(self, watcher):
+        """Unregister a callable previously passed to add_watcher.
+
+        Arguments:
+        watcher (callable) - watcher to remove
+
+        Returns: None
+        """
+        self._watchers.remove(watcher)
 
     def _get_modified_val(self):
         """Get the sum of the modifiers on the attribute.
@@ -61,7 +206,7 @@ class Attribute(object):
 
         Returns: Number
         """
-        return self.modifiers.get_modified_val(self.base)
+        return self.modifiers.get_modified_val(self.base) - self.base
 
     def _check_bounds(self, val):
         """Check if the value exceeds the ceiling or floor of attribute value.
@@ -113,6 +258,42 @@ class Attribute(object):
         """
         self.modifiers.remove(modifier)
 
+    def batch(self):
+        """Coalesce every save made within the block into one save.
+
+        If the block raises, the attribute is rolled back instead.
+
+        Example:
+        with attr.batch():
+            attr.add_mod(desc="war cry", val=2, operator="+")
+            attr.add_mod(desc="bless", val=2, operator="*")
+
+        Arguments: None
+
+        Returns: contextmanager
+        """
+        return batch(self)
+
+    def _snapshot(self):
+        return self.serialize()
+
+    def _rollback(self, snapshot):
+        """Restore the attribute in place to a serialized snapshot.
+
+        Arguments:
+        snapshot (dict) - result of serialize()
+
+        Returns: None
+        """
+        self._base = snapshot['base']
+        self._min = snapshot['min']
+        self._max = snapshot['max']
+        for modifier in self.modifiers.all():
+            self.modifiers.remove_id(modifier.id)
+        for raw_mod in snapshot['modifiers']:
+            self.modifiers.add(**raw_mod)
+        self._invalidate()
+
     def _get_serialized_mods(self):
         """Fetch all serialized modifiers attached on the attribute.
 
@@ -137,15 +318,39 @@ class Attribute(object):
                 "modifiers": self._get_serialized_mods()
         }
 
+    def _state(self):
+        """Return the instance state without any transient cache fields.
+
+        Arguments: None
+
+        Returns: dict
+        """
+        state = self.__dict__.copy()
+        for key in self._TRANSIENT:
+            state.pop(key, None)
+        return state
+
+    def __getstate__(self):
+        return self._state()
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._reset_cache()
+        self._watchers = []
+        self._parent = None
+        self._subscribers = []
+        self._published = None
+        self._thresholds = None
+
     def __repr__(self):
-        return str(self.__dict__)
+        return str(self._state())
 
     def __str__(self):
         return str(self.serialize())
 
     def __eq__(self, other):
         return (isinstance(other, self.__class__)
-            and self.__dict__ == other.__dict__)
+            and self._state() == other._state())
 
     def __ne__(self, other):
         return not self.__eq__(other)
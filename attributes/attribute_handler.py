@@ -1,21 +1,287 @@
 """
 AttributeHandler manages the attributes on a character, conveniently storing, 
 adding, removing attributes.
+
+Attributes can also be derived from other attributes, such as max health from
+constitution and level. A derived attribute has its base computed by a formula
+from the current values of its inputs, and is recomputed whenever one of its
+inputs changes. Only the attributes downstream of the changed input are
+recomputed, in dependency order.
+
+Example:
+
+def max_health(constitution, level):
+    return constitution * 10 + level * 5
+
+handler.add(name="max_health", base=0, min=0, max=1000)
+handler.derive("max_health", ["constitution", "level"], max_health)
+
+The formula is stored with the handler, so it must be a module level function
+that can be pickled.
+
+By default the whole handler is pickled into its Evennia Attribute on every
+save. A handler created with load_rows() instead stores each attribute in an
+Evennia Attribute row of its own, and a save only writes the rows of the
+attributes that changed since the last save.
+
+Loaded attributes are kept in their serialized form, and an Attribute is only
+built the first time it is accessed, so loading a character costs in
+proportion to the attributes actually used rather than to the size of the
+sheet. Attributes carrying modifiers from a source object, or timed
+modifiers, are built on load so that MODIFIER_INDEX and MODIFIER_EXPIRY can
+reach those modifiers.
+
+A handler created with a template key, see attribute_template, reads the
+attributes it has no copy of from the shared template, and only stores the
+attributes that differ from it. It builds a copy of a template attribute
+only when the attribute is changed.
 """
 from attribute import Attribute
-from save_wrapper import save_attr
+from attribute_template import TEMPLATES, TemplateAttribute
+from dependency_graph import DependencyGraph
+from modifier_handler import is_tracked
+from row_store import RowStore
+from save_wrapper import batch, save_attr
+
+# row key holding the derivations of a handler stored in rows
+DERIVED_ROW = "_derived"
+# row key holding the template attributes removed from a handler stored in rows
+REMOVED_ROW = "_removed"
 
 
 class AttributeHandler(object):
     """
     Properties:
     attributes (dict) - attribute_name: Attribute mappings of all attributes in
-                        handler
+                        handler that have been built
     attrobj (Attribute objref) - Evennia database attribute direct object
                                  reference, used to save changes to the handler
+    derived (dict) - attribute_name: (input names, formula) mappings of all
+                     derived attributes
+    template (string) - key of the AttributeTemplate the handler reads
+                        attributes it has no copy of from, or None
+
+    Watchers registered with add_watcher are called with the handler and the
+    attribute name whenever an attribute is added or removed.
     """
-    def __init__(self):
+    def __init__(self, attrobj=None, template=None):
         self.attributes = {}
+        self.attrobj = attrobj
+        self.derived = {}
+        self.template = template
+        self._serialized = {}
+        self._removed = set()
+        self._watchers = []
+        self._graph = DependencyGraph()
+        self._propagating = False
+        self._rows = None
+        self._changed = set()
+        # name: TemplateAttribute of template attributes read without a copy
+        self._views = {}
+
+    @classmethod
+    def load_rows(cls, obj, category, template=None):
+        """Load a handler stored as one Evennia Attribute row per attribute.
+
+        Arguments:
+        obj (typeclassed object) - Evennia object the rows are stored on
+        category (string) - Evennia Attribute category of the rows
+        template (string) - key of the AttributeTemplate to read from
+
+        Returns: AttributeHandler
+        """
+        handler = cls(template=template)
+        handler._rows = RowStore(obj, category)
+        rows = handler._rows.load()
+        derived = rows.pop(DERIVED_ROW, {})
+        handler._removed = set(rows.pop(REMOVED_ROW, ()))
+        handler._load(rows)
+        for name, (inputs, formula) in derived.items():
+            handler._graph.add(name, inputs)
+            handler.derived[name] = (tuple(inputs), formula)
+        handler._changed.clear()
+        return handler
+
+    def _load(self, serialized_attrs):
+        """Keep serialized attributes to be built on first access.
+
+        Arguments:
+        serialized_attrs (dict) - attribute_name: serialized attribute
+
+        Returns: None
+        """
+        for name, serialized in serialized_attrs.items():
+            if any(is_tracked(mod)
+                   for mod in serialized.get('modifiers', ())):
+                self.attributes[name] = self._build_attribute(**serialized)
+            else:
+                self._serialized[name] = serialized
+
+    def _materialize(self, name):
+        """Build a serialized attribute the first time it is accessed, or a
+        template attribute the first time it is changed.
+
+        Arguments:
+        name (string) - attribute name
+
+        Returns: Attribute or None if there is no such attribute
+        """
+        serialized = self._serialized.pop(name, None)
+        if serialized is None:
+            serialized = self._from_template(name)
+            if serialized is None:
+                return None
+        attr = self._build_attribute(**serialized)
+        self.attributes[name] = attr
+        return attr
+
+    def _view(self, name):
+        """Get the view reading a template attribute from the template.
+
+        Arguments:
+        name (string) - attribute name
+
+        Returns: TemplateAttribute
+        """
+        view = self._views.get(name)
+        if view is None:
+            view = self._views[name] = TemplateAttribute(self, name)
+        return view
+
+    def _from_template(self, name):
+        """Get a copy of an attribute from the template.
+
+        Arguments:
+        name (string) - attribute name
+
+        Returns: dict or None if the template does not provide the attribute
+        """
+        if self.template is None or name in self._removed:
+            return None
+        return TEMPLATES.get(self.template).get(name)
+
+    def _in_template(self, name):
+        return (self.template is not None and name not in self._removed
+                and name in TEMPLATES.get(self.template))
+
+    def _names(self):
+        """Get the names of every attribute, built or not.
+
+        Arguments: None
+
+        Returns: List[string]
+        """
+        names = list(self.attributes)
+        names.extend(self._serialized)
+        if self.template is not None:
+            names.extend(name for name in TEMPLATES.get(self.template).names()
+                         if name not in self._removed
+                         and name not in self.attributes
+                         and name not in self._serialized)
+        return names
+
+    def _overrides(self, name, serialized_attr):
+        """Check whether an attribute has to be stored with the handler.
+
+        Arguments:
+        name (string) - attribute name
+        serialized_attr (dict) - result of Attribute.serialize()
+
+        Returns: boolean - False if it is identical to the template
+        """
+        return (self.template is None
+                or not TEMPLATES.get(self.template).matches(name,
+                                                            serialized_attr))
+
+    def _serialize_all(self):
+        """Serialize every attribute that differs from the template, built or
+        not.
+
+        Arguments: None
+
+        Returns: dict - attribute_name: serialized attribute
+        """
+        serialized = dict(self._serialized)
+        for name, attr in self.attributes.items():
+            attr_state = attr.serialize()
+            if self._overrides(name, attr_state):
+                serialized[name] = attr_state
+        return serialized
+
+    def _track(self, name):
+        """Record that an attribute, or the derivations, need to be written.
+
+        Arguments:
+        name (string) - attribute name, DERIVED_ROW or REMOVED_ROW
+
+        Returns: None
+        """
+        if self._rows is not None:
+            self._changed.add(name)
+
+    def _persisted(self):
+        """Check if the handler is stored in rows or in an Evennia Attribute.
+
+        Arguments: None
+
+        Returns: boolean
+        """
+        return self._rows is not None or self.attrobj is not None
+
+    def _unwritten(self):
+        """Get the names of the rows that changed since the last write.
+
+        Arguments: None
+
+        Returns: set
+        """
+        return set(self._changed)
+
+    def _requeue(self, changed):
+        """Mark rows to be written again, after a write was rolled back.
+
+        Arguments:
+        changed (set) - result of _unwritten()
+
+        Returns: None
+        """
+        if self._rows is not None:
+            self._changed.update(changed)
+
+    def _persist(self):
+        """Write the handler to the database.
+
+        A handler stored in rows writes only the rows that changed since the
+        last write, anything else is stored whole in its Evennia Attribute.
+        Attributes identical to the template have no row.
+
+        Arguments: None
+
+        Returns: None
+        """
+        if self._rows is None:
+            self.attrobj.value = self
+            return
+        changed, self._changed = self._changed, set()
+        try:
+            for name in changed:
+                if name == DERIVED_ROW:
+                    self._rows.write(DERIVED_ROW, self.derived)
+                elif name == REMOVED_ROW:
+                    self._rows.write(REMOVED_ROW, sorted(self._removed))
+                elif name in self.attributes:
+                    attr_state = self.attributes[name].serialize()
+                    if self._overrides(name, attr_state):
+                        self._rows.write(name, attr_state)
+                    else:
+                        self._rows.delete(name)
+                elif name in self._serialized:
+                    self._rows.write(name, self._serialized[name])
+                else:
+                    self._rows.delete(name)
+        except Exception:
+            self._changed.update(changed)
+            raise
 
     def all(self):
         """Gets all attributes in cache.
@@ -24,7 +290,7 @@ class AttributeHandler(object):
 
         Returns: List[Attribute]
         """
-        return self.attributes.values()
+        return [self.get(name) for name in self._names()]
 
     def get(self, name, **kwargs):
         """Get an attribute on the character.
@@ -34,8 +300,14 @@ class AttributeHandler(object):
 
         default (None) - default return value if attribute not found
         """
-        if self.attributes.get(name):
-            return self.attributes[name]
+        attr = self.attributes.get(name)
+        if attr is None:
+            if name in self._serialized:
+                attr = self._materialize(name)
+            elif self._in_template(name):
+                attr = self._view(name)
+        if attr:
+            return attr
         if 'default' in kwargs:
             return kwargs.get('default')
         raise AttributeError("could not find attribute {}".format(name))
@@ -50,10 +322,15 @@ class AttributeHandler(object):
         Returns: None
         """
         name = serialized_attr.get('name')
-        if self.get(name, default=None):
+        if name in self:
             raise AttributeError("attribute {} already exists".format(name))
+        if name in self._removed:
+            self._removed.discard(name)
+            self._track(REMOVED_ROW)
         attr = self._build_attribute(**serialized_attr)
         self.attributes[name] = attr
+        self._track(name)
+        self._notify(name)
 
     @save_attr
     def remove(self, name):
@@ -64,9 +341,189 @@ class AttributeHandler(object):
 
         Returns: None
         """
-        if not self.get(name):
+        if name not in self:
             raise AttributeError("could not find attribute {}".format(name))
-        del self.attributes[name]
+        dependents = self._graph.dependents.get(name)
+        if dependents:
+            raise AttributeError("attribute {} is an input of {}".format(
+                                 name, ", ".join(sorted(dependents))))
+        self._graph.remove(name)
+        if self.derived.pop(name, None) is not None:
+            self._track(DERIVED_ROW)
+        self.attributes.pop(name, None)
+        self._serialized.pop(name, None)
+        if self._in_template(name):
+            self._removed.add(name)
+            self._track(REMOVED_ROW)
+        self._track(name)
+        self._notify(name)
+
+    @save_attr
+    def derive(self, name, inputs, formula):
+        """Compute the base of an attribute from other attributes.
+
+        The base is recomputed immediately, and again whenever the current
+        value of any input changes.
+
+        Arguments:
+        name (string) - name of the attribute to derive
+        inputs (list) - names of the attributes the formula takes, in order
+        formula (function) - module level function called with the current
+                             values of the inputs, returning the new base
+
+        Returns: None
+
+        Raises: DependencyCycleError if name is upstream of any input
+        """
+        self.get(name)
+        for input_name in inputs:
+            self.get(input_name)
+        self._graph.add(name, inputs)
+        self.derived[name] = (tuple(inputs), formula)
+        self._track(DERIVED_ROW)
+        self._recompute([name] + self._graph.downstream(name))
+
+    @save_attr
+    def underive(self, name):
+        """Stop deriving an attribute, keeping its current base.
+
+        Arguments:
+        name (string) - name of the derived attribute
+
+        Returns: None
+        """
+        if name not in self.derived:
+            raise AttributeError("attribute {} is not derived".format(name))
+        self._graph.remove(name)
+        del self.derived[name]
+        self._track(DERIVED_ROW)
+
+    def _attribute_changed(self, attr):
+        """Recompute the attributes derived from an attribute that changed.
+
+        Arguments:
+        attr (Attribute) - the changed attribute
+
+        Returns: None
+        """
+        self._track(attr.name)
+        if self._propagating or attr.name not in self._graph.dependents:
+            return
+        self._recompute(self._graph.downstream(attr.name))
+
+    def _recompute(self, names):
+        """Recompute the bases of derived attributes.
+
+        Arguments:
+        names (list) - derived attribute names, in topological order
+
+        Returns: None
+        """
+        self._propagating = True
+        try:
+            for name in names:
+                inputs, formula = self.derived[name]
+                vals = [self.get(input_name).cur_val for input_name in inputs]
+                self.get(name).base = formula(*vals)
+        finally:
+            self._propagating = False
+
+    def batch(self):
+        """Coalesce every save made within the block into one save.
+
+        This covers saves of the handler and of every attribute in it. If the
+        block raises, the handler is rolled back to its state on entry.
+
+        Example:
+        with handler.batch():
+            handler.strength.add_mod(desc="war cry", val=2, operator="+")
+            handler.agility.add_mod(desc="war cry", val=2, operator="+")
+
+        Arguments: None
+
+        Returns: contextmanager
+        """
+        return batch(self)
+
+    def _snapshot(self):
+        return self._serialize_all(), dict(self.derived), set(self._removed)
+
+    def _rollback(self, snapshot):
+        """Restore the handler to a snapshot taken by _snapshot().
+
+        Built attributes that still exist are restored in place, so references
+        to them stay valid.
+
+        Arguments:
+        snapshot (tuple(dict, dict, set)) - serialized attributes, derivations
+                                            and removed template attributes
+
+        Returns: None
+        """
+        attributes, derived, removed = snapshot
+        before = set(self._names())
+        if removed != self._removed:
+            self._removed = set(removed)
+            self._track(REMOVED_ROW)
+        self._propagating = True
+        try:
+            for name in list(self.attributes):
+                serialized = (attributes.get(name)
+                              or self._from_template(name))
+                if serialized is None:
+                    del self.attributes[name]
+                else:
+                    self.attributes[name]._rollback(serialized)
+            for name in list(self._serialized):
+                if name not in attributes:
+                    del self._serialized[name]
+            for name, serialized in attributes.items():
+                if name not in self.attributes:
+                    self._serialized[name] = serialized
+        finally:
+            self._propagating = False
+        after = set(self._names())
+        for name in before.symmetric_difference(after):
+            self._track(name)
+            self._notify(name)
+        self.derived = derived
+        self._graph = DependencyGraph()
+        for name, (inputs, formula) in self.derived.items():
+            self._graph.add(name, inputs)
+
+    def add_watcher(self, watcher):
+        """Register a callable to be called when attributes are added/removed.
+
+        Watchers are not persisted and must be registered again after a
+        reload.
+
+        Arguments:
+        watcher (callable) - called with the handler and the attribute name
+
+        Returns: None
+        """
+        self._watchers.append(watcher)
+
+    def remove_watcher(self, watcher):
+        """Unregister a callable previously passed to add_watcher.
+
+        Arguments:
+        watcher (callable) - watcher to remove
+
+        Returns: None
+        """
+        self._watchers.remove(watcher)
+
+    def _notify(self, name):
+        """Call every watcher after an attribute was added or removed.
+
+        Arguments:
+        name (string) - name of the attribute
+
+        Returns: None
+        """
+        for watcher in list(self._watchers):
+            watcher(self, name)
 
     def clear(self):
         """Clear all attributes from the character.
@@ -75,7 +532,9 @@ class AttributeHandler(object):
 
         Returns: None
         """
-        for name in self.attributes.keys():
+        for name in list(self.derived):
+            self.underive(name)
+        for name in self._names():
             self.remove(name)
 
     def _build_attribute(self, **serialized_attr):
@@ -86,13 +545,53 @@ class AttributeHandler(object):
 
         Returns: Attribute or Resource
         """
-        return Attribute(self.attrobj, **serialized_attr)
+        attr = Attribute(self.attrobj, **serialized_attr)
+        attr._parent = self
+        attr.add_watcher(self._attribute_changed)
+        return attr
 
     def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
         return self.get(name)
 
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        for key in ('_watchers', '_graph', '_propagating', '_rows',
+                    '_changed', '_views'):
+            state.pop(key, None)
+        state['attributes'] = {}
+        state['_serialized'] = self._serialize_all()
+        return state
+
+    def __setstate__(self, state):
+        # handlers pickled before lazy loading stored built attributes
+        attributes = state.pop('attributes', {})
+        serialized = state.pop('_serialized', {})
+        self.__dict__.update(state)
+        self.__dict__.setdefault('template', None)
+        self.__dict__.setdefault('_removed', set())
+        self.attributes = attributes
+        self._serialized = {}
+        self._watchers = []
+        self._graph = DependencyGraph()
+        self._propagating = False
+        self._rows = None
+        self._changed = set()
+        self._views = {}
+        for name, (inputs, formula) in self.derived.items():
+            self._graph.add(name, inputs)
+        for attr in self.attributes.values():
+            attr._parent = self
+            attr.add_watcher(self._attribute_changed)
+        self._load(serialized)
+
+    def __contains__(self, name):
+        return (name in self.attributes or name in self._serialized
+                or self._in_template(name))
+
     def __len__(self):
-        return len(self.attributes.keys())
+        return len(self._names())
 
     def __repr__(self):
         return str(self.__dict__)
@@ -0,0 +1,182 @@
+"""
+AttributeTable is a columnar, NumPy backed view of the same attributes across
+many AttributeHandlers, such as everyone in a room, an army or a zone.
+
+The table keeps the base, min, max and the combined modifier multiplier and
+addend of every attribute in arrays, so the current values of N characters
+are computed in one vectorized call instead of N cur_val lookups. The table
+watches the handlers and attributes it was built from, and only re-reads the
+cells that changed since the last computation.
+
+This module requires NumPy.
+
+Example:
+
+table = AttributeTable([char.db.stats for char in room.contents],
+                       ["strength", "agility"])
+table.cur_vals("strength")   # array of N clamped strength values
+table.cur_vals()             # N x 2 array
+table.close()                # stop watching once the table is discarded
+"""
+import weakref
+import numpy
+
+
+class AttributeTable(object):
+    """
+    Properties:
+    handlers (list) - AttributeHandler per row
+    names (list) - attribute name per column
+    base, min, max, multiplier, addend (numpy.ndarray) - N x M float arrays,
+                                                         NaN where a handler
+                                                         has no such attribute
+    """
+    def __init__(self, handlers, names):
+        self.handlers = list(handlers)
+        self.names = list(names)
+        self._columns = dict((name, col) for col, name in enumerate(self.names))
+        shape = (len(self.handlers), len(self.names))
+        self.base = numpy.full(shape, numpy.nan)
+        self.min = numpy.full(shape, numpy.nan)
+        self.max = numpy.full(shape, numpy.nan)
+        self.multiplier = numpy.full(shape, numpy.nan)
+        self.addend = numpy.full(shape, numpy.nan)
+        # cell: watched Attribute, plus reverse lookups so a change touches
+        # only the cells it affects
+        self._watched = {}
+        self._cells_by_attr = {}
+        self._rows_by_handler = {}
+        self._dirty = set()
+
+        table_ref = weakref.ref(self)
+
+        def handler_changed(handler, name):
+            table = table_ref()
+            if table is not None:
+                table._handler_changed(handler, name)
+
+        def attribute_changed(attr):
+            table = table_ref()
+            if table is not None:
+                table._attribute_changed(attr)
+
+        self._handler_watcher = handler_changed
+        self._attribute_watcher = attribute_changed
+        for row, handler in enumerate(self.handlers):
+            self._rows_by_handler.setdefault(id(handler), []).append(row)
+            if len(self._rows_by_handler[id(handler)]) == 1:
+                handler.add_watcher(self._handler_watcher)
+            for col, name in enumerate(self.names):
+                self._bind(row, col)
+        self._refresh()
+
+    def cur_vals(self, name=None):
+        """Compute clamped current values for every row.
+
+        Arguments:
+        name (string or None) - attribute to compute, or None for all columns
+
+        Returns: numpy.ndarray - shape (N,) for a name, (N, M) otherwise
+        """
+        self._refresh()
+        vals = numpy.clip(self.base * self.multiplier + self.addend,
+                          self.min, self.max)
+        if name is None:
+            return vals
+        return vals[:, self._columns[name]]
+
+    def cur_val(self, row, name):
+        """Get the clamped current value of one cell.
+
+        Arguments:
+        row (int) - row of the handler
+        name (string) - attribute name
+
+        Returns: float
+        """
+        return self.cur_vals(name)[row]
+
+    def close(self):
+        """Stop watching the handlers and attributes of the table.
+
+        Arguments: None
+
+        Returns: None
+        """
+        for cell in list(self._watched):
+            self._unwatch(cell)
+        for rows in self._rows_by_handler.values():
+            self.handlers[rows[0]].remove_watcher(self._handler_watcher)
+        self._rows_by_handler = {}
+
+    def _bind(self, row, col):
+        """Watch the attribute currently backing a cell and mark it dirty.
+
+        Arguments:
+        row (int) - row of the handler
+        col (int) - column of the attribute
+
+        Returns: None
+        """
+        cell = (row, col)
+        self._unwatch(cell)
+        attr = self.handlers[row].get(self.names[col], default=None)
+        if attr is not None:
+            cells = self._cells_by_attr.setdefault(id(attr), set())
+            if not cells:
+                attr.add_watcher(self._attribute_watcher)
+            cells.add(cell)
+            self._watched[cell] = attr
+        self._dirty.add(cell)
+
+    def _unwatch(self, cell):
+        """Stop watching the attribute backing a cell, if any.
+
+        Arguments:
+        cell (tuple(int, int)) - row and column of the cell
+
+        Returns: None
+        """
+        attr = self._watched.pop(cell, None)
+        if attr is None:
+            return
+        cells = self._cells_by_attr[id(attr)]
+        cells.discard(cell)
+        if not cells:
+            del self._cells_by_attr[id(attr)]
+            attr.remove_watcher(self._attribute_watcher)
+
+    def _handler_changed(self, handler, name):
+        col = self._columns.get(name)
+        if col is None:
+            return
+        for row in self._rows_by_handler.get(id(handler), ()):
+            self._bind(row, col)
+
+    def _attribute_changed(self, attr):
+        self._dirty.update(self._cells_by_attr.get(id(attr), ()))
+
+    def _refresh(self):
+        """Re-read every dirty cell from its attribute.
+
+        Arguments: None
+
+        Returns: None
+        """
+        while self._dirty:
+            row, col = self._dirty.pop()
+            attr = self._watched.get((row, col))
+            if attr is None:
+                for column in (self.base, self.min, self.max,
+                               self.multiplier, self.addend):
+                    column[row, col] = numpy.nan
+                continue
+            multiplier, addend = attr.modifiers.aggregates()
+            self.base[row, col] = attr.base
+            self.min[row, col] = -numpy.inf if attr.min is None else attr.min
+            self.max[row, col] = numpy.inf if attr.max is None else attr.max
+            self.multiplier[row, col] = multiplier
+            self.addend[row, col] = addend
+
+    def __len__(self):
+        return len(self.handlers)
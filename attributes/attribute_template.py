@@ -0,0 +1,283 @@
+"""
+Attribute templates are shared, read-only sets of serialized attributes, such
+as the stat block of a goblin. Every NPC spawned from the same prototype can
+reference one template instead of carrying its own copy of every attribute.
+
+An AttributeHandler created with a template key reads attributes it has no
+copy of from the template, and only stores the attributes whose state differs
+from it, such as a damaged health base or an applied modifier. Reads are
+served by one Attribute per template attribute, shared by every handler, and
+a handler only builds a copy of its own the first time it changes the
+attribute. Untouched attributes cost nothing per NPC, in memory or in the
+database.
+
+Templates are registered in code when the game loads, usually from
+world/prototypes.py, and only their key is stored with a handler.
+
+Example:
+
+register_template("GOBLIN", [
+    {"name": "strength", "base": 8, "min": 0, "max": 20},
+    {"name": "agility", "base": 12, "min": 0, "max": 20}
+])
+stats = AttributeHandler(attrobj, template="GOBLIN")
+"""
+from copy import deepcopy
+from attribute import Attribute
+
+
+class AttributeTemplateException(Exception):
+    def __init__(self, msg):
+        super(AttributeTemplateException, self).__init__(msg)
+        self.msg = msg
+
+
+class AttributeTemplate(object):
+    """
+    Properties:
+    key (string) - key the template is registered under
+    """
+    def __init__(self, key, serialized_attrs):
+        self.key = key
+        # stored the way Attribute.serialize() returns them, defaults filled
+        # in, so the state of an instance can be compared with the template
+        self._attributes = dict(
+            (attr['name'], Attribute(None, **deepcopy(attr)).serialize())
+            for attr in serialized_attrs)
+        # name: Attribute read by every handler without a copy of its own
+        self._shared = {}
+
+    def names(self):
+        """Get the names of every attribute in the template.
+
+        Arguments: None
+
+        Returns: List[string]
+        """
+        return list(self._attributes)
+
+    def get(self, name):
+        """Get a copy of a serialized attribute, to build an Attribute from.
+
+        Arguments:
+        name (string) - attribute name
+
+        Returns: dict or None if the template has no such attribute
+        """
+        serialized = self._attributes.get(name)
+        if serialized is None:
+            return None
+        return deepcopy(serialized)
+
+    def shared(self, name):
+        """Get the Attribute shared by every handler reading an attribute of
+        the template. It must never be changed.
+
+        Arguments:
+        name (string) - attribute name
+
+        Returns: Attribute or None if the template has no such attribute
+        """
+        attr = self._shared.get(name)
+        if attr is None:
+            serialized = self.get(name)
+            if serialized is None:
+                return None
+            attr = self._shared[name] = Attribute(None, **serialized)
+        return attr
+
+    def matches(self, name, serialized_attr):
+        """Check whether a serialized attribute is identical to the template.
+
+        Arguments:
+        name (string) - attribute name
+        serialized_attr (dict) - result of Attribute.serialize()
+
+        Returns: boolean
+        """
+        return self._attributes.get(name) == serialized_attr
+
+    def __contains__(self, name):
+        return name in self._attributes
+
+    def __len__(self):
+        return len(self._attributes)
+
+
+class TemplateAttribute(object):
+    """
+    An attribute a handler reads from its template, without a copy of its own.
+
+    Reads of the value, bounds and modifiers are served by the Attribute the
+    template shares between handlers. Anything else, such as setting the base
+    or adding a modifier, first builds the handler a copy of its own, which
+    the view forwards to from then on. Watchers are kept by the view, and
+    called with it once the copy changes.
+
+    Properties:
+    name (string) - name of the attribute
+    modifiers (TemplateModifiers) - view of the modifiers of the attribute
+    """
+    __slots__ = ('_handler', '_name', '_watchers')
+    # served by the shared Attribute
+    _READS = frozenset(('cur_val', 'base', 'min', 'max', 'serialize',
+                        'get_mod'))
+
+    def __init__(self, handler, name):
+        object.__setattr__(self, '_handler', handler)
+        object.__setattr__(self, '_name', name)
+        object.__setattr__(self, '_watchers', [])
+
+    @property
+    def name(self):
+        return self._name
+
+    @property
+    def modifiers(self):
+        return TemplateModifiers(self)
+
+    def add_watcher(self, watcher):
+        """Register a callable to be called whenever the attribute changes,
+        without copying it.
+
+        Arguments:
+        watcher (callable) - called with the view as its only argument
+
+        Returns: None
+        """
+        if not self._watchers:
+            attr = self._handler.attributes.get(self._name)
+            if attr is not None:
+                attr.add_watcher(self._forward)
+        self._watchers.append(watcher)
+
+    def remove_watcher(self, watcher):
+        """Unregister a callable previously passed to add_watcher.
+
+        Arguments:
+        watcher (callable) - watcher to remove
+
+        Returns: None
+        """
+        self._watchers.remove(watcher)
+        if not self._watchers:
+            attr = self._handler.attributes.get(self._name)
+            if attr is not None and self._forward in attr._watchers:
+                attr.remove_watcher(self._forward)
+
+    def _forward(self, attr):
+        for watcher in list(self._watchers):
+            watcher(self)
+
+    def _target(self, write):
+        """Get the Attribute to forward to.
+
+        Arguments:
+        write (boolean) - if the handler needs a copy of its own
+
+        Returns: Attribute
+        """
+        handler = self._handler
+        attr = handler.attributes.get(self._name)
+        if attr is None:
+            if write:
+                attr = handler._materialize(self._name)
+                if attr is not None and self._watchers:
+                    attr.add_watcher(self._forward)
+            else:
+                attr = TEMPLATES.get(handler.template).shared(self._name)
+        if attr is None:
+            raise AttributeError("could not find attribute "
+                                 "{}".format(self._name))
+        return attr
+
+    def __getattr__(self, name):
+        return getattr(self._target(name not in self._READS), name)
+
+    def __setattr__(self, name, value):
+        setattr(self._target(True), name, value)
+
+    def __eq__(self, other):
+        if isinstance(other, TemplateAttribute):
+            other = other._target(False)
+        return self._target(False) == other
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __repr__(self):
+        return repr(self._target(False))
+
+    def __str__(self):
+        return str(self._target(False))
+
+
+class TemplateModifiers(object):
+    """
+    The modifiers of a TemplateAttribute. Reads are served by the shared
+    Attribute until the handler has a copy of its own, anything else copies
+    it first.
+    """
+    __slots__ = ('_view',)
+    # served by the shared Attribute
+    _READS = frozenset(('aggregates', 'all', 'get', 'get_modified_val',
+                        'serialize_all_mods'))
+
+    def __init__(self, view):
+        self._view = view
+
+    def __getattr__(self, name):
+        return getattr(self._view._target(name not in self._READS).modifiers,
+                       name)
+
+    def __len__(self):
+        return len(self._view._target(False).modifiers)
+
+
+class TemplateRegistry(object):
+
+    def __init__(self):
+        self._templates = {}
+
+    def register(self, key, serialized_attrs):
+        """Register a template, replacing any template with the same key.
+
+        Handlers already using the key read from the new template as soon as
+        they next access an attribute they have no copy of.
+
+        Arguments:
+        key (string) - template key stored with handlers
+        serialized_attrs (list) - serialized attributes of the template
+
+        Returns: AttributeTemplate
+        """
+        template = AttributeTemplate(key, serialized_attrs)
+        self._templates[key] = template
+        return template
+
+    def get(self, key):
+        """Get a registered template.
+
+        Arguments:
+        key (string) - template key
+
+        Returns: AttributeTemplate
+
+        Raises: AttributeTemplateException if no template has the key
+        """
+        try:
+            return self._templates[key]
+        except KeyError:
+            raise AttributeTemplateException("no attribute template "
+                                             "registered as {}".format(key))
+
+    def __contains__(self, key):
+        return key in self._templates
+
+
+TEMPLATES = TemplateRegistry()
+
+
+def register_template(key, serialized_attrs):
+    """Register an attribute template, see TemplateRegistry.register."""
+    return TEMPLATES.register(key, serialized_attrs)
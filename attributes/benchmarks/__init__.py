@@ -0,0 +1,6 @@
+"""
+Standalone benchmarks for the attributes package. Each module can be run
+directly from the game directory, eg.
+
+python -m attributes.benchmarks.bench_modifier_memory
+"""
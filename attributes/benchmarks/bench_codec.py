@@ -0,0 +1,101 @@
+"""
+Benchmark comparing the binary codec with the current dict + pickle path, on
+encoded size and on encode/decode time.
+
+The population is a set of characters, each with the same attributes and
+resources carrying a few modifiers, serialized the way the handlers store
+them.
+
+python -m attributes.benchmarks.bench_codec [characters]
+"""
+from __future__ import print_function
+import pickle
+import sys
+import timeit
+from attributes.attribute import Attribute
+from attributes.codec import (decode_attributes, decode_resources,
+                              encode_attributes, encode_resources)
+from attributes.resource import Resource
+
+ATTRIBUTES = ["strength", "agility", "constitution", "intelligence",
+              "wisdom", "charisma", "level", "armor"]
+RESOURCES = ["health", "mana", "stamina"]
+DESCS = ["justice aura", "the flu", "headache", "war cry", "blessing"]
+PICKLE_PROTOCOL = 2
+
+
+def _serialized_attr(name, base, max, mod_count, seed):
+    mods = [{"desc": DESCS[i], "val": i + 1, "operator": "+",
+             "dbref": seed + i, "typeclass": "Script"}
+            for i in range(mod_count)]
+    return Attribute(None, name=name, base=base, min=0, max=max,
+                     modifiers=mods).serialize()
+
+
+def _serialized_attrs(seed):
+    return [_serialized_attr(name, 10 + (seed + i) % 8, 100, (seed + i) % 4,
+                             seed)
+            for i, name in enumerate(ATTRIBUTES)]
+
+
+def _serialized_resources(seed):
+    resources = []
+    for name in RESOURCES:
+        res = Resource(None, name=name, cur_val=50,
+                       min=_serialized_attr("min", 0, 0, 0, seed),
+                       max=_serialized_attr("max", 100, 1000, seed % 2, seed),
+                       will_recharge=True, recharge_rate=2,
+                       recharge_interval=5)
+        resources.append(res.serialize())
+    return resources
+
+
+def _measure(label, payloads, encode, decode, repeat):
+    encoded = [encode(payload) for payload in payloads]
+    size = sum(len(data) for data in encoded)
+    encode_time = min(timeit.repeat(
+        lambda: [encode(payload) for payload in payloads],
+        number=1, repeat=repeat))
+    decode_time = min(timeit.repeat(
+        lambda: [decode(data) for data in encoded],
+        number=1, repeat=repeat))
+    print("{:18} {:>10,} bytes  encode {:8.2f} ms  decode {:8.2f} ms".format(
+          label, size, encode_time * 1000, decode_time * 1000))
+    return {"size": size, "encode": encode_time, "decode": decode_time}
+
+
+def run(characters=1000, repeat=5):
+    """Encode and decode every character's handlers with each path.
+
+    Arguments:
+    characters (int) - number of characters to serialize
+    repeat (int) - timing repetitions, the best is reported
+
+    Returns: dict - path name: {"size", "encode", "decode"}
+    """
+    attrs = [_serialized_attrs(seed) for seed in range(characters)]
+    resources = [_serialized_resources(seed) for seed in range(characters)]
+
+    def pickle_dumps(payload):
+        return pickle.dumps(payload, PICKLE_PROTOCOL)
+
+    results = {}
+    results["attributes pickle"] = _measure(
+        "attributes pickle", attrs, pickle_dumps, pickle.loads, repeat)
+    results["attributes codec"] = _measure(
+        "attributes codec", attrs, encode_attributes, decode_attributes,
+        repeat)
+    results["resources pickle"] = _measure(
+        "resources pickle", resources, pickle_dumps, pickle.loads, repeat)
+    results["resources codec"] = _measure(
+        "resources codec", resources, encode_resources, decode_resources,
+        repeat)
+    for kind in ("attributes", "resources"):
+        print("{} size saving  {:.1%}".format(kind, 1 - results[
+              kind + " codec"]["size"] / float(results[kind + " pickle"][
+                                                                "size"])))
+    return results
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
@@ -0,0 +1,88 @@
+"""
+Memory benchmark comparing the old dict-backed Modifier layout with the
+current slotted layout.
+
+Each layout builds the same population of modifiers. The desc strings are
+built at runtime so, like strings unpickled from the database, they are
+distinct objects until the flyweight table shares them.
+
+python -m attributes.benchmarks.bench_modifier_memory [count]
+"""
+from __future__ import print_function
+import gc
+import sys
+from attributes.modifier import Modifier
+
+DESCS = ["justice aura", "the flu", "headache", "war cry", "blessing"]
+
+
+class LegacyModifier(object):
+    """
+    The Modifier layout before slotting: an instance __dict__ per modifier
+    and one subclass per operator.
+    """
+    def __init__(self, desc="unknown", val=0, dbref=None, typeclass=None):
+        self.desc = desc
+        self.val = val
+        self.dbref = dbref
+        self.typeclass = typeclass
+
+
+class LegacyAddModifier(LegacyModifier):
+
+    def get_modified_val(self, other):
+        return other + self.val
+
+
+def _fresh(string):
+    """Return a copy of a string that is not the interned constant."""
+    return "".join(list(string))
+
+
+def _raw_mods(count):
+    return [{"desc": _fresh(DESCS[i % len(DESCS)]), "val": i % 7,
+             "dbref": i, "typeclass": _fresh("Script")}
+            for i in range(count)]
+
+
+def _footprint(mods):
+    """Approximate bytes held by the modifiers and their strings."""
+    seen = set()
+    total = 0
+    for mod in mods:
+        objs = [mod, mod.desc, mod.typeclass]
+        if hasattr(mod, "__dict__"):
+            objs.append(mod.__dict__)
+        for obj in objs:
+            if id(obj) not in seen:
+                seen.add(id(obj))
+                total += sys.getsizeof(obj)
+    return total
+
+
+def run(count=100000):
+    """Build count modifiers in each layout and report their footprint.
+
+    Arguments:
+    count (int) - number of modifiers to build per layout
+
+    Returns: dict - layout name: bytes
+    """
+    results = {}
+    for name, build in (
+            ("legacy", lambda raw: LegacyAddModifier(**raw)),
+            ("slotted", lambda raw: Modifier.factory(operator="+", **raw))):
+        gc.collect()
+        mods = [build(raw) for raw in _raw_mods(count)]
+        results[name] = _footprint(mods)
+        del mods
+    for name in ("legacy", "slotted"):
+        print("{:8} {:>12,} bytes  {:6.1f} bytes/modifier".format(
+              name, results[name], results[name] / float(count)))
+    print("saving  {:.1%}".format(1 - results["slotted"]
+                                  / float(results["legacy"])))
+    return results
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
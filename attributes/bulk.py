@@ -0,0 +1,88 @@
+"""
+Bulk operations apply the same change to the handlers of many objects, such
+as restoring every player in an arena or resetting the health of every NPC in
+a zone, and write the results together instead of once per change.
+
+Each object's handler is changed in memory within a batch, so a failing
+object is rolled back and skipped without affecting the others. Every changed
+handler is then saved as usual, one UPDATE per handler, or per changed row of
+a handler stored in rows, but all of them in a single transaction rather than
+one each. The saves bypass write-behind, and the written handlers are taken
+off its queue, so they are not written again on the next flush.
+
+Example:
+
+result = bulk_apply(arena.contents, "resources",
+                    lambda handler: handler.health.restore())
+caller.msg(str(result))
+"""
+import time
+from evennia.utils import logger
+from save_wrapper import batch, collect
+from write_behind import WRITE_BEHIND, write_all
+
+
+class BulkResult(object):
+    """
+    Properties:
+    objects (int) - number of objects the operation was applied to
+    skipped (int) - number of objects without the handler
+    failed (int) - number of objects the operation raised for, which were
+                   rolled back
+    written (int) - number of handlers written to the database
+    apply_time (float) - seconds spent applying the operation
+    write_time (float) - seconds spent writing the changes
+    """
+    def __init__(self):
+        self.objects = 0
+        self.skipped = 0
+        self.failed = 0
+        self.written = 0
+        self.apply_time = 0.0
+        self.write_time = 0.0
+
+    def __str__(self):
+        return ("applied to {} objects ({} skipped, {} failed) in {:.1f}ms, "
+                "wrote {} in {:.1f}ms".format(
+                    self.objects, self.skipped, self.failed,
+                    self.apply_time * 1000, self.written,
+                    self.write_time * 1000))
+
+
+def bulk_apply(objs, handler_name, operation):
+    """Apply an operation to the handler of every object, then save every
+    changed handler, within one transaction.
+
+    Arguments:
+    objs (iterable) - Evennia objects
+    handler_name (string) - name of the handler property on the objects,
+                            such as "resources"
+    operation (callable) - called with each handler, changing it through its
+                           usual methods
+
+    Returns: BulkResult
+    """
+    result = BulkResult()
+    start = time.time()
+    with collect() as collected:
+        for obj in objs:
+            handler = getattr(obj, handler_name, None)
+            if handler is None:
+                result.skipped += 1
+                continue
+            try:
+                with batch(handler):
+                    operation(handler)
+            except Exception:
+                logger.log_trace("bulk operation on {} failed".format(obj))
+                result.failed += 1
+                continue
+            result.objects += 1
+    result.apply_time = time.time() - start
+
+    start = time.time()
+    write_all(collected.values())
+    WRITE_BEHIND.discard(collected.values())
+    result.written = len(collected)
+    result.write_time = time.time() - start
+    return result
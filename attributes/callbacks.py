@@ -0,0 +1,105 @@
+"""
+CallbackRegistry maps dotted names to the callables that Delays call, so a
+delay can be persisted by the name of its callback instead of the callable
+itself, and find it again after a reload.
+
+Register a callback where it is defined:
+
+@register_callback
+def end_stun(dbref):
+    ...
+
+The key defaults to the dotted path of the function, here
+"world.effects.end_stun", and either the key or the function can then be
+given to a Delay.
+"""
+
+
+class CallbackRegistryException(Exception):
+    def __init__(self, msg):
+        super(CallbackRegistryException, self).__init__(msg)
+        self.msg = msg
+
+
+class CallbackRegistry(object):
+
+    def __init__(self):
+        self._callbacks = {}
+        self._keys = {}
+
+    def register(self, func, key=None):
+        """Register a callback, replacing any callback with the same key.
+
+        Arguments:
+        func (callable) - callback to register
+        key (string) - dotted name, defaults to the module and name of func
+
+        Returns: callable - func
+        """
+        if key is None:
+            key = "{}.{}".format(func.__module__, func.__name__)
+        previous = self._callbacks.get(key)
+        if previous is not None:
+            self._keys.pop(previous, None)
+        self._callbacks[key] = func
+        self._keys[func] = key
+        return func
+
+    def get(self, key):
+        """Get a registered callback.
+
+        Arguments:
+        key (string) - dotted name of the callback
+
+        Returns: callable
+
+        Raises: CallbackRegistryException if no callback has the key
+        """
+        try:
+            return self._callbacks[key]
+        except KeyError:
+            raise CallbackRegistryException("no callback registered as "
+                                            "{}".format(key))
+
+    def key_for(self, func):
+        """Get the key a callback is registered under.
+
+        Arguments:
+        func (callable) - registered callback
+
+        Returns: string
+
+        Raises: CallbackRegistryException if the callback is not registered
+        """
+        try:
+            return self._keys[func]
+        except KeyError:
+            raise CallbackRegistryException("callback {} is not registered, "
+                                            "so it cannot be "
+                                            "persisted".format(func))
+
+    def __contains__(self, key):
+        return key in self._callbacks
+
+
+CALLBACKS = CallbackRegistry()
+
+
+def register_callback(func=None, key=None):
+    """Register a callback in CALLBACKS, usable as a decorator with or
+    without a key.
+
+    Example:
+    @register_callback(key="effects.end_stun")
+    def end_stun(dbref):
+        ...
+
+    Arguments:
+    func (callable) - callback to register
+    key (string) - dotted name, defaults to the module and name of func
+
+    Returns: callable
+    """
+    if func is None:
+        return lambda func: CALLBACKS.register(func, key)
+    return CALLBACKS.register(func, key)
@@ -0,0 +1,346 @@
+"""
+Compact, versioned binary encoding of serialized attributes and resources.
+
+Attribute.serialize(), Resource.serialize() and
+ModifierHandler.serialize_all_mods() produce nested dicts that repeat every
+key, and every desc string, for every attribute and modifier. This codec packs
+the same data into a flat byte string instead:
+
+header       schema version (B), kind (B), entry count (I)
+string table count (I), then per string its utf-8 length (H) and bytes
+body         one record per entry, fields in a fixed order
+
+Every value carries a one byte type tag. Integers are struct packed into the
+smallest of 1, 4 or 8 bytes that holds them, floats into 8 bytes, and names,
+descs and typeclasses are written once in the string table and referenced by
+a 2 byte index. Values of any other type, such as NumPy scalars, raise a
+CodecError.
+Decoding gives back exactly the dicts that serialize() produced, so tooling
+can keep working with dicts.
+
+Example:
+
+data = encode_attributes([attr.serialize() for attr in handler.all()])
+serialized_attrs = decode_attributes(data)
+"""
+import struct
+
+VERSION = 3
+# oldest schema version that can still be decoded
+MIN_VERSION = 1
+
+KIND_ATTRIBUTES = 1
+KIND_RESOURCES = 2
+
+_T_NONE = 0
+_T_INT8 = 1
+_T_INT32 = 2
+_T_INT64 = 3
+_T_FLOAT = 4
+_T_STR = 5
+_T_TRUE = 6
+_T_FALSE = 7
+
+_OPERATORS = ("+", "-", "*")
+
+_HEADER = struct.Struct("<BBI")
+_COUNT = struct.Struct("<I")
+_MOD_COUNT = struct.Struct("<H")
+_STRLEN = struct.Struct("<H")
+_TAG = struct.Struct("<B")
+_INT8 = struct.Struct("<Bb")
+_INT32 = struct.Struct("<Bi")
+_INT64 = struct.Struct("<Bq")
+_FLOAT = struct.Struct("<Bd")
+_INT8_VAL = struct.Struct("<b")
+_INT32_VAL = struct.Struct("<i")
+_INT64_VAL = struct.Struct("<q")
+_FLOAT_VAL = struct.Struct("<d")
+_INDEX = struct.Struct("<H")
+# the largest string index _INDEX can hold
+_MAX_STRINGS = 0xFFFF
+# the longest string _STRLEN can hold, in utf-8 bytes
+_MAX_STRLEN = 0xFFFF
+# the most modifiers _MOD_COUNT can hold
+_MAX_MODS = 0xFFFF
+_STRING_TYPES = (str, type(u""))
+
+
+class CodecError(Exception):
+    def __init__(self, msg):
+        super(CodecError, self).__init__(msg)
+        self.msg = msg
+
+
+class _Encoder(object):
+
+    def __init__(self):
+        self.strings = []
+        self.string_index = {}
+        self.parts = []
+
+    def string(self, string):
+        if not isinstance(string, _STRING_TYPES):
+            raise CodecError("cannot encode {!r} of type {}".format(
+                             string, type(string).__name__))
+        index = self.string_index.get(string)
+        if index is None:
+            index = len(self.strings)
+            if index > _MAX_STRINGS:
+                raise CodecError("more than {} distinct strings".format(
+                                 _MAX_STRINGS))
+            self.string_index[string] = index
+            self.strings.append(string)
+        self.parts.append(_INDEX.pack(index))
+
+    def value(self, val):
+        parts = self.parts
+        if val is None:
+            parts.append(_TAG.pack(_T_NONE))
+        elif val is True:
+            parts.append(_TAG.pack(_T_TRUE))
+        elif val is False:
+            parts.append(_TAG.pack(_T_FALSE))
+        elif isinstance(val, float):
+            parts.append(_FLOAT.pack(_T_FLOAT, val))
+        elif isinstance(val, (int, type(2 ** 64))):
+            # integers take the smallest of 1, 4 or 8 bytes that fits them
+            if -0x80 <= val < 0x80:
+                parts.append(_INT8.pack(_T_INT8, val))
+            elif -0x80000000 <= val < 0x80000000:
+                parts.append(_INT32.pack(_T_INT32, val))
+            else:
+                try:
+                    parts.append(_INT64.pack(_T_INT64, val))
+                except struct.error:
+                    raise CodecError("integer {} does not fit in 64 "
+                                     "bits".format(val))
+        else:
+            parts.append(_TAG.pack(_T_STR))
+            self.string(val)
+
+    def mod_count(self, count):
+        if count > _MAX_MODS:
+            raise CodecError("more than {} modifiers".format(_MAX_MODS))
+        self.parts.append(_MOD_COUNT.pack(count))
+
+    def modifier(self, mod):
+        self.string(mod["desc"])
+        self.value(mod["val"])
+        try:
+            operator = _OPERATORS.index(mod["operator"])
+        except ValueError:
+            raise CodecError("unknown operator {}".format(mod["operator"]))
+        self.parts.append(_TAG.pack(operator))
+        self.value(mod["dbref"])
+        self.value(mod["typeclass"])
+        self.value(mod.get("expires_at"))
+
+    def attribute(self, attr):
+        self.value(attr["name"])
+        self.value(attr["base"])
+        self.value(attr["min"])
+        self.value(attr["max"])
+        mods = attr.get("modifiers", [])
+        self.mod_count(len(mods))
+        for mod in mods:
+            self.modifier(mod)
+
+    def resource(self, res):
+        self.value(res["name"])
+        self.value(res["cur_val"])
+        self.attribute(res["min"])
+        self.attribute(res["max"])
+        self.value(res["will_recharge"])
+        self.value(res["recharge_rate"])
+        self.value(res["recharge_interval"])
+        self.value(res.get("lazy_recharge"))
+        self.value(res.get("updated_at"))
+
+    def finish(self, kind, count):
+        table = [_COUNT.pack(len(self.strings))]
+        for string in self.strings:
+            data = string if isinstance(string, bytes) else string.encode(
+                                                                    "utf-8")
+            if len(data) > _MAX_STRLEN:
+                raise CodecError("string longer than {} bytes".format(
+                                 _MAX_STRLEN))
+            table.append(_STRLEN.pack(len(data)))
+            table.append(data)
+        return b"".join([_HEADER.pack(VERSION, kind, count)]
+                        + table + self.parts)
+
+
+class _Decoder(object):
+
+    def __init__(self, data, kind):
+        self.data = data
+        try:
+            version, found_kind, self.entries = _HEADER.unpack_from(data, 0)
+        except struct.error:
+            raise CodecError("data too short for a header")
+        if not MIN_VERSION <= version <= VERSION:
+            raise CodecError("unsupported schema version {}".format(version))
+        if found_kind != kind:
+            raise CodecError("expected kind {}, found {}".format(kind,
+                                                                 found_kind))
+        self.version = version
+        self.offset = _HEADER.size
+        self.strings = []
+        for _ in range(self.count()):
+            length = self.unpack(_STRLEN)
+            end = self.offset + length
+            if end > len(data):
+                raise CodecError("truncated data at offset {}".format(
+                                 self.offset))
+            try:
+                self.strings.append(data[self.offset:end].decode("utf-8"))
+            except UnicodeDecodeError:
+                raise CodecError("invalid string at offset {}".format(
+                                 self.offset))
+            self.offset = end
+
+    def unpack(self, fmt):
+        try:
+            val = fmt.unpack_from(self.data, self.offset)[0]
+        except struct.error:
+            raise CodecError("truncated data at offset {}".format(
+                             self.offset))
+        self.offset += fmt.size
+        return val
+
+    def count(self):
+        return self.unpack(_COUNT)
+
+    def mod_count(self):
+        return self.unpack(_MOD_COUNT)
+
+    def string(self):
+        index = self.unpack(_INDEX)
+        try:
+            return self.strings[index]
+        except IndexError:
+            raise CodecError("unknown string index {}".format(index))
+
+    def operator(self):
+        tag = self.unpack(_TAG)
+        try:
+            return _OPERATORS[tag]
+        except IndexError:
+            raise CodecError("unknown operator tag {}".format(tag))
+
+    def value(self):
+        tag = self.unpack(_TAG)
+        if tag == _T_NONE:
+            return None
+        if tag == _T_TRUE:
+            return True
+        if tag == _T_FALSE:
+            return False
+        if tag == _T_INT8:
+            return self.unpack(_INT8_VAL)
+        if tag == _T_INT32:
+            return self.unpack(_INT32_VAL)
+        if tag == _T_INT64:
+            return self.unpack(_INT64_VAL)
+        if tag == _T_FLOAT:
+            return self.unpack(_FLOAT_VAL)
+        if tag == _T_STR:
+            return self.string()
+        raise CodecError("unknown value tag {}".format(tag))
+
+    def modifier(self):
+        mod = {
+                "desc": self.string(),
+                "val": self.value(),
+                "operator": self.operator(),
+                "dbref": self.value(),
+                "typeclass": self.value()
+        }
+        if self.version >= 2:
+            # version 2 added the expiry of timed modifiers
+            expires_at = self.value()
+            if expires_at is not None:
+                mod["expires_at"] = expires_at
+        return mod
+
+    def attribute(self):
+        attr = {
+                "name": self.value(),
+                "base": self.value(),
+                "min": self.value(),
+                "max": self.value()
+        }
+        attr["modifiers"] = [self.modifier() for _ in range(self.mod_count())]
+        return attr
+
+    def resource(self):
+        res = {
+                "name": self.value(),
+                "cur_val": self.value(),
+                "min": self.attribute(),
+                "max": self.attribute(),
+                "will_recharge": self.value(),
+                "recharge_rate": self.value(),
+                "recharge_interval": self.value()
+        }
+        if self.version >= 3:
+            # version 3 added lazy recharging
+            lazy_recharge = self.value()
+            updated_at = self.value()
+            if lazy_recharge:
+                res["lazy_recharge"] = lazy_recharge
+                res["updated_at"] = updated_at
+        return res
+
+
+def encode_attributes(serialized_attrs):
+    """Encode serialized attributes.
+
+    Arguments:
+    serialized_attrs (List[dict]) - results of Attribute.serialize()
+
+    Returns: bytes
+    """
+    encoder = _Encoder()
+    for attr in serialized_attrs:
+        encoder.attribute(attr)
+    return encoder.finish(KIND_ATTRIBUTES, len(serialized_attrs))
+
+
+def decode_attributes(data):
+    """Decode attributes encoded by encode_attributes.
+
+    Arguments:
+    data (bytes) - encoded attributes
+
+    Returns: List[dict]
+    """
+    decoder = _Decoder(data, KIND_ATTRIBUTES)
+    return [decoder.attribute() for _ in range(decoder.entries)]
+
+
+def encode_resources(serialized_resources):
+    """Encode serialized resources.
+
+    Arguments:
+    serialized_resources (List[dict]) - results of Resource.serialize()
+
+    Returns: bytes
+    """
+    encoder = _Encoder()
+    for res in serialized_resources:
+        encoder.resource(res)
+    return encoder.finish(KIND_RESOURCES, len(serialized_resources))
+
+
+def decode_resources(data):
+    """Decode resources encoded by encode_resources.
+
+    Arguments:
+    data (bytes) - encoded resources
+
+    Returns: List[dict]
+    """
+    decoder = _Decoder(data, KIND_RESOURCES)
+    return [decoder.resource() for _ in range(decoder.entries)]
@@ -0,0 +1,126 @@
+"""
+CooldownHandler tracks cooldowns that only need an "is it ready" check, as a
+mapping of cooldown name to the timestamp it expires at.
+
+Unlike a Delay, a cooldown schedules nothing: it is checked against the clock
+whenever it is asked about, so any number of cooldowns cost no reactor timers,
+and persisting them stores one float per cooldown. Use DelayHandler for
+delays that must call something when they elapse.
+
+Example:
+
+if not caller.cooldowns.ready("bash"):
+    caller.msg("You can bash again in {:.0f} seconds.".format(
+               caller.cooldowns.remaining("bash")))
+    return
+caller.cooldowns.start("bash", 10)
+"""
+import time
+from save_wrapper import save_attr
+
+
+class CooldownHandler(object):
+    """
+    Properties:
+    attrobj (Attribute objref) - Evennia database attribute direct object
+                                 reference, used to save changes to the handler
+    """
+
+    def __init__(self, attrobj=None):
+        self.attrobj = attrobj
+        # name: timestamp the cooldown expires at
+        self._expires = {}
+
+    @save_attr
+    def start(self, name, seconds):
+        """Start a cooldown, replacing any cooldown with the same name.
+
+        Arguments:
+        name (string) - name of the cooldown
+        seconds (int or float) - seconds until the cooldown is ready
+
+        Returns: None
+        """
+        self._expires[name] = time.time() + seconds
+
+    @save_attr
+    def end(self, name):
+        """End a cooldown early, making it ready.
+
+        Arguments:
+        name (string) - name of the cooldown
+
+        Returns: None
+        """
+        self._expires.pop(name, None)
+
+    @save_attr
+    def clear(self):
+        """End every cooldown.
+
+        Arguments: None
+
+        Returns: None
+        """
+        self._expires.clear()
+
+    def ready(self, name):
+        """Check if a cooldown has elapsed, or was never started.
+
+        Arguments:
+        name (string) - name of the cooldown
+
+        Returns: boolean
+        """
+        return not self.remaining(name)
+
+    def remaining(self, name):
+        """Get the seconds until a cooldown is ready.
+
+        Arguments:
+        name (string) - name of the cooldown
+
+        Returns: float - 0 if the cooldown is ready
+        """
+        expires_at = self._expires.get(name)
+        if expires_at is None:
+            return 0
+        remaining = expires_at - time.time()
+        if remaining <= 0:
+            # expired, forget it without saving
+            del self._expires[name]
+            return 0
+        return remaining
+
+    def all(self):
+        """Get every cooldown that is not ready yet.
+
+        Arguments: None
+
+        Returns: dict - name: seconds remaining
+        """
+        self._prune()
+        now = time.time()
+        return dict((name, expires_at - now)
+                    for name, expires_at in self._expires.items())
+
+    def _prune(self):
+        """Forget every expired cooldown."""
+        now = time.time()
+        for name, expires_at in list(self._expires.items()):
+            if expires_at <= now:
+                del self._expires[name]
+
+    def __getstate__(self):
+        self._prune()
+        return self.__dict__.copy()
+
+    def __contains__(self, name):
+        return not self.ready(name)
+
+    def __len__(self):
+        self._prune()
+        return len(self._expires)
+
+    def __repr__(self):
+        return str(self.__dict__)
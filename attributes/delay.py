@@ -3,9 +3,17 @@ Delays act as a wrapper on the Twisted Deferred object that is returned from
 Evennia's delay utility function. Delays act as callbacks in NextRPI, which
 allows various applications, such as enforcing cooldowns, and simulating
 regenerating resources.
+
+Delays are persisted by the key of their callback in the callback registry,
+see callbacks.py, their retval and the timestamp they fire at.
+
+A Delay can be scheduled on a TimingWheel instead, see timing_wheel.py, which
+offers the same interface while sharing one reactor timer between all the
+delays on the wheel.
 """
 
 from evennia.utils.utils import delay
+from callbacks import CALLBACKS
 import time
 
 
@@ -13,28 +21,55 @@ class Delay(object):
     """
     Properties:
     deferred (Deferred) - a Twisted deferred object that contains information
-                          about the callback (if any)
+                          about the callback (if any), or a WheelTimer when
+                          scheduled on a timing wheel
+    on_fired (callable or None) - called with no arguments after the
+                                  callback, used by DelayHandler to forget
+                                  delays that fired
     """
-    def __init__(self, delay_in_seconds, callback=None, retval=None):
+    def __init__(self, delay_in_seconds=0, callback=None, retval=None,
+                 wheel=None, fire_at=None):
         """
         Arguments:
         delay_in_seconds (int or float) - delay until callback is fired
-        callback (func) - callback to call, if any, after delay elapses
+        callback (func or string) - callback to call, if any, after delay
+                                    elapses, or its key in CALLBACKS
         retval (any, or None) - any arguments to return or input to
                                 to callback
+        wheel (TimingWheel or None) - timing wheel to schedule the callback
+                                      on, instead of the reactor
+        fire_at (float or None) - timestamp to fire the callback at, used
+                                  instead of delay_in_seconds
         """
-        if retval:
-            self.deferred = delay(delay_in_seconds, callback, retval)
+        if callback is not None and not callable(callback):
+            callback = CALLBACKS.get(callback)
+        self._callback = callback
+        self._retval = retval
+        self.on_fired = None
+        if fire_at is not None:
+            delay_in_seconds = max(fire_at - time.time(), 0)
+        args = (retval,) if retval is not None else ()
+        if wheel is not None:
+            self.deferred = wheel.call_later(delay_in_seconds, self._fire,
+                                             *args)
         else:
-            self.deferred = delay(delay_in_seconds, callback)
+            self.deferred = delay(delay_in_seconds, self._fire, *args)
+
+    def _fire(self, *args):
+        try:
+            if self._callback is not None:
+                self._callback(*args)
+        finally:
+            if self.on_fired is not None:
+                self.on_fired()
 
     @property
     def callback(self):
-        return self.deferred.func
+        return self._callback
 
     @property
     def retval(self):
-        return self.deferred.args
+        return self._retval
 
     def delay_more(self, seconds):
         """Delay the callback by additional seconds.
@@ -92,12 +127,19 @@ class Delay(object):
     def serialize(self):
         """Serialize for storage.
 
+        The callback is stored by its key in CALLBACKS, and the time it fires
+        at as a timestamp, so the delay can be recreated after a reload.
+
         Arguments: None
 
         Returns: dict
+
+        Raises: CallbackRegistryException if the callback is not registered
         """
+        callback = self._callback
         return {
-                'delay_in_seconds': self.get_time_remaining(),
-                'callback': self.callback,
-                'retval': self.retval
+                'fire_at': self.get_time(),
+                'callback': (CALLBACKS.key_for(callback)
+                             if callback is not None else None),
+                'retval': self._retval
         }
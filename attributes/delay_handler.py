@@ -6,27 +6,119 @@ Delay Handlers validate delays and remove any inactive delays, as well as
 retrieve any delays currently on a character. Delay Handlers also ensure that
 any delays are recreated on server restart and reload so that delays persist
 across server restart/reloads.
-"""
 
+Each delay is persisted as the key of its callback in the callback registry,
+see callbacks.py, its retval and the timestamp it fires at. Get the handler
+of an object through DelayHandler.load(), so there is only one handler per
+Evennia Attribute:
+
+@lazy_property
+def delays(self):
+    return DelayHandler.load(self.attributes.get("delays", return_obj=True))
+
+On server start, rehydrate_delays() loads the delays of every object with one
+query, for every Evennia Attribute named NEXTRPI_DELAY_ATTRIBUTE, "delays" by
+default. Delays that became due while the server was down fire in batches of
+NEXTRPI_DELAY_CATCH_UP_BATCH, one batch every
+NEXTRPI_DELAY_CATCH_UP_INTERVAL seconds, oldest first, rather than all at
+once. Delays whose callback is no longer registered, e.g. after it was
+renamed, are logged and dropped rather than stopping the load. Call
+DelayHandler.unload() when an object is deleted, so its delays
+are cancelled and its handler is released.
+
+Cooldowns that only need an "is it ready" check are cheaper as a
+CooldownHandler, see cooldown_handler.py.
+"""
+import time
+from functools import partial
+from evennia.utils import logger
+from callbacks import CallbackRegistryException
 from delay import Delay
 
+# Evennia Attribute id: DelayHandler loaded for it
+_LOADED = {}
+
 
 class DelayHandlerException(Exception):
     def __init__(self, msg):
         super(DelayHandlerException, self).__init__(msg)
+        self.msg = msg
 
 
 class DelayHandler(object):
 
-    def __init__(self, attrobj):
+    def __init__(self, attrobj, wheel=None):
         """
         Arguments:
         attrobj (Evennia Attribute obj ref) - reference to the Evennia Attribute
                                               object that we use to persist
                                               delays across reload/restarts
+        wheel (TimingWheel or None) - timing wheel to schedule delays on,
+                                      instead of the reactor
         """
         self.delays = {}
         self.attrobj = attrobj
+        self.wheel = wheel
+
+    @classmethod
+    def load(cls, attrobj, wheel=None):
+        """Get the handler for an Evennia Attribute, loading its delays the
+        first time.
+
+        Arguments:
+        attrobj (Evennia Attribute obj ref) - Attribute the delays are
+                                              persisted in
+        wheel (TimingWheel or None) - timing wheel to schedule delays on
+
+        Returns: DelayHandler
+        """
+        key = getattr(attrobj, 'id', None)
+        handler = _LOADED.get(key) if key is not None else None
+        if handler is None:
+            handler = cls(attrobj, wheel)
+            handler.load_delays()
+            if key is not None:
+                _LOADED[key] = handler
+        elif wheel is not None and handler.wheel is not wheel:
+            handler.use_wheel(wheel)
+        return handler
+
+    @classmethod
+    def unload(cls, attrobj):
+        """Cancel the delays of an Evennia Attribute and forget its handler,
+        e.g. when the object it is on is deleted.
+
+        Arguments:
+        attrobj (Evennia Attribute obj ref or None) - Attribute the delays are
+                                                      persisted in
+
+        Returns: None
+        """
+        handler = _LOADED.pop(getattr(attrobj, 'id', None), None)
+        if handler is None:
+            return
+        for delay in handler.delays.values():
+            if delay.is_active():
+                delay.cancel()
+        handler.delays.clear()
+
+    def use_wheel(self, wheel):
+        """Schedule every pending delay, and any added later, on a timing
+        wheel instead.
+
+        Arguments:
+        wheel (TimingWheel or None) - timing wheel, or None for the reactor
+
+        Returns: None
+        """
+        self.wheel = wheel
+        for name, delay in list(self.delays.items()):
+            if not delay.is_active():
+                continue
+            delay.cancel()
+            self._track(name, Delay(fire_at=delay.get_time(),
+                                    callback=delay.callback,
+                                    retval=delay.retval, wheel=wheel))
 
     def add(self, name, **kwargs):
         """Add a delay with the specified name and constructor kwargs.
@@ -35,10 +127,11 @@ class DelayHandler(object):
         name (string) - name of the delay
         kwargs (dict) - constructor args for Delay
         """
-        if not self.delays.get(name, None):
+        if self.delays.get(name, None):
             raise DelayHandlerException("delay with name: {} already exists, "
                                         "add failed".format(name))
-        self.delays[name] = Delay(**kwargs)
+        kwargs.setdefault('wheel', self.wheel)
+        self._track(name, Delay(**kwargs))
 
     def get(self, name, default=None):
         """Get a delay with the specified name.
@@ -81,6 +174,21 @@ class DelayHandler(object):
         """
         return dict(self.delays)
 
+    def _track(self, name, delay):
+        """Keep a delay, forgetting it again once it fires."""
+        delay.on_fired = partial(self._fired, name, delay)
+        self.delays[name] = delay
+
+    def _fired(self, name, delay):
+        if self.delays.get(name) is delay:
+            del self.delays[name]
+            # called from the reactor, where nobody can handle the error
+            try:
+                self.save()
+            except CallbackRegistryException:
+                logger.log_trace("could not save delays of {}".format(
+                                 self.attrobj))
+
     def _serialize(self):
         """Save current delays in a serialized format.
 
@@ -89,7 +197,7 @@ class DelayHandler(object):
         Returns: dict (string: dict of delay constructor args)
         """
         serialized = {}
-        for name, delay in self.delays.iteritems():
+        for name, delay in self.delays.items():
             serialized[name] = delay.serialize()
         return serialized
 
@@ -111,7 +219,7 @@ class DelayHandler(object):
 
         Returns: None
         """
-        for name, delay in self.delays.iteritems():
+        for name in list(self.delays):
             self.remove(name)
         self.save()
 
@@ -122,17 +230,73 @@ class DelayHandler(object):
 
         Returns: None
         """
-        for name, delay in self.delays.iteritems():
+        for name, delay in list(self.delays.items()):
             if not delay.is_active():
                 del self.delays[name]
 
-    def load_delays(self):
+    def load_delays(self, catch_up=None):
         """Load all serialized delays on the handler.
 
-        Arguments: None
+        Arguments:
+        catch_up (list or None) - if given, delays that are already due are
+                                  not scheduled but appended to it, as
+                                  (fire_at, handler, name, kwargs) tuples, to
+                                  be scheduled by the caller
 
         Returns: None
         """
-        serialized = self.attrobj.value
-        for name, kwargs in serialized:
-            self.delays[name] = Delay(**kwargs)
+        serialized = self.attrobj.value or {}
+        now = time.time()
+        for name, kwargs in serialized.items():
+            fire_at = kwargs.get('fire_at')
+            if catch_up is not None and fire_at is not None and fire_at <= now:
+                catch_up.append((fire_at, self, name, kwargs))
+                continue
+            self._restore(name, kwargs)
+
+    def _restore(self, name, kwargs):
+        """Schedule a serialized delay, dropping it if its callback is no
+        longer registered.
+
+        Arguments:
+        name (string) - name of the delay
+        kwargs (dict) - serialized delay constructor args
+
+        Returns: None
+        """
+        try:
+            delay = Delay(wheel=self.wheel, **kwargs)
+        except CallbackRegistryException as err:
+            logger.log_err("dropped delay {} of {}: {}".format(
+                           name, self.attrobj, err.msg))
+            return
+        self._track(name, delay)
+
+
+def rehydrate_delays(attributes, batch_size=50, interval=1):
+    """Load the delays of every given Evennia Attribute, firing the delays
+    that are already due in batches.
+
+    Arguments:
+    attributes (iterable) - Evennia Attributes delays are persisted in,
+                            typically the result of a single query
+    batch_size (int) - most overdue delays fired at once
+    interval (int or float) - seconds between batches of overdue delays
+
+    Returns: int - number of overdue delays scheduled to catch up
+    """
+    catch_up = []
+    for attrobj in attributes:
+        key = getattr(attrobj, 'id', None)
+        if key is not None and key in _LOADED:
+            continue
+        handler = DelayHandler(attrobj)
+        handler.load_delays(catch_up)
+        if key is not None:
+            _LOADED[key] = handler
+    catch_up.sort(key=lambda entry: entry[0])
+    for index, (fire_at, handler, name, kwargs) in enumerate(catch_up):
+        kwargs = dict(kwargs, fire_at=None,
+                      delay_in_seconds=(index // batch_size) * interval)
+        handler._restore(name, kwargs)
+    return len(catch_up)
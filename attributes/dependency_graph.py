@@ -0,0 +1,105 @@
+"""
+DependencyGraph is a directed acyclic graph of attribute names, where an edge
+runs from each input attribute to the derived attribute computed from it.
+
+It answers which derived attributes are affected by a change to an input, in
+the topological order they must be recomputed in, and refuses any edge that
+would introduce a cycle.
+"""
+
+
+class DependencyCycleError(Exception):
+    def __init__(self, msg):
+        super(DependencyCycleError, self).__init__(msg)
+        self.msg = msg
+
+
+class DependencyGraph(object):
+    """
+    Properties:
+    inputs (dict) - node: tuple of input nodes, for every derived node
+    dependents (dict) - node: set of nodes derived directly from it
+    """
+    def __init__(self):
+        self.inputs = {}
+        self.dependents = {}
+
+    def add(self, node, inputs):
+        """Make a node derived from the given inputs.
+
+        Any inputs the node was previously derived from are replaced.
+
+        Arguments:
+        node (string) - name of the derived node
+        inputs (iterable) - names of the nodes it is computed from
+
+        Returns: None
+
+        Raises: DependencyCycleError if the edges would introduce a cycle
+        """
+        inputs = tuple(inputs)
+        previous = self.inputs.get(node)
+        self.remove(node)
+        reachable = self._reachable(node)
+        cycle = [name for name in inputs if name == node or name in reachable]
+        if cycle:
+            if previous is not None:
+                self._link(node, previous)
+            raise DependencyCycleError("deriving {} from {} would create a "
+                                       "cycle".format(node, cycle[0]))
+        self._link(node, inputs)
+
+    def remove(self, node):
+        """Stop deriving a node from its inputs.
+
+        Arguments:
+        node (string) - name of the derived node
+
+        Returns: None
+        """
+        for name in self.inputs.pop(node, ()):
+            dependents = self.dependents[name]
+            dependents.discard(node)
+            if not dependents:
+                del self.dependents[name]
+
+    def downstream(self, node):
+        """Get every node affected by a change to a node, in the order they
+        must be recomputed.
+
+        Arguments:
+        node (string) - name of the changed node
+
+        Returns: List[string]
+        """
+        order = []
+        visited = set([node])
+        # iterative depth first search, emitting nodes in post-order
+        stack = [(node, iter(self.dependents.get(node, ())))]
+        while stack:
+            current, children = stack[-1]
+            for child in children:
+                if child not in visited:
+                    visited.add(child)
+                    stack.append((child, iter(self.dependents.get(child, ()))))
+                    break
+            else:
+                stack.pop()
+                if current != node:
+                    order.append(current)
+        order.reverse()
+        return order
+
+    def _link(self, node, inputs):
+        self.inputs[node] = inputs
+        for name in inputs:
+            self.dependents.setdefault(name, set()).add(node)
+
+    def _reachable(self, node):
+        return set(self.downstream(node))
+
+    def __contains__(self, node):
+        return node in self.inputs
+
+    def __len__(self):
+        return len(self.inputs)
@@ -0,0 +1,147 @@
+"""
+ResourceEventLog is a fixed size ring buffer of changes to the resources of a
+ResourceHandler, kept for combat analytics such as "why did this character
+die" or "what was the damage per second in this fight".
+
+Each event is a (timestamp, resource name, delta, source dbref) tuple. Events
+are stored column-wise in preallocated arrays, so recording one allocates no
+objects, and once the log is full the oldest event is overwritten. The log
+lives in memory only and is never saved with the handler.
+
+Example:
+
+handler.enable_event_log(capacity=512)
+handler.spend({"health": 12}, source=attacker.id)
+handler.event_log.sum_by_source(resource="health")  # {attacker.id: -12}
+"""
+from array import array
+
+# stored in place of a missing source dbref
+_NO_SOURCE = -1
+
+
+class ResourceEventLog(object):
+    """
+    Properties:
+    capacity (int) - most events kept, older ones are overwritten
+    recorded (int) - number of events ever recorded
+    """
+    def __init__(self, capacity=256):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self.recorded = 0
+        self._timestamps = array('d', [0.0]) * capacity
+        self._deltas = array('d', [0.0]) * capacity
+        self._resources = array('H', [0]) * capacity
+        self._sources = array('l', [_NO_SOURCE]) * capacity
+        # resource names are stored as an index into this list
+        self._names = []
+        self._name_index = {}
+
+    def record(self, timestamp, resource, delta, source=None):
+        """Record a change to a resource, overwriting the oldest event if the
+        log is full.
+
+        Arguments:
+        timestamp (float) - time of the change
+        resource (string) - name of the resource
+        delta (number) - change to the current value
+        source (int) - dbref id of the Object that caused the change
+
+        Returns: None
+        """
+        index = self._name_index.get(resource)
+        if index is None:
+            index = len(self._names)
+            self._name_index[resource] = index
+            self._names.append(resource)
+        slot = self.recorded % self.capacity
+        self._timestamps[slot] = timestamp
+        self._deltas[slot] = delta
+        self._resources[slot] = index
+        self._sources[slot] = _NO_SOURCE if source is None else source
+        self.recorded += 1
+
+    def events(self, resource=None, since=None):
+        """Get the events in the log, oldest first.
+
+        Arguments:
+        resource (string) - only events of this resource
+        since (float) - only events at or after this timestamp
+
+        Returns: generator of tuple(float, string, float, int or None)
+        """
+        for slot in self._slots(resource, since):
+            source = self._sources[slot]
+            if source == _NO_SOURCE:
+                source = None
+            yield (self._timestamps[slot], self._names[self._resources[slot]],
+                   self._deltas[slot], source)
+
+    def sum_by_source(self, resource=None, since=None):
+        """Sum the deltas of the events in the log by their source.
+
+        Arguments:
+        resource (string) - only events of this resource
+        since (float) - only events at or after this timestamp
+
+        Returns: dict - source dbref (None if unknown): sum of deltas
+        """
+        totals = {}
+        for slot in self._slots(resource, since):
+            source = self._sources[slot]
+            if source == _NO_SOURCE:
+                source = None
+            totals[source] = totals.get(source, 0) + self._deltas[slot]
+        return totals
+
+    def rate(self, window, now, resource=None, source=None):
+        """Get the average change per second over a window of time.
+
+        Arguments:
+        window (float) - length of the window in seconds, ending at now
+        now (float) - end of the window
+        resource (string) - only events of this resource
+        source (int) - only events caused by this dbref
+
+        Returns: float
+        """
+        if window <= 0:
+            raise ValueError("window must be positive")
+        total = 0
+        for slot in self._slots(resource, now - window):
+            if (self._timestamps[slot] <= now
+                    and (source is None or self._sources[slot] == source)):
+                total += self._deltas[slot]
+        return total / float(window)
+
+    def clear(self):
+        """Forget every event.
+
+        Arguments: None
+
+        Returns: None
+        """
+        self.recorded = 0
+        self._names = []
+        self._name_index = {}
+
+    def _slots(self, resource, since):
+        """Yield the slots of matching events, oldest first."""
+        if resource is not None:
+            index = self._name_index.get(resource)
+            if index is None:
+                return
+        count = len(self)
+        start = self.recorded - count
+        for position in range(start, start + count):
+            slot = position % self.capacity
+            if resource is not None and self._resources[slot] != index:
+                continue
+            if since is not None and self._timestamps[slot] < since:
+                continue
+            yield slot
+
+    def __len__(self):
+        return min(self.recorded, self.capacity)
@@ -1,7 +1,34 @@
 """
 Modifiers store information that can modify an attribute, and also its origin.
+
+Modifiers are compact, slotted records. The operator is stored as a small
+integer code on the class rather than being dispatched polymorphically, and
+desc and typeclass strings are shared through a flyweight table so thousands
+of modifiers named "justice aura" hold a single string between them.
 """
 
+OP_ADD = 0
+OP_SUB = 1
+OP_MUL = 2
+
+OPERATORS = ("+", "-", "*")
+
+# flyweight table for desc and typeclass strings
+_SHARED_STRINGS = {}
+
+
+def share_string(string):
+    """Return the shared instance of a desc or typeclass string.
+
+    Arguments:
+    string (string or None) - string to share
+
+    Returns: string or None
+    """
+    if string is None:
+        return None
+    return _SHARED_STRINGS.setdefault(string, string)
+
 
 class Modifier(object):
     """
@@ -11,12 +38,23 @@ class Modifier(object):
     val (number) - value of the modifier
     dbref (int) - dbref id of the Object that this modifier originated from
     typeclass (string) - either "Object", "Player", "Script"
+    id (int or None) - id assigned by the ModifierHandler storing the modifier
+    expires_at (float or None) - timestamp the modifier expires at, or None if
+                                 it never expires
+    op_code (int or None) - OP_ADD, OP_SUB or OP_MUL, set per subclass
     """
-    def __init__(self, desc="unknown", val=0, dbref=None, typeclass=None):
-        self.desc = desc
+    __slots__ = ('desc', 'val', 'dbref', 'typeclass', 'id', 'expires_at')
+
+    op_code = None
+
+    def __init__(self, desc="unknown", val=0, dbref=None, typeclass=None,
+                 expires_at=None):
+        self.desc = share_string(desc)
         self.val = val
         self.dbref = dbref
-        self.typeclass = typeclass
+        self.typeclass = share_string(typeclass)
+        self.id = None
+        self.expires_at = expires_at
 
     def get_modified_val(self, other):
         """Calculate modified value.
@@ -26,7 +64,13 @@ class Modifier(object):
 
         Returns: Number
         """
-        pass
+        op_code = self.op_code
+        if op_code == OP_ADD:
+            return other + self.val
+        if op_code == OP_SUB:
+            return other - self.val
+        if op_code == OP_MUL:
+            return other * self.val
 
     def serialize(self):
         """Serialize for storage.
@@ -35,21 +79,42 @@ class Modifier(object):
 
         Returns: dict
         """
-        return {
+        serialized = {
                 "desc": self.desc,
                 "val": self.val,
                 "operator": self.operator,
                 "dbref": self.dbref,
                 "typeclass": self.typeclass
         }
+        if self.expires_at is not None:
+            serialized["expires_at"] = self.expires_at
+        return serialized
 
     @property
     def operator(self):
-        return "undefined"
+        if self.op_code is None:
+            return "undefined"
+        return OPERATORS[self.op_code]
+
+    def __getstate__(self):
+        return (self.desc, self.val, self.dbref, self.typeclass, self.id,
+                self.expires_at)
+
+    def __setstate__(self, state):
+        if isinstance(state, dict):
+            # pickled before modifiers were slotted
+            state = (state.get('desc'), state.get('val'), state.get('dbref'),
+                     state.get('typeclass'), state.get('id'))
+        if len(state) == 5:
+            # pickled before modifiers could expire
+            state = tuple(state) + (None,)
+        desc, self.val, self.dbref, typeclass, self.id, self.expires_at = state
+        self.desc = share_string(desc)
+        self.typeclass = share_string(typeclass)
 
     def __eq__(self, other):
         return (isinstance(other, self.__class__)
-            and self.__dict__ == other.__dict__)
+            and self.serialize() == other.serialize())
 
     def __ne__(self, other):
         return not self.__eq__(other)
@@ -58,7 +123,8 @@ class Modifier(object):
         return str(self.serialize())
 
     def __repr__(self):
-        return str(self.__dict__)
+        return str(dict((slot, getattr(self, slot))
+                        for slot in self.__slots__))
 
     def factory(**kwargs):
         """Factory method to instantiate the correct Modifier.
@@ -69,51 +135,33 @@ class Modifier(object):
         """
         op = kwargs.get("operator")
         del kwargs['operator']
-        if op == "+":
-            return AddModifier(**kwargs)
-        if op == "-":
-            return SubtractModifier(**kwargs)
-        if op == "*":
-            return MultiplyModifier(**kwargs)
-        assert 0, "Bad Modifier creation: '{}'".format(op)
+        cls = _MODIFIER_CLASSES.get(op)
+        assert cls, "Bad Modifier creation: '{}'".format(op)
+        return cls(**kwargs)
 
     factory = staticmethod(factory)
 
 
 class AddModifier(Modifier):
+    __slots__ = ()
 
-    def __init__(self, **kwargs):
-        super(AddModifier, self).__init__(**kwargs)
-
-    def get_modified_val(self, other):
-        return other + self.val
-
-    @property
-    def operator(self):
-        return "+"
+    op_code = OP_ADD
 
 
 class SubtractModifier(Modifier):
+    __slots__ = ()
 
-    def __init__(self, **kwargs):
-        super(SubtractModifier, self).__init__(**kwargs)
-
-    def get_modified_val(self, other):
-        return other - self.val
-
-    @property
-    def operator(self):
-        return "-"
+    op_code = OP_SUB
 
 
 class MultiplyModifier(Modifier):
+    __slots__ = ()
 
-    def __init__(self, **kwargs):
-        super(MultiplyModifier, self).__init__(**kwargs)
+    op_code = OP_MUL
 
-    def get_modified_val(self, other):
-        return other * self.val
 
-    @property
-    def operator(self):
-        return "*"
+_MODIFIER_CLASSES = {
+    "+": AddModifier,
+    "-": SubtractModifier,
+    "*": MultiplyModifier,
+}
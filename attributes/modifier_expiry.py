@@ -0,0 +1,98 @@
+"""
+ModifierExpiry is the world-wide schedule of timed modifiers, those added with
+an expires_at timestamp or a duration.
+
+Rather than one reactor timer per modifier, every timed modifier in the game
+is pushed onto a single min-heap, and a periodic sweep pops everything that is
+due and removes it from its handler, saving each affected attribute once. The
+sweep is run by a service started from server/conf/server_services_plugins.py.
+
+Handlers also keep a heap of their own and drop expired modifiers whenever
+they are read, so a buff never outlives its expiry between sweeps. Expiry
+times are wall clock timestamps stored with the modifier, so they survive
+reloads: handlers reschedule their timed modifiers when unpickled.
+
+Handlers are held by weak reference, as in modifier_index.py. Entries of
+modifiers removed early, or of handlers since collected, are skipped when due.
+
+Example:
+
+attr.add_mod(desc="war cry", val=5, operator="+", duration=30)
+
+Configure the sweep interval in your settings file:
+
+NEXTRPI_MODIFIER_SWEEP_INTERVAL = 1  # seconds between sweeps
+"""
+import heapq
+import itertools
+import time
+import weakref
+from save_wrapper import is_persisted, save
+
+
+class ModifierExpiry(object):
+    """
+    Properties:
+    swept (int) - number of modifiers removed by sweeps
+    """
+    def __init__(self):
+        self._heap = []
+        self._counter = itertools.count()
+        self.swept = 0
+
+    def schedule(self, handler, modifier):
+        """Schedule a timed modifier to be removed from its handler.
+
+        Arguments:
+        handler (ModifierHandler) - handler holding the modifier
+        modifier (Modifier) - modifier with an id and expires_at assigned
+
+        Returns: None
+        """
+        # the counter breaks ties so handler references are never compared
+        heapq.heappush(self._heap, (modifier.expires_at, next(self._counter),
+                                    weakref.ref(handler)))
+
+    def next_expiry(self):
+        """Get the timestamp the next scheduled modifier expires at.
+
+        Arguments: None
+
+        Returns: float or None if nothing is scheduled
+        """
+        return self._heap[0][0] if self._heap else None
+
+    def sweep(self, now=None):
+        """Remove every modifier that has expired, from all handlers.
+
+        Each affected attribute is saved once.
+
+        Arguments:
+        now (float) - current timestamp, defaults to time.time()
+
+        Returns: int - number of modifiers removed
+        """
+        if now is None:
+            now = time.time()
+        heap = self._heap
+        due = {}
+        while heap and heap[0][0] <= now:
+            handler = heapq.heappop(heap)[2]()
+            if handler is not None:
+                due[id(handler)] = handler
+        removed = 0
+        for handler in due.values():
+            expired = handler.expire(now)
+            if not expired:
+                continue
+            removed += expired
+            if is_persisted(handler.owner):
+                save(handler.owner)
+        self.swept += removed
+        return removed
+
+    def __len__(self):
+        return len(self._heap)
+
+
+MODIFIER_EXPIRY = ModifierExpiry()
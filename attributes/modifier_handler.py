@@ -1,32 +1,291 @@
 """
 ModifierHandler manages the modifiers on a given attribute, conveniently storing, adding, removing, and calculating the final modified result based on all the modifiers stored.
 """
-from modifier import Modifier
+import heapq
+import time
+from collections import OrderedDict
+from numbers import Integral
+from modifier import Modifier, OP_ADD, OP_SUB, OP_MUL
+from modifier_expiry import MODIFIER_EXPIRY
+from modifier_index import MODIFIER_INDEX
+from stacking import STACKING_POLICIES, Stack
+
+
+def is_tracked(raw_mod):
+    """Check whether a serialized modifier is tracked by a world-wide index.
+
+    Modifiers from a source object are tracked by MODIFIER_INDEX, and timed
+    modifiers by MODIFIER_EXPIRY. Handlers that load lazily build attributes
+    holding such modifiers straight away, so they are tracked.
+
+    Arguments:
+    raw_mod (dict) - serialized modifier
+
+    Returns: boolean
+    """
+    return (raw_mod.get('dbref') is not None
+            or raw_mod.get('expires_at') is not None)
 
 
 class ModifierHandler(object):
+    """
+    Properties:
+    modifiers (dict) - desc: List[Modifier] mappings of all modifiers
+    owner (Attribute or None) - attribute this handler modifies, notified
+                                whenever the modifiers change
+    cache_hits (int) - number of modified value reads served from the cache
+    cache_misses (int) - number of modified value reads that were recalculated
+
+    Modifiers are treated as immutable once added; to change a modifier,
+    remove it and add a new one so any cached values are invalidated.
+
+    The product of all multiplicative modifiers and the sum of all additive
+    and subtractive modifiers are kept up to date as modifiers are added and
+    removed, so resolving the modified value does not depend on how many
+    modifiers are stacked on the attribute. Modifiers of a desc with a
+    stacking policy, see stacking.py, contribute through their stack.
 
-    def __init__(self, raw_modifiers):
-        self.modifiers = {}
-        self._raw_modifiers = []
+    Timed modifiers are kept in a heap ordered by expiry, checked whenever the
+    handler is read, and also scheduled with MODIFIER_EXPIRY to be swept.
+    """
+
+    def __init__(self, raw_modifiers, owner=None):
+        # id: Modifier, in insertion order, plus secondary indexes mapping
+        # desc, dbref and typeclass to the ids of matching modifiers
+        self._mods = OrderedDict()
+        self._by_desc = {}
+        self._by_dbref = {}
+        self._by_typeclass = {}
+        self._next_id = 0
+        # (expires_at, id) heap of the timed modifiers
+        self._expiry = []
+        self.owner = owner
+        self._cached_base = None
+        self._cached_val = None
+        self._dirty = True
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._reset_aggregates()
 
         for raw_mod in raw_modifiers:
-            self.add(**raw_mod)
+            # modifiers of sources deleted while this was not loaded
+            if not MODIFIER_INDEX.is_purged(raw_mod.get('dbref'),
+                                            raw_mod.get('typeclass')):
+                self.add(**raw_mod)
+
+    def _changed(self):
+        """Invalidate cached values after the modifiers changed.
+
+        Arguments: None
+
+        Returns: None
+        """
+        self._dirty = True
+        if self.owner is not None:
+            self.owner._invalidate()
+
+    def _reset_aggregates(self):
+        """Reset the running aggregates to the identity values.
+
+        Arguments: None
+
+        Returns: None
+        """
+        # zero multipliers are counted rather than folded into the product so
+        # that removing them never requires a division by zero
+        self._mul_product = 1
+        self._mul_count = 0
+        self._mul_zeros = 0
+        self._add_sum = 0
+        # (desc, op_code): Stack of the modifiers with a stacking policy
+        self._stacks = {}
+        self._policy_version = STACKING_POLICIES.version
+
+    def _check_policies(self):
+        """Restack every modifier if a stacking policy changed since the
+        aggregates were built, so adding and removing modifiers always use
+        the same grouping.
+
+        Arguments: None
+
+        Returns: None
+        """
+        if self._policy_version == STACKING_POLICIES.version:
+            return
+        self._reset_aggregates()
+        for modifier in self._mods.values():
+            self._aggregate(modifier)
+        self._changed()
+
+    def _aggregate(self, modifier):
+        """Fold a newly added modifier into the running aggregates.
+
+        Modifiers of a desc with a stacking policy are folded in through their
+        stack, as the change to the value the stack applies.
+
+        Arguments:
+        modifier (Modifier) - modifier that was added
+
+        Returns: None
+        """
+        policy = STACKING_POLICIES.get(modifier.desc)
+        if not policy.grouped:
+            self._fold(modifier.op_code, modifier.val)
+            return
+        key = (modifier.desc, modifier.op_code)
+        stack = self._stacks.get(key)
+        if stack is None:
+            stack = self._stacks[key] = Stack(policy, modifier.op_code)
+        else:
+            self._unfold(stack.op_code, stack.effect())
+        stack.add(modifier)
+        self._fold(stack.op_code, stack.effect())
+
+    def _disaggregate(self, modifier):
+        """Take a removed modifier back out of the running aggregates.
+
+        Arguments:
+        modifier (Modifier) - modifier that was removed
+
+        Returns: None
+        """
+        key = (modifier.desc, modifier.op_code)
+        stack = self._stacks.get(key)
+        if stack is None:
+            self._unfold(modifier.op_code, modifier.val)
+        else:
+            self._unfold(stack.op_code, stack.effect())
+            stack.remove(modifier)
+            if stack:
+                self._fold(stack.op_code, stack.effect())
+            else:
+                del self._stacks[key]
+        if not self._mods:
+            # drop any floating point drift once the last one is gone
+            self._add_sum = 0
+
+    def _fold(self, op_code, val):
+        """Add a value applied with an operator to the running aggregates.
+
+        Arguments:
+        op_code (int) - OP_ADD, OP_SUB or OP_MUL
+        val (number) - value applied
+
+        Returns: None
+        """
+        if op_code == OP_MUL:
+            self._mul_count += 1
+            if val == 0:
+                self._mul_zeros += 1
+            else:
+                self._mul_product *= val
+        elif op_code == OP_ADD:
+            self._add_sum += val
+        elif op_code == OP_SUB:
+            self._add_sum -= val
+
+    def _unfold(self, op_code, val):
+        """Take a value applied with an operator out of the running
+        aggregates.
+
+        Arguments:
+        op_code (int) - OP_ADD, OP_SUB or OP_MUL
+        val (number) - value applied
+
+        Returns: None
+        """
+        if op_code == OP_MUL:
+            self._mul_count -= 1
+            if val == 0:
+                self._mul_zeros -= 1
+            elif (isinstance(self._mul_product, Integral)
+                    and isinstance(val, Integral)):
+                self._mul_product //= val
+            else:
+                self._mul_product /= val
+            if not self._mul_count:
+                # drop any floating point drift once the last one is gone
+                self._mul_product = 1
+        elif op_code == OP_ADD:
+            self._add_sum -= val
+        elif op_code == OP_SUB:
+            self._add_sum += val
 
     def add(self, **raw_mod):
         """Add a modifier to the modifier handler. 
 
         Arguments:
-        raw_mod (kwargs) - constructor arguments for Modifier
+        raw_mod (kwargs) - constructor arguments for Modifier, plus an
+                           optional duration in seconds from now, instead of
+                           an expires_at timestamp
 
-        Returns: None
+        Returns: Modifier
         """
-        mod_desc = raw_mod["desc"]
-        if not self.modifiers.get(mod_desc):
-            self.modifiers[mod_desc] = []
+        duration = raw_mod.pop('duration', None)
+        if duration is not None:
+            raw_mod['expires_at'] = time.time() + duration
         new_mod = Modifier.factory(**raw_mod)
-        self.modifiers[mod_desc].append(new_mod)
-        self._raw_modifiers.append(new_mod)
+        self._check_policies()
+        new_mod.id = self._next_id
+        self._next_id += 1
+        self._index(new_mod)
+        self._aggregate(new_mod)
+        self._schedule(new_mod)
+        self._changed()
+        return new_mod
+
+    def _schedule(self, modifier):
+        """Schedule a timed modifier to expire.
+
+        Arguments:
+        modifier (Modifier) - stored modifier
+
+        Returns: None
+        """
+        if modifier.expires_at is None:
+            return
+        heapq.heappush(self._expiry, (modifier.expires_at, modifier.id))
+        MODIFIER_EXPIRY.schedule(self, modifier)
+
+    def expire(self, now=None):
+        """Remove every modifier that has expired.
+
+        Arguments:
+        now (float) - current timestamp, defaults to time.time()
+
+        Returns: int - number of modifiers removed
+        """
+        expiry = self._expiry
+        if not expiry:
+            return 0
+        self._check_policies()
+        if now is None:
+            now = time.time()
+        removed = 0
+        while expiry and expiry[0][0] <= now:
+            mod_id = heapq.heappop(expiry)[1]
+            modifier = self._mods.get(mod_id)
+            # modifiers removed before they expired leave their entry behind
+            if modifier is not None:
+                self._unindex(modifier)
+                self._disaggregate(modifier)
+                removed += 1
+        if removed:
+            self._changed()
+        return removed
+
+    def _check_expiry(self):
+        """Remove expired modifiers, and restack after stacking policy
+        changes, before the handler is read.
+
+        Arguments: None
+
+        Returns: None
+        """
+        self._check_policies()
+        expiry = self._expiry
+        if expiry and expiry[0][0] <= time.time():
+            self.expire()
 
     def remove(self, modifier):
         """Remove a modifier to the modifier handler.
@@ -36,22 +295,99 @@ class ModifierHandler(object):
 
         Returns: None
         """
-        try:
-            self._raw_modifiers.remove(modifier)
-        except:
+        mod_id = self._find_id(modifier)
+        if mod_id is None:
             raise AttributeError("could not find modifier {}".format(modifier))
-        mod_desc = modifier.desc
-        for mod in self.modifiers[mod_desc]:
-            if modifier == mod:
-                self.modifiers[mod_desc].remove(modifier)
-                return
+        self.remove_id(mod_id)
+
+    def remove_id(self, mod_id):
+        """Remove the modifier stored under the given id.
+
+        Arguments:
+        mod_id (int) - id assigned to the modifier when it was added
+
+        Returns: Modifier
+        """
+        modifier = self._mods.get(mod_id)
+        if modifier is None:
+            raise AttributeError("could not find modifier id {}".format(mod_id))
+        self._check_policies()
+        self._unindex(modifier)
+        self._disaggregate(modifier)
+        self._changed()
+        return modifier
+
+    def _find_id(self, modifier):
+        """Find the id of a stored modifier.
+
+        The modifier's own id is used when it is the stored instance, otherwise
+        fall back to the first stored modifier with the same desc that compares
+        equal to it.
+
+        Arguments:
+        modifier (Modifier) - modifier to look up
+
+        Returns: int or None
+        """
+        mod_id = getattr(modifier, 'id', None)
+        if self._mods.get(mod_id) is modifier:
+            return mod_id
+        for mod_id, candidate in self._by_desc.get(modifier.desc, {}).items():
+            if candidate == modifier:
+                return mod_id
+        return None
+
+    def _index(self, modifier):
+        """Store a modifier and add it to every secondary index.
+
+        Arguments:
+        modifier (Modifier) - modifier with an id assigned
+
+        Returns: None
+        """
+        mod_id = modifier.id
+        self._mods[mod_id] = modifier
+        self._by_desc.setdefault(modifier.desc, OrderedDict())[mod_id] = modifier
+        self._by_dbref.setdefault(modifier.dbref, set()).add(mod_id)
+        self._by_typeclass.setdefault(modifier.typeclass, set()).add(mod_id)
+        MODIFIER_INDEX.register(self, modifier)
+
+    def _unindex(self, modifier):
+        """Drop a modifier from the store and every secondary index.
+
+        Arguments:
+        modifier (Modifier) - stored modifier
+
+        Returns: None
+        """
+        mod_id = modifier.id
+        del self._mods[mod_id]
+        for index, key in ((self._by_desc, modifier.desc),
+                           (self._by_dbref, modifier.dbref),
+                           (self._by_typeclass, modifier.typeclass)):
+            bucket = index[key]
+            if isinstance(bucket, set):
+                bucket.discard(mod_id)
+            else:
+                del bucket[mod_id]
+            if not bucket:
+                del index[key]
+        MODIFIER_INDEX.unregister(self, modifier)
+
+    @property
+    def modifiers(self):
+        """desc: List[Modifier] mappings of all modifiers on the attribute."""
+        self._check_expiry()
+        return dict((desc, list(mods.values()))
+                    for desc, mods in self._by_desc.items())
 
     def get(self, desc, **filters):
         """Get a modifier matching the desc and any additional filters.
 
         This will return the first candidate that matches the desc and all
         additional filters. Additional filters will attempt to match
-        modifier.filter_key == filter_val.
+        modifier.filter_key == filter_val. The dbref and typeclass filters are
+        answered from their indexes, any other filter is checked per candidate.
 
         Arguments:
         desc (string) - description of modifier
@@ -61,14 +397,30 @@ class ModifierHandler(object):
 
         Example: self.get("caffeine addiction", dbref=3, typeclass="Medicine")
         """
-        found = True
-        for candidate in self.modifiers[desc]:
+        self._check_expiry()
+        candidates = self._by_desc.get(desc)
+        if not candidates:
+            raise AttributeError("can't find modifier {}".format(desc))
+        filters = dict(filters)
+        indexed = []
+        for filter_attr, index in (('dbref', self._by_dbref),
+                                   ('typeclass', self._by_typeclass)):
+            if filter_attr in filters:
+                indexed.append(index.get(filters.pop(filter_attr), set()))
+        if indexed:
+            indexed.sort(key=len)
+            mod_ids = sorted(mod_id for mod_id in indexed[0]
+                             if mod_id in candidates
+                             and all(mod_id in ids for ids in indexed[1:]))
+        else:
+            mod_ids = candidates.keys()
+        for mod_id in mod_ids:
+            candidate = candidates[mod_id]
             for filter_attr, filter_val in filters.items():
                 if getattr(candidate, filter_attr) != filter_val:
-                    found = False
-            if found:
+                    break
+            else:
                 return candidate
-            found = True
         raise AttributeError("can't find modifier {}".format(desc))
 
     def all(self):
@@ -78,7 +430,8 @@ class ModifierHandler(object):
 
         Returns: List[Modifier]
         """
-        return list(self._raw_modifiers)
+        self._check_expiry()
+        return list(self._mods.values())
 
     def get_modified_val(self, base_val):
         """Get the calculated modified value based on existing modifiers.
@@ -88,29 +441,46 @@ class ModifierHandler(object):
 
         Returns: Number
         """
-        mods = self.all()
+        self._check_expiry()
+        if not self._dirty and base_val == self._cached_base:
+            self.cache_hits += 1
+            return self._cached_val
+        self.cache_misses += 1
         res = self._resolve_modified_val(base_val)
+        self._cached_base = base_val
+        self._cached_val = res
+        self._dirty = False
         return res
 
     def _resolve_modified_val(self, base_val):
         """Resolve order of operations for modifier parameters.
 
-        Return the modified value based on order of operations of the modifiers.
+        Return the modified value based on order of operations of the modifiers:
+        all multiplications first, then all additions and subtractions.
 
         Arguments:
         base_val (number) - base value we are modifying
 
         Returns: Number
         """
-        modifiers = self.all()
-        mul_div_ops = [mod for mod in modifiers if mod.operator in ["*","/"]]
-        add_sub_ops = [mod for mod in modifiers if mod.operator in ["+", "-"]]
-        res = base_val
-        for mod in mul_div_ops:
-            res = mod.get_modified_val(res)
-        for mod in add_sub_ops:
-            res = mod.get_modified_val(res)
-        return res
+        multiplier, addend = self.aggregates()
+        return base_val * multiplier + addend
+
+    def aggregates(self):
+        """Get the combined multiplier and addend of all modifiers.
+
+        The modified value of a base is base * multiplier + addend.
+
+        Arguments: None
+
+        Returns: tuple(number, number)
+        """
+        self._check_expiry()
+        if self._mul_zeros:
+            return 0, self._add_sum
+        if self._mul_count:
+            return self._mul_product, self._add_sum
+        return 1, self._add_sum
 
     def serialize_all_mods(self):
         """Serialize all modifiers for storage.
@@ -123,12 +493,33 @@ class ModifierHandler(object):
         return [
                 mod.serialize() for mod in mods]
 
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # rebuilt on load, under the stacking policies of the time
+        for key in ('_stacks', '_expiry', '_policy_version'):
+            state.pop(key, None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._expiry = []
+        self._reset_aggregates()
+        self._dirty = True
+        for modifier in list(self._mods.values()):
+            if MODIFIER_INDEX.is_purged(modifier.dbref, modifier.typeclass):
+                self._unindex(modifier)
+        for modifier in self._mods.values():
+            MODIFIER_INDEX.register(self, modifier)
+            self._aggregate(modifier)
+            self._schedule(modifier)
+
     def __len__(self):
-        return len(self._raw_modifiers)
+        self._check_expiry()
+        return len(self._mods)
 
     def __eq__(self, other):
         return (isinstance(other, self.__class__)
-            and self.__dict__ == other.__dict__)
+            and self.all() == other.all())
 
     def __ne__(self, other):
         return not self.__eq__(other)
@@ -0,0 +1,215 @@
+"""
+ModifierIndex keeps a world-wide reverse index from the dbref a modifier
+originated from to every ModifierHandler holding a modifier from that source.
+
+This makes it cheap to strip every modifier an item, spell script or aura has
+applied, without walking the attribute and resource handlers of every
+character in the game. The cost of a purge is proportional to the number of
+modifiers that came from the source.
+
+Handlers register themselves automatically as modifiers are added and
+removed, and again when they are unpickled after a reload. Handlers that are
+not loaded when a source is purged drop its modifiers as they next load,
+using the purged sources remembered since the server started, and
+source_exists, installed at server start, to check for sources deleted
+before that. A source is no longer treated as purged once a modifier from it
+is added again.
+
+The index only holds weak references to handlers. A character that is
+unloaded is collected as usual, and its entries are dropped with it, so the
+index never keeps game objects alive or has to be told about unloads. The
+expiry schedule, see modifier_expiry.py, and the regeneration ticker, see
+regen.py, hold their entries the same way.
+
+Example:
+
+from attributes.modifier_index import MODIFIER_INDEX
+
+# every modifier the sword #1234 applied, as (Attribute, modifier id) pairs
+MODIFIER_INDEX.get(1234)
+
+# drop them all, e.g. when the sword is destroyed
+MODIFIER_INDEX.purge(1234, typeclass="Object")
+"""
+import weakref
+from save_wrapper import is_persisted, save
+
+
+class ModifierIndex(object):
+    """
+    Properties:
+    sources (dict) - dbref: {handler key: set of modifier ids} mappings
+    source_exists (callable or None) - called with a dbref and typeclass,
+                                       returns if the source still exists
+    """
+    def __init__(self):
+        self.sources = {}
+        self.source_exists = None
+        self._handlers = {}
+        self._handler_sources = {}
+        # (dbref, typeclass or None) of every purged source
+        self._purged = set()
+        # (dbref, typeclass): result of source_exists
+        self._checked = {}
+
+    def register(self, handler, modifier):
+        """Record that a handler holds a modifier from the modifier's source.
+
+        Arguments:
+        handler (ModifierHandler) - handler the modifier was added to
+        modifier (Modifier) - modifier with an id assigned
+
+        Returns: None
+        """
+        if modifier.dbref is None:
+            return
+        key = id(handler)
+        if key not in self._handlers:
+            self._handlers[key] = weakref.ref(handler, self._make_cleanup(key))
+            self._handler_sources[key] = set()
+        self.sources.setdefault(modifier.dbref, {}).setdefault(
+                                                key, set()).add(modifier.id)
+        self._handler_sources[key].add(modifier.dbref)
+        if self._purged:
+            # a modifier added from the source again, it exists after all
+            self._revive(modifier.dbref, modifier.typeclass)
+
+    def _revive(self, dbref, typeclass):
+        """Forget that a source was purged.
+
+        Arguments:
+        dbref (int) - dbref id of the source
+        typeclass (string or None) - typeclass of the modifier
+
+        Returns: None
+        """
+        for key in ((dbref, None), (dbref, typeclass)):
+            self._purged.discard(key)
+            self._checked.pop(key, None)
+
+    def unregister(self, handler, modifier):
+        """Forget that a handler holds a modifier.
+
+        Arguments:
+        handler (ModifierHandler) - handler the modifier was removed from
+        modifier (Modifier) - the removed modifier
+
+        Returns: None
+        """
+        if modifier.dbref is None:
+            return
+        key = id(handler)
+        holders = self.sources.get(modifier.dbref, {})
+        mod_ids = holders.get(key)
+        if mod_ids is None:
+            return
+        mod_ids.discard(modifier.id)
+        if not mod_ids:
+            del holders[key]
+            self._handler_sources[key].discard(modifier.dbref)
+        if not holders:
+            del self.sources[modifier.dbref]
+
+    def get(self, dbref, typeclass=None):
+        """Get every modifier that originated from a source.
+
+        Arguments:
+        dbref (int) - dbref id of the source
+        typeclass (string or None) - only match modifiers with this typeclass
+
+        Returns: List[tuple(Attribute, int)] - owning attribute of the handler
+                                               and id of the modifier
+        """
+        return [(handler.owner, mod_id)
+                for handler, mod_id in self._iter_source(dbref, typeclass)]
+
+    def purge(self, dbref, typeclass=None):
+        """Remove every modifier that originated from a source.
+
+        Each affected attribute is saved once, after all of its modifiers from
+        the source are removed.
+
+        Arguments:
+        dbref (int) - dbref id of the source
+        typeclass (string or None) - only remove modifiers with this typeclass
+
+        Returns: int - number of modifiers removed
+        """
+        self._purged.add((dbref, typeclass))
+        self._checked.pop((dbref, typeclass), None)
+        matches = list(self._iter_source(dbref, typeclass))
+        touched = {}
+        for handler, mod_id in matches:
+            handler.remove_id(mod_id)
+            touched[id(handler)] = handler
+        for handler in touched.values():
+            if is_persisted(handler.owner):
+                save(handler.owner)
+        return len(matches)
+
+    def is_purged(self, dbref, typeclass=None):
+        """Check if the source of a modifier was purged or no longer exists.
+
+        Handlers drop such modifiers as they load, so a holder that was not
+        loaded when its source was deleted loses the modifier too.
+
+        Arguments:
+        dbref (int or None) - dbref id of the source
+        typeclass (string or None) - typeclass of the modifier
+
+        Returns: boolean
+        """
+        if dbref is None:
+            return False
+        purged = self._purged
+        if (dbref, None) in purged or (dbref, typeclass) in purged:
+            return True
+        if self.source_exists is None:
+            return False
+        key = (dbref, typeclass)
+        exists = self._checked.get(key)
+        if exists is None:
+            exists = self._checked[key] = bool(self.source_exists(dbref,
+                                                                  typeclass))
+        return not exists
+
+    def _iter_source(self, dbref, typeclass):
+        """Yield (handler, modifier id) pairs for a source.
+
+        Arguments:
+        dbref (int) - dbref id of the source
+        typeclass (string or None) - only yield modifiers with this typeclass
+
+        Returns: generator
+        """
+        for key, mod_ids in list(self.sources.get(dbref, {}).items()):
+            handler = self._handlers[key]()
+            if handler is None:
+                continue
+            for mod_id in list(mod_ids):
+                if (typeclass is None
+                        or handler._mods[mod_id].typeclass == typeclass):
+                    yield handler, mod_id
+
+    def _make_cleanup(self, key):
+        """Build the weakref callback that forgets a collected handler.
+
+        Arguments:
+        key (int) - index key of the handler
+
+        Returns: callable
+        """
+        def cleanup(ref):
+            for dbref in self._handler_sources.pop(key, ()):
+                holders = self.sources.get(dbref, {})
+                holders.pop(key, None)
+                if not holders:
+                    self.sources.pop(dbref, None)
+            self._handlers.pop(key, None)
+        return cleanup
+
+    def __len__(self):
+        return len(self.sources)
+
+
+MODIFIER_INDEX = ModifierIndex()
@@ -0,0 +1,147 @@
+"""
+Change notifications for attributes and resources.
+
+Consumers such as the prompt, OOB monitors, AI or web character sheets
+subscribe to an Attribute or Resource instead of polling its cur_val:
+
+def on_health(resource, changes):
+    old, new = changes[NotifyType.CUR_VAL]
+    ...
+
+character.resources.health.subscribe(on_health, [NotifyType.CUR_VAL])
+
+Notifications are coalesced per reactor tick. However many times a subject
+changes while a command runs, every subscriber is called once afterwards,
+with the NotifyType: (old value, new value) pairs of the values that differ
+from what it was last told. Changes that cancel out are not delivered.
+
+Subscriptions are not persisted and must be made again after a reload.
+"""
+from collections import OrderedDict
+from evennia.utils import logger
+from evennia.utils.utils import delay
+
+
+class Observable(object):
+    """
+    Mixin for objects subscribers can be notified about. Subclasses set
+    _subscribers to an empty list and _published to None when created and
+    unpickled, implement _observed_values(), and call _publish_change() on
+    every change.
+    """
+
+    def subscribe(self, callback, types=None):
+        """Register a callable to be notified of changes, once per tick.
+
+        Arguments:
+        callback (callable) - called with the subject and a dict of
+                              NotifyType: (old value, new value)
+        types (iterable) - NotifyTypes to be notified about, or None for all
+
+        Returns: None
+        """
+        if not self._subscribers:
+            self._published = self._observed_values()
+        self._subscribers.append(
+            (callback, frozenset(types) if types is not None else None))
+
+    def unsubscribe(self, callback):
+        """Unregister a callable previously passed to subscribe.
+
+        Arguments:
+        callback (callable) - subscriber to remove
+
+        Returns: None
+        """
+        for index, (subscriber, _) in enumerate(self._subscribers):
+            if subscriber == callback:
+                del self._subscribers[index]
+                return
+        raise ValueError("{} is not subscribed".format(callback))
+
+    def _observed_values(self):
+        """Get the current value of everything subscribers are notified about.
+
+        Arguments: None
+
+        Returns: dict - NotifyType: value
+        """
+        raise NotImplementedError
+
+    def _publish_change(self):
+        """Queue a notification, if anything is subscribed.
+
+        Arguments: None
+
+        Returns: None
+        """
+        if self._subscribers:
+            NOTIFIER.changed(self)
+
+
+class ChangeNotifier(object):
+    """
+    Properties:
+    deliveries (int) - number of subscriber calls made
+    """
+    def __init__(self):
+        self._pending = OrderedDict()
+        self._scheduled = False
+        self.deliveries = 0
+
+    @property
+    def depth(self):
+        return len(self._pending)
+
+    def changed(self, subject):
+        """Queue a subject to notify its subscribers on the next tick.
+
+        Arguments:
+        subject (Observable) - subject that changed
+
+        Returns: None
+        """
+        self._pending[id(subject)] = subject
+        if not self._scheduled:
+            self._scheduled = True
+            delay(0, self.flush)
+
+    def flush(self):
+        """Notify the subscribers of every queued subject.
+
+        Arguments: None
+
+        Returns: int - number of subscriber calls made
+        """
+        self._scheduled = False
+        pending, self._pending = self._pending, OrderedDict()
+        calls = 0
+        for subject in pending.values():
+            published = subject._published or {}
+            values = subject._observed_values()
+            changes = dict((notify_type, (published.get(notify_type), val))
+                           for notify_type, val in values.items()
+                           if published.get(notify_type) != val)
+            if not changes:
+                continue
+            subject._published = values
+            for callback, types in list(subject._subscribers):
+                if types is not None:
+                    relevant = dict((notify_type, change)
+                                    for notify_type, change in changes.items()
+                                    if notify_type in types)
+                else:
+                    relevant = changes
+                if not relevant:
+                    continue
+                calls += 1
+                try:
+                    callback(subject, relevant)
+                except Exception:
+                    logger.log_trace("change subscriber {} "
+                                     "failed".format(callback))
+        self.deliveries += calls
+        return calls
+
+
+NOTIFIER = ChangeNotifier()
@@ -0,0 +1,21 @@
+"""
+Constants for change notifications.
+"""
+
+class NotifyType(object):
+    """
+    Enum class for the values of an attribute or resource that subscribers
+    are notified about.
+    """
+    CUR_VAL = 1
+    BASE = 2
+    MIN = 3
+    MAX = 4
+
+
+class Crossing(object):
+    """
+    Enum class for the direction a value crosses a threshold in.
+    """
+    FALLING = 1
+    RISING = 2
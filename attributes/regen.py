@@ -0,0 +1,140 @@
+"""
+RegenTicker recharges every resource with will_recharge enabled from a single
+timer, instead of a script per character waking the reactor separately.
+
+Resources register themselves while recharging is enabled, and are grouped by
+recharge_interval. Each tick, every group whose interval has elapsed is
+advanced in one pass, and the resources that changed are saved together at
+the end, once per Evennia Attribute, in a single transaction. Threshold
+triggers and subscribers of the resources see every step, so regeneration is
+visibly ticking. All resources with the same interval tick in step, like a
+MUD regen heartbeat.
+
+Lazy resources, see resource.py, compute their recharging when read and are
+not ticked. Resources are held by weak reference, as in modifier_index.py.
+
+The ticker is run by a service started from
+server/conf/server_services_plugins.py. Configure how often it checks for due
+groups in your settings file:
+
+NEXTRPI_REGEN_INTERVAL = 1  # seconds between ticks
+"""
+import time
+import weakref
+from django.db import transaction
+from save_wrapper import get_root, save
+
+
+class RegenGroup(object):
+    """
+    Properties:
+    interval (number) - recharge_interval of the resources in the group
+    next_due (float) - timestamp the group next recharges at
+    resources (WeakSet) - resources in the group
+    """
+    def __init__(self, interval, next_due):
+        self.interval = interval
+        self.next_due = next_due
+        self.resources = weakref.WeakSet()
+
+
+class RegenTicker(object):
+    """
+    Properties:
+    ticks (int) - number of ticks that recharged anything
+    recharged (int) - number of resource recharges, by all ticks
+    """
+    def __init__(self):
+        self._groups = {}
+        self.ticks = 0
+        self.recharged = 0
+
+    def register(self, resource):
+        """Recharge a resource on every tick of its interval.
+
+        Registering a resource again after its interval changed moves it to
+        the right group.
+
+        Arguments:
+        resource (Resource) - resource to recharge
+
+        Returns: None
+        """
+        self.unregister(resource)
+        if not resource.will_recharge or resource.lazy_recharge:
+            return
+        interval = resource.recharge_interval
+        if interval <= 0:
+            return
+        group = self._groups.get(interval)
+        if group is None:
+            group = self._groups[interval] = RegenGroup(interval,
+                                                        time.time() + interval)
+        group.resources.add(resource)
+
+    def unregister(self, resource):
+        """Stop recharging a resource.
+
+        Arguments:
+        resource (Resource) - registered resource
+
+        Returns: None
+        """
+        for group in self._groups.values():
+            group.resources.discard(resource)
+
+    def tick(self, now=None):
+        """Recharge every resource whose interval has elapsed.
+
+        Arguments:
+        now (float) - current timestamp, defaults to time.time()
+
+        Returns: int - number of resources that changed
+        """
+        if now is None:
+            now = time.time()
+        touched = {}
+        changed = 0
+        for interval, group in list(self._groups.items()):
+            if group.next_due > now:
+                continue
+            # intervals missed, e.g. while the server was busy, are caught up
+            steps = int((now - group.next_due) // interval) + 1
+            group.next_due += steps * interval
+            for resource in list(group.resources):
+                if (not resource.will_recharge or resource.lazy_recharge
+                        or resource.recharge_interval != interval):
+                    self.register(resource)
+                    continue
+                old_val = resource.cur_val
+                resource.cur_val = old_val + resource.recharge_rate * steps
+                if resource.cur_val != old_val:
+                    changed += 1
+                    root = get_root(resource)
+                    touched[id(root)] = root
+            if not group.resources:
+                del self._groups[interval]
+        if changed:
+            self.ticks += 1
+            self.recharged += changed
+            self._persist(touched.values())
+        return changed
+
+    def _persist(self, roots):
+        """Save every object holding a changed resource, in one transaction.
+
+        Arguments:
+        roots (iterable) - outermost containers of the changed resources
+
+        Returns: None
+        """
+        with transaction.atomic():
+            for root in roots:
+                if getattr(root, 'attrobj', None) is not None:
+                    save(root)
+
+    def __len__(self):
+        return sum(len(group.resources) for group in self._groups.values())
+
+
+REGEN = RegenTicker()
@@ -1,13 +1,33 @@
 """
 Resources represent attributes that can be used or consumed as a resource, such
 as health, mana, rocket power, etc.
+
+A recharging resource can be lazy. Instead of something calling recharge()
+every recharge_interval, a lazy resource stores the time it was last updated,
+and computes its current value from the time elapsed whenever it is read:
+recharge_rate for every whole interval since, clamped to the bounds. An idle
+character costs nothing until its resources are looked at. The value is
+settled, written back with the time of the last whole interval, whenever it is
+changed or persisted.
+
+Reading a lazy resource changes nothing, so its threshold triggers and
+subscribers are only told about recharging when it is next settled, as a
+change of its own before the change that settled it.
+
+Other resources with will_recharge enabled are recharged by the REGEN ticker,
+see regen.py.
 """
+import time
 from attribute import Attribute
+from observer import Observable
+from observer_constants import NotifyType
+from regen import REGEN
 from resource_constants import AttributeType
-from save_wrapper import save_attr
+from threshold import ThresholdSet
+from save_wrapper import batch, save_attr
 
 
-class Resource(object):
+class Resource(Observable):
     """
     Properties:
     name (string) - name of the attribute
@@ -17,20 +37,117 @@ class Resource(object):
     recharge_rate (number) - how much to increase the current value by, for
                              each recharge interval
     will_charge (boolean) - if recharging is enabled
+    lazy_recharge (boolean) - if recharging is computed from the time elapsed
+                              when read, rather than by calling recharge()
     cur_val (number) - current value of the resource
     attrobj (Attribute objref) - Evennia database attribute direct object
                                  reference, used to save changes to the handler
+
+    Subscribers, see observer.py, are notified of changes to the current
+    value and the bounds once per tick. Threshold triggers, see threshold.py,
+    fire as soon as the current value, or its percentage of the max, crosses
+    their level.
     """
     def __init__(self, attrobj, name="resource", cur_val=0, min=None, 
-                max=None, recharge_interval=60, recharge_rate=1):
+                max=None, recharge_interval=60, recharge_rate=1,
+                will_recharge=False, lazy_recharge=False, updated_at=None):
         self.name = name
         self._cur_val = cur_val
+        self.lazy_recharge = lazy_recharge
+        self._updated_at = time.time() if updated_at is None else updated_at
         self._min = Attribute(attrobj, **min)
         self._max = Attribute(attrobj, **max)
         self.recharge_rate = recharge_rate
         self.recharge_interval = recharge_interval
-        self.will_recharge = False
+        self.will_recharge = will_recharge
         self.attrobj = attrobj
+        self._parent = None
+        self._subscribers = []
+        self._published = None
+        self._thresholds = None
+        self._pct_thresholds = None
+        self._adopt_bounds()
+        REGEN.register(self)
+
+    def _adopt_bounds(self):
+        """Route saves and changes of the min and max through the resource.
+
+        Arguments: None
+
+        Returns: None
+        """
+        for bound in (self._min, self._max):
+            bound._parent = self
+            bound.add_watcher(self._bound_changed)
+
+    def _bound_changed(self, attr):
+        self._changed()
+
+    def _changed(self):
+        """Fire crossed thresholds and notify subscribers after a change.
+
+        Arguments: None
+
+        Returns: None
+        """
+        if self._thresholds is not None:
+            self._thresholds.update(self.cur_val)
+        if self._pct_thresholds is not None:
+            self._pct_thresholds.update(self.percentage)
+        self._publish_change()
+
+    def add_threshold(self, level, callback, direction, percentage=False):
+        """Register a callable to be called when cur_val crosses a level.
+
+        Thresholds are not persisted and must be registered again after a
+        reload.
+
+        Example:
+        health.add_threshold(0.25, flee, Crossing.FALLING, percentage=True)
+        mana.add_threshold(0, out_of_mana, Crossing.FALLING)
+
+        Arguments:
+        level (number) - level to watch
+        callback (callable) - called with the resource, the level, the old
+                              value and the new value
+        direction (Crossing) - FALLING or RISING
+        percentage (boolean) - if level is a fraction of the max, compared
+                               with the percentage property, instead of a
+                               current value
+
+        Returns: None
+        """
+        if percentage:
+            if self._pct_thresholds is None:
+                self._pct_thresholds = ThresholdSet(self, self.percentage)
+            self._pct_thresholds.add(level, callback, direction)
+        else:
+            if self._thresholds is None:
+                self._thresholds = ThresholdSet(self, self.cur_val)
+            self._thresholds.add(level, callback, direction)
+
+    def remove_threshold(self, level, callback, percentage=False):
+        """Unregister a callable previously passed to add_threshold.
+
+        Arguments:
+        level (number) - watched level
+        callback (callable) - registered callback
+        percentage (boolean) - if it was registered as a percentage
+
+        Returns: None
+        """
+        thresholds = self._pct_thresholds if percentage else self._thresholds
+        if thresholds is None:
+            raise ValueError("{} has no threshold at {}".format(callback,
+                                                                level))
+        thresholds.remove(level, callback)
+
+    def _observed_values(self):
+        return {
+                NotifyType.CUR_VAL: self.cur_val,
+                NotifyType.MIN: self.min,
+                NotifyType.MAX: self.max
+        }
 
     @property
     def max_modifiers(self):
@@ -50,20 +167,82 @@ class Resource(object):
 
     @property
     def percentage(self):
-      return self.cur_val / self.max
+        if not self.max:
+            return 0.0
+        return self.cur_val / float(self.max)
 
     @property
     def cur_val(self):
+        if self.lazy_recharge and self.will_recharge:
+            return self._recharged(time.time())[0]
         return self._cur_val
 
     @cur_val.setter
     def cur_val(self, other):
-        if other > self.max.cur_val:
+        self._set_cur_val(other)
+
+    def _set_cur_val(self, other, source=None):
+        """Clamp and set the current value, recording the change in the
+        event log of the handler, if it keeps one.
+
+        Arguments:
+        other (number) - new current value
+        source (int) - dbref id of the Object that caused the change
+
+        Returns: None
+        """
+        self._settle()
+        old_val = self._cur_val
+        if other > self.max:
             self._cur_val = self.max
-        elif other < self.min.cur_val:
+        elif other < self.min:
             self._cur_val = self.min
         else:
             self._cur_val = other
+        event_log = getattr(self._parent, 'event_log', None)
+        if event_log is not None and self._cur_val != old_val:
+            event_log.record(time.time(), self.name, self._cur_val - old_val,
+                             source)
+        self._changed()
+
+    def _recharged(self, now):
+        """Compute the lazily recharged value in closed form.
+
+        Arguments:
+        now (float) - current timestamp
+
+        Returns: tuple(number, float) - value, and the timestamp it is current
+                                        as of
+        """
+        interval = self.recharge_interval
+        if interval <= 0:
+            return self._cur_val, now
+        ticks = int((now - self._updated_at) // interval)
+        if ticks <= 0:
+            return self._cur_val, self._updated_at
+        val = self._cur_val + ticks * self.recharge_rate
+        # progress towards the next whole interval is kept, unless the value
+        # is pinned at a bound, where nothing should be banked
+        if val >= self.max:
+            return self.max, now
+        if val <= self.min:
+            return self.min, now
+        return val, self._updated_at + ticks * interval
+
+    def _settle(self):
+        """Write the lazily recharged value back, as of now, and report any
+        recharging to thresholds and subscribers.
+
+        Arguments: None
+
+        Returns: None
+        """
+        if not (self.lazy_recharge and self.will_recharge):
+            return
+        old_val = self._cur_val
+        self._cur_val, self._updated_at = self._recharged(time.time())
+        if self._cur_val != old_val:
+            self._changed()
 
     def get_mod(self, attr_type, desc, **kwargs):
         """Get modifier based on attribute type, description, and filters.
@@ -123,14 +302,35 @@ class Resource(object):
 
         Returns: dict
         """
-        return {
+        self._settle()
+        serialized = {
+                "name": self.name,
                 "min": self._min.serialize(),
                 "max": self._max.serialize(),
                 "will_recharge": self.will_recharge,
-                "cur_val": self.cur_val,
+                "cur_val": self._cur_val,
                 "recharge_rate": self.recharge_rate,
                 "recharge_interval": self.recharge_interval
         }
+        if self.lazy_recharge:
+            serialized["lazy_recharge"] = True
+            serialized["updated_at"] = self._updated_at
+        return serialized
+
+    @save_attr
+    def change(self, delta, source=None):
+        """Change the current value by a delta, clamped to the bounds.
+
+        Unlike assigning cur_val, this records what caused the change in the
+        event log of the handler.
+
+        Arguments:
+        delta (number) - amount to add, negative to subtract
+        source (int) - dbref id of the Object that caused the change
+
+        Returns: None
+        """
+        self._set_cur_val(self.cur_val + delta, source)
 
     @save_attr
     def restore(self):
@@ -160,7 +360,7 @@ class Resource(object):
 
         Returns: None
         """
-        self.cur += self.recharge_rate
+        self.cur_val += self.recharge_rate
 
     @save_attr
     def toggle_recharge_on(self):
@@ -170,7 +370,11 @@ class Resource(object):
 
         Returns: None
         """
+        if not self.will_recharge:
+            # nothing recharged while it was off
+            self._updated_at = time.time()
         self.will_recharge = True
+        REGEN.register(self)
 
     @save_attr
     def toggle_recharge_off(self):
@@ -180,4 +384,61 @@ class Resource(object):
 
         Returns: None
         """
+        self._settle()
         self.will_recharge = False
+        REGEN.unregister(self)
+
+    def batch(self):
+        """Coalesce every save made within the block into one save.
+
+        If the block raises, the resource is rolled back instead.
+
+        Arguments: None
+
+        Returns: contextmanager
+        """
+        return batch(self)
+
+    def _snapshot(self):
+        return self.serialize()
+
+    def _rollback(self, snapshot):
+        """Restore the resource in place to a serialized snapshot.
+
+        Arguments:
+        snapshot (dict) - result of serialize()
+
+        Returns: None
+        """
+        self._min._rollback(snapshot['min'])
+        self._max._rollback(snapshot['max'])
+        self.will_recharge = snapshot['will_recharge']
+        self.recharge_rate = snapshot['recharge_rate']
+        self.recharge_interval = snapshot['recharge_interval']
+        self.lazy_recharge = snapshot.get('lazy_recharge', False)
+        if 'updated_at' in snapshot:
+            self._updated_at = snapshot['updated_at']
+        self._cur_val = snapshot['cur_val']
+        self._changed()
+        REGEN.register(self)
+
+    def __getstate__(self):
+        self._settle()
+        state = self.__dict__.copy()
+        for key in ('_parent', '_subscribers', '_published', '_thresholds',
+                    '_pct_thresholds'):
+            state.pop(key, None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        # pickled before recharging could be lazy
+        self.__dict__.setdefault('lazy_recharge', False)
+        self.__dict__.setdefault('_updated_at', time.time())
+        self._parent = None
+        self._subscribers = []
+        self._published = None
+        self._thresholds = None
+        self._pct_thresholds = None
+        self._adopt_bounds()
+        REGEN.register(self)
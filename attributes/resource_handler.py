@@ -1,22 +1,95 @@
 """
 ResourceHandler manages the resources on a character, conveniently storing,
 adding, removing resources.
+
+Like AttributeHandler, loaded resources are kept in their serialized form and
+a Resource is only built the first time it is accessed. Resources recharged by
+the REGEN ticker are built on load, so they keep recharging.
+
+Costs that spend several resources at once, such as mana plus stamina plus a
+reagent count, are paid with spend(). Every cost is checked before anything
+is deducted, and the deductions are saved together:
+
+handler.spend({"mana": 10, "stamina": 5, "reagents": 1})
+
+A handler can also keep a bounded, in-memory log of changes to its resources
+for analytics, see event_log.py.
 """
+from event_log import ResourceEventLog
+from modifier_handler import is_tracked
 from resource import Resource
-from save_wrapper import save_attr
+from save_wrapper import batch, save_attr
+
+
+class ResourceHandlerException(Exception):
+    def __init__(self, msg, shortfall=None):
+        super(ResourceHandlerException, self).__init__(msg)
+        self.msg = msg
+        self.shortfall = shortfall or {}
 
 
 class ResourceHandler(object):
     """
     Properties:
-    resources (dict) - resource_name: Resource mappings of all attributes in
-                        handler
+    resources (dict) - resource_name: Resource mappings of all resources in
+                       handler that have been built
     attrobj (Attribute objref) - Evennia database attribute direct object
                                  reference, used to save changes to the handler
+    event_log (ResourceEventLog) - recent changes to the resources, or None if
+                                   not enabled
     """
 
-    def __init__(self):
+    def __init__(self, attrobj=None):
         self.resources = {}
+        self.attrobj = attrobj
+        self.event_log = None
+        self._serialized = {}
+
+    def _load(self, serialized_resources):
+        """Keep serialized resources to be built on first access.
+
+        Arguments:
+        serialized_resources (dict) - resource_name: serialized resource
+
+        Returns: None
+        """
+        for name, serialized in serialized_resources.items():
+            ticked = (serialized.get('will_recharge')
+                      and not serialized.get('lazy_recharge'))
+            if ticked or any(is_tracked(mod)
+                             for bound in (serialized['min'],
+                                           serialized['max'])
+                             for mod in bound.get('modifiers', ())):
+                self.resources[name] = self._build_resource(**serialized)
+            else:
+                self._serialized[name] = serialized
+
+    def _materialize(self, name):
+        """Build a serialized resource the first time it is accessed.
+
+        Arguments:
+        name (string) - resource name
+
+        Returns: Resource or None if there is no such resource
+        """
+        serialized = self._serialized.pop(name, None)
+        if serialized is None:
+            return None
+        resource = self._build_resource(**serialized)
+        self.resources[name] = resource
+        return resource
+
+    def _serialize_all(self):
+        """Serialize every resource, built or not.
+
+        Arguments: None
+
+        Returns: dict - resource_name: serialized resource
+        """
+        serialized = dict(self._serialized)
+        for name, resource in self.resources.items():
+            serialized[name] = resource.serialize()
+        return serialized
 
     def all(self):
         """Gets all resources in cache.
@@ -25,7 +98,9 @@ class ResourceHandler(object):
 
         Returns: List[Resource]
         """
-        return self.resources.values()
+        for name in list(self._serialized):
+            self._materialize(name)
+        return list(self.resources.values())
 
     def get(self, name, **kwargs):
         """Get an resource on the character.
@@ -36,8 +111,9 @@ class ResourceHandler(object):
 
         Returns: Resource
         """
-        if self.resources.get(name):
-            return self.resources[name]
+        resource = self.resources.get(name) or self._materialize(name)
+        if resource:
+            return resource
         if 'default' in kwargs:
             return kwargs.get('default')
         raise AttributeError("could not find resource {}".format(name))
@@ -52,7 +128,7 @@ class ResourceHandler(object):
         Returns: None
         """
         name = serialized_res.get('name')
-        if self.get(name, default=None):
+        if name in self:
             raise AttributeError("resource {} already exists".format(name))
         attr = self._build_resource(**serialized_res)
         self.resources[name] = attr
@@ -66,9 +142,10 @@ class ResourceHandler(object):
 
         Returns: None
         """
-        if not self.get(name):
+        if name not in self:
             raise AttributeError("could not find resource {}".format(name))
-        del self.resources[name]
+        self.resources.pop(name, None)
+        self._serialized.pop(name, None)
 
     def clear(self):
         """Clear all resources from the character.
@@ -77,9 +154,90 @@ class ResourceHandler(object):
 
         Returns: None
         """
-        for name in self.resources.keys():
+        for name in list(self.resources) + list(self._serialized):
             self.remove(name)
 
+    def shortfall(self, costs):
+        """Get how much of each resource is missing to pay a cost.
+
+        A cost can be paid if it leaves the resource at or above its min.
+
+        Arguments:
+        costs (dict) - resource_name: amount to deduct
+
+        Returns: dict - resource_name: amount missing, empty if affordable
+        """
+        missing = {}
+        for name, amount in costs.items():
+            if amount < 0:
+                raise ResourceHandlerException(
+                    "cost of resource {} is negative".format(name))
+            resource = self.get(name)
+            lacking = resource.min - (resource.cur_val - amount)
+            if lacking > 0:
+                missing[name] = lacking
+        return missing
+
+    def can_afford(self, costs):
+        """Check if every cost can be paid.
+
+        Arguments:
+        costs (dict) - resource_name: amount to deduct
+
+        Returns: boolean
+        """
+        return not self.shortfall(costs)
+
+    @save_attr
+    def spend(self, costs, source=None):
+        """Deduct every cost, or none of them.
+
+        All costs are checked first. If any of them cannot be paid nothing
+        is deducted, otherwise the deductions are saved once.
+
+        Arguments:
+        costs (dict) - resource_name: amount to deduct
+        source (int) - dbref id of the Object the costs are paid to, recorded
+                       in the event log
+
+        Returns: None
+
+        Raises: ResourceHandlerException if a cost cannot be paid
+        """
+        missing = self.shortfall(costs)
+        if missing:
+            raise ResourceHandlerException(
+                "cannot afford {}".format(", ".join(
+                    "{} more {}".format(missing[name], name)
+                    for name in sorted(missing))), missing)
+        with self.batch():
+            for name, amount in costs.items():
+                resource = self.get(name)
+                resource._set_cur_val(resource.cur_val - amount, source)
+
+    def enable_event_log(self, capacity=256):
+        """Start keeping a log of changes to the resources.
+
+        The log is kept in memory only, and is lost on reload.
+
+        Arguments:
+        capacity (int) - most events kept
+
+        Returns: ResourceEventLog
+        """
+        if self.event_log is None or self.event_log.capacity != capacity:
+            self.event_log = ResourceEventLog(capacity)
+        return self.event_log
+
+    def disable_event_log(self):
+        """Stop keeping a log of changes to the resources.
+
+        Arguments: None
+
+        Returns: None
+        """
+        self.event_log = None
+
     def _build_resource(self, **serialized_attr):
         """Return built resource given resource serialization.
 
@@ -88,13 +246,82 @@ class ResourceHandler(object):
 
         Returns: Attribute or Resource
         """
-        return Resource(self.attrobj, **serialized_attr)
+        resource = Resource(self.attrobj, **serialized_attr)
+        resource._parent = self
+        return resource
+
+    def batch(self):
+        """Coalesce every save made within the block into one save.
+
+        This covers saves of the handler and of every resource in it. If the
+        block raises, the handler is rolled back to its state on entry.
+
+        Example:
+        with handler.batch():
+            handler.mana.deplete()
+            handler.stamina.add_mod(AttributeType.MAX, desc="exhausted",
+                                    val=5, operator="-")
+
+        Arguments: None
+
+        Returns: contextmanager
+        """
+        return batch(self)
+
+    def _snapshot(self):
+        return self._serialize_all()
+
+    def _rollback(self, snapshot):
+        """Restore the handler to a snapshot taken by _snapshot().
+
+        Built resources that still exist are restored in place, so references
+        to them stay valid.
+
+        Arguments:
+        snapshot (dict) - resource_name: serialized resource mappings
+
+        Returns: None
+        """
+        for name in list(self.resources) + list(self._serialized):
+            if name not in snapshot:
+                self.resources.pop(name, None)
+                self._serialized.pop(name, None)
+        for name, serialized in snapshot.items():
+            resource = self.resources.get(name)
+            if resource is not None:
+                resource._rollback(serialized)
+            else:
+                self._serialized[name] = serialized
 
     def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
         return self.get(name)
 
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['resources'] = {}
+        state['_serialized'] = self._serialize_all()
+        state.pop('event_log', None)
+        return state
+
+    def __setstate__(self, state):
+        # handlers pickled before lazy loading stored built resources
+        resources = state.pop('resources', {})
+        serialized = state.pop('_serialized', {})
+        self.__dict__.update(state)
+        self.resources = resources
+        self.event_log = None
+        self._serialized = {}
+        for resource in self.resources.values():
+            resource._parent = self
+        self._load(serialized)
+
+    def __contains__(self, name):
+        return name in self.resources or name in self._serialized
+
     def __len__(self):
-        return len(self.resources.keys())
+        return len(self.resources) + len(self._serialized)
 
     def __repr__(self):
         return str(self.__dict__)
@@ -0,0 +1,58 @@
+"""
+RowStore persists the contents of a handler as one Evennia Attribute per
+entry, in a category of its own, instead of pickling the whole handler into a
+single Attribute.
+
+Combined with change tracking on the handler, a save only writes the rows of
+the entries that changed since the last save, so write volume scales with
+what changed rather than with the size of the character sheet.
+
+Example, on a typeclass:
+
+@lazy_property
+def stats(self):
+    return AttributeHandler.load_rows(self, "stats")
+"""
+
+
+class RowStore(object):
+    """
+    Properties:
+    obj (typeclassed object) - Evennia object the rows are stored on
+    category (string) - Evennia Attribute category holding the rows
+    """
+    def __init__(self, obj, category):
+        self.obj = obj
+        self.category = category
+
+    def load(self):
+        """Load every row in the category.
+
+        Arguments: None
+
+        Returns: dict - row key: stored value
+        """
+        rows = self.obj.attributes.get(category=self.category,
+                                       return_obj=True, return_list=True)
+        return dict((row.key, row.value) for row in rows if row)
+
+    def write(self, key, value):
+        """Create or overwrite a row.
+
+        Arguments:
+        key (string) - row key
+        value (any) - value to store, as understood by Evennia's serializer
+
+        Returns: None
+        """
+        self.obj.attributes.add(key, value, category=self.category)
+
+    def delete(self, key):
+        """Delete a row, if it exists.
+
+        Arguments:
+        key (string) - row key
+
+        Returns: None
+        """
+        self.obj.attributes.remove(key, category=self.category)
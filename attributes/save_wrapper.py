@@ -46,12 +46,145 @@ Credits for this example goes to Griatch Art from the Evennia Google Group,
 originally found here:
 
 https://groups.google.com/forum/#!category-topic/evennia/evennia-questions/fI0pQTpvGkA
+
+Objects stored inside another saved object, such as the Attributes of an
+AttributeHandler, set '_parent' to their container. Saving them saves the
+outermost container instead, since that is what the Evennia Attribute holds.
+
+Saves can be deferred with a batch. Every save of the object, or of anything
+inside it, made within the batch is coalesced into a single save on exit. If
+the batch raises, the object is rolled back to its state on entry instead:
+
+with handler.batch():
+    handler.strength.add_mod(desc="war cry", val=2, operator="+")
+    handler.agility.add_mod(desc="war cry", val=2, operator="+")
+
+If write-behind is enabled (see write_behind.py), saves only mark the object
+dirty and it is written on the next periodic flush.
+
+Saves can also be collected across many objects, to be written together by
+the caller, see bulk.py.
 """
+from collections import OrderedDict
+from contextlib import contextmanager
+from write_behind import WRITE_BEHIND, write
+
+# id(root object): True if a save was requested during its batch
+_BATCHES = {}
+# stack of id(root object): root object mappings of collected saves
+_COLLECTED = []
+
+
+def get_root(obj):
+    """Get the outermost container an object is saved through.
+
+    Arguments:
+    obj (any) - object to save
+
+    Returns: any
+    """
+    while getattr(obj, '_parent', None) is not None:
+        obj = obj._parent
+    return obj
+
+
+def is_persisted(obj):
+    """Check if saving an object writes it anywhere.
+
+    Objects that are not stored in an Evennia Attribute, or in rows of their
+    own, such as the attributes of a template, have nothing to save to.
+
+    Arguments:
+    obj (any) - object to save, or stored inside one
+
+    Returns: boolean
+    """
+    root = get_root(obj)
+    persisted = getattr(root, '_persisted', None)
+    if persisted is not None:
+        return persisted()
+    return getattr(root, 'attrobj', None) is not None
+
+
+def save(obj):
+    """Write an object back to its Evennia Attribute.
+
+    The save is deferred if the object's container is in a batch, or queued
+    for the next flush if write-behind is enabled.
+
+    Arguments:
+    obj (any) - object with an 'attrobj' member variable, or stored inside one
+
+    Returns: None
+    """
+    root = get_root(obj)
+    if id(root) in _BATCHES:
+        _BATCHES[id(root)] = True
+        return
+    if _COLLECTED:
+        _COLLECTED[-1][id(root)] = root
+        return
+    if WRITE_BEHIND.enabled:
+        WRITE_BEHIND.mark(root)
+        return
+    write(root)
+
+
+@contextmanager
+def batch(obj):
+    """Defer and coalesce every save of an object until the block exits.
+
+    If the object defines _snapshot() and _rollback(snapshot), it is rolled
+    back to its state on entry when the block raises, and nothing is saved.
+    Nested batches on the same object join the outermost one.
+
+    Arguments:
+    obj (any) - object with an 'attrobj' member variable
+
+    Returns: contextmanager
+    """
+    root = get_root(obj)
+    key = id(root)
+    if key in _BATCHES:
+        yield obj
+        return
+    snapshot = root._snapshot() if hasattr(root, '_snapshot') else None
+    _BATCHES[key] = False
+    try:
+        yield obj
+    except Exception:
+        if snapshot is not None:
+            root._rollback(snapshot)
+        raise
+    finally:
+        dirty = _BATCHES.pop(key)
+    if dirty:
+        save(root)
+
+
+@contextmanager
+def collect():
+    """Collect every save made within the block instead of writing it.
+
+    The caller is responsible for writing the collected objects. Saves
+    deferred by a batch are collected when the batch exits.
+
+    Arguments: None
+
+    Returns: contextmanager yielding an OrderedDict of id(root): root
+             mappings, in the order they were first saved
+    """
+    collected = OrderedDict()
+    _COLLECTED.append(collected)
+    try:
+        yield collected
+    finally:
+        _COLLECTED.pop()
+
 
 def save_attr(func):
     def wrapper(self, *args, **kwargs):
-        func(self, *args, **kwargs)
-        def save(self):
-            self.attrobj.value = self
+        res = func(self, *args, **kwargs)
         save(self)
+        return res
     return wrapper
@@ -0,0 +1,225 @@
+"""
+Stacking policies decide how modifiers sharing a desc combine, such as two
+castings of "war cry" on the same character. Modifiers of a desc without a
+policy all apply, which is the default.
+
+STRONGEST - only the strongest modifier applies
+CappedCount(n) - only the n strongest modifiers apply
+DiminishingReturns(scale) - every modifier applies, but the combined bonus
+                            bends towards scale as it grows
+ADDITIVE - every modifier applies, same as having no policy
+
+Policies are registered world-wide by desc, when the game loads:
+
+from attributes.stacking import STACKING_POLICIES, CappedCount, STRONGEST
+
+STACKING_POLICIES.set("war cry", STRONGEST)
+STACKING_POLICIES.set("bleeding", CappedCount(3))
+
+Within a desc, modifiers are stacked per operator. Strength is the size of a
+modifier's bonus: its value for + and -, and its value minus 1 for *.
+Multipliers in a stack combine their bonuses additively, so two stacked *1.1
+give *1.2.
+
+Each stack keeps its modifiers in a sorted list together with the running
+bonus of the ones that apply, so adding or removing a modifier updates the
+effective value with a binary search instead of re-sorting on every read.
+Changing the policy of a desc while the game runs is picked up by every
+handler the next time it is read or changed: it restacks all of its
+modifiers under the current policies.
+"""
+from bisect import bisect_left, insort
+from modifier import OP_MUL
+
+
+class StackingPolicy(object):
+    """
+    Properties:
+    cap (int or None) - number of strongest modifiers that apply, or None if
+                        they all apply
+    grouped (boolean) - if modifiers of the desc are stacked at all
+    """
+    cap = None
+    grouped = True
+
+    def effect(self, bonus):
+        """Transform the combined bonus of the modifiers that apply.
+
+        Arguments:
+        bonus (number) - combined bonus of the modifiers that apply
+
+        Returns: number
+        """
+        return bonus
+
+    def __eq__(self, other):
+        return (isinstance(other, self.__class__)
+                and self.__dict__ == other.__dict__)
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+
+class Additive(StackingPolicy):
+    grouped = False
+
+
+class CappedCount(StackingPolicy):
+
+    def __init__(self, cap):
+        if cap < 1:
+            raise ValueError("a stack cap must be at least 1")
+        self.cap = cap
+
+
+class DiminishingReturns(StackingPolicy):
+    """
+    The combined bonus b of the stack becomes scale * b / (scale + |b|). Small
+    bonuses are nearly unchanged, and no amount of stacking exceeds scale.
+    """
+    def __init__(self, scale, cap=None):
+        if scale <= 0:
+            raise ValueError("a diminishing returns scale must be positive")
+        self.scale = scale
+        self.cap = cap
+
+    def effect(self, bonus):
+        return self.scale * bonus / float(self.scale + abs(bonus))
+
+
+ADDITIVE = Additive()
+STRONGEST = CappedCount(1)
+
+
+class Stack(object):
+    """
+    Modifiers of one desc and operator, ordered by strength.
+
+    Properties:
+    policy (StackingPolicy) - policy the stack follows
+    op_code (int) - operator code of the modifiers
+    bonus (number) - combined bonus of the modifiers that apply
+    """
+    def __init__(self, policy, op_code):
+        self.policy = policy
+        self.op_code = op_code
+        self.bonus = 0
+        # ascending (strength, id) keys, and the bonus of every modifier
+        self._keys = []
+        self._bonuses = {}
+
+    def _bonus_of(self, modifier):
+        if self.op_code == OP_MUL:
+            return modifier.val - 1
+        return modifier.val
+
+    def _applies(self, index, count):
+        cap = self.policy.cap
+        return cap is None or index >= count - cap
+
+    def add(self, modifier):
+        """Add a modifier to the stack.
+
+        Arguments:
+        modifier (Modifier) - modifier with an id assigned
+
+        Returns: None
+        """
+        bonus = self._bonus_of(modifier)
+        key = (abs(bonus), modifier.id)
+        self._bonuses[modifier.id] = bonus
+        insort(self._keys, key)
+        count = len(self._keys)
+        if not self._applies(bisect_left(self._keys, key), count):
+            return
+        self.bonus += bonus
+        cap = self.policy.cap
+        if cap is not None and count > cap:
+            # the weakest modifier that applied no longer does
+            self.bonus -= self._bonuses[self._keys[count - cap - 1][1]]
+
+    def remove(self, modifier):
+        """Remove a modifier from the stack.
+
+        Arguments:
+        modifier (Modifier) - stored modifier
+
+        Returns: None
+        """
+        bonus = self._bonuses.pop(modifier.id)
+        key = (abs(bonus), modifier.id)
+        index = bisect_left(self._keys, key)
+        count = len(self._keys)
+        del self._keys[index]
+        if not self._applies(index, count):
+            return
+        self.bonus -= bonus
+        cap = self.policy.cap
+        if cap is not None and count > cap:
+            # the strongest modifier that did not apply now does
+            self.bonus += self._bonuses[self._keys[count - cap - 1][1]]
+
+    def effect(self):
+        """Get the value the stack applies with its operator.
+
+        Arguments: None
+
+        Returns: number - addend for + and -, factor for *
+        """
+        effect = self.policy.effect(self.bonus)
+        if self.op_code == OP_MUL:
+            return 1 + effect
+        return effect
+
+    def __len__(self):
+        return len(self._keys)
+
+
+class StackingRegistry(object):
+    """
+    Properties:
+    version (int) - incremented on every policy change, so handlers can tell
+                    their stacks are out of date
+    """
+    def __init__(self):
+        self._policies = {}
+        self.version = 0
+
+    def set(self, desc, policy):
+        """Set the stacking policy of a desc.
+
+        Handlers already holding modifiers of the desc restack them the next
+        time they are read or changed.
+
+        Arguments:
+        desc (string) - modifier desc
+        policy (StackingPolicy) - policy to apply
+
+        Returns: None
+        """
+        self._policies[desc] = policy
+        self.version += 1
+
+    def remove(self, desc):
+        """Go back to applying every modifier of a desc.
+
+        Arguments:
+        desc (string) - modifier desc
+
+        Returns: None
+        """
+        if self._policies.pop(desc, None) is not None:
+            self.version += 1
+
+    def get(self, desc):
+        """Get the stacking policy of a desc.
+
+        Arguments:
+        desc (string) - modifier desc
+
+        Returns: StackingPolicy
+        """
+        return self._policies.get(desc, ADDITIVE)
+
+
+STACKING_POLICIES = StackingRegistry()
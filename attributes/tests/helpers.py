@@ -0,0 +1,14 @@
+"""
+Stand-ins shared by the unit tests.
+"""
+
+
+class AttrObj(object):
+    """Stand-in for an Evennia Attribute that can be pickled, unlike a Mock."""
+    value = None
+
+
+def bound(name, base, mods=()):
+    """Serialized attribute, e.g. for the min and max of a resource."""
+    return {"name": name, "base": base, "min": 0, "max": 1000,
+            "modifiers": list(mods)}
@@ -48,3 +48,49 @@ class AttributeTestCase(TestCase):
                                                   'min': 0,
                                                   'max': 100,
                                                   'modifiers': [] })
+
+    def test_cur_val_cached(self):
+        self.attr.cur_val
+        self.attr.cur_val
+        self.assertEqual(self.attr._get_modified_val.call_count, 1)
+        self.assertEqual(self.attr.cache_misses, 1)
+        self.assertEqual(self.attr.cache_hits, 1)
+
+    def test_base_change_invalidates_cache(self):
+        self.attr.cur_val
+        self.attr.base += 1
+        self.assertEqual(self.attr.cur_val, self.BASE_VAL + 1 + self.MOD_VAL)
+        self.assertEqual(self.attr.cache_misses, 2)
+
+    def test_bound_change_invalidates_cache(self):
+        self.attr.cur_val
+        self.attr.max = 5
+        self.assertEqual(self.attr.cur_val, 5)
+        self.attr.max = self.MAX_VAL
+        self.attr.min = 15
+        self.assertEqual(self.attr.cur_val, 15)
+        self.assertEqual(self.attr.cache_misses, 3)
+
+    def test_modifier_change_invalidates_cache(self):
+        self.attr.cur_val
+        self.attr.add_mod(desc="buff", val=5, operator="+")
+        self.attr.cur_val
+        self.assertEqual(self.attr._get_modified_val.call_count, 2)
+        self.attr.remove_mod(self.attr.get_mod("buff"))
+        self.attr.cur_val
+        self.assertEqual(self.attr._get_modified_val.call_count, 3)
+
+
+class AttributeWithModifiersTestCase(TestCase):
+
+    def setUp(self):
+        self.attr = Attribute(Mock(), name="test_attr", base=20, min=0,
+                              max=100)
+
+    def test_cur_val_without_modifiers(self):
+        self.assertEqual(self.attr.cur_val, 20)
+
+    def test_cur_val_with_modifiers(self):
+        self.attr.add_mod(desc="buff", val=2, operator="*")
+        self.attr.add_mod(desc="curse", val=5, operator="-")
+        self.assertEqual(self.attr.cur_val, 35)
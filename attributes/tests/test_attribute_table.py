@@ -0,0 +1,59 @@
+"""
+Unit test for AttributeTable.
+"""
+import math
+from django.test import TestCase
+from mock import Mock
+from attributes.attribute_handler import AttributeHandler
+from attributes.attribute_table import AttributeTable
+
+
+class AttributeTableTestCase(TestCase):
+
+    def setUp(self):
+        self.handlers = []
+        for base in (10, 20, 30):
+            handler = AttributeHandler(Mock())
+            handler.add(name="strength", base=base, min=0, max=50)
+            handler.add(name="agility", base=base * 2, min=0, max=50)
+            self.handlers.append(handler)
+        self.table = AttributeTable(self.handlers, ["strength", "agility"])
+
+    def tearDown(self):
+        self.table.close()
+
+    def expected(self, name):
+        return [handler.get(name).cur_val for handler in self.handlers]
+
+    def test_cur_vals(self):
+        self.assertEqual(list(self.table.cur_vals("strength")), [10, 20, 30])
+        self.assertEqual(list(self.table.cur_vals("agility")), [20, 40, 50])
+        self.assertEqual(self.table.cur_vals().shape, (3, 2))
+
+    def test_tracks_modifiers(self):
+        strength = self.handlers[1].strength
+        strength.add_mod(desc="giant strength", val=2, operator="*")
+        strength.add_mod(desc="fatigue", val=5, operator="-")
+        self.assertEqual(list(self.table.cur_vals("strength")),
+                         self.expected("strength"))
+        strength.remove_mod(strength.get_mod("giant strength"))
+        self.assertEqual(list(self.table.cur_vals("strength")),
+                         self.expected("strength"))
+
+    def test_tracks_base_and_bounds(self):
+        self.handlers[0].strength.base = 40
+        self.handlers[2].strength.max = 25
+        self.assertEqual(list(self.table.cur_vals("strength")), [40, 20, 25])
+
+    def test_tracks_handler_membership(self):
+        self.handlers[0].remove("strength")
+        self.assertTrue(math.isnan(self.table.cur_val(0, "strength")))
+        self.handlers[0].add(name="strength", base=5, min=0, max=50)
+        self.assertEqual(self.table.cur_val(0, "strength"), 5)
+
+    def test_close_stops_watching(self):
+        self.table.close()
+        self.assertNotIn(self.table._attribute_watcher,
+                         self.handlers[0].strength._watchers)
+        self.assertNotIn(self.table._handler_watcher,
+                         self.handlers[0]._watchers)
@@ -0,0 +1,124 @@
+"""
+Unit test for AttributeHandlers reading from shared attribute templates.
+"""
+import pickle
+from django.test import TestCase
+from attributes.attribute_handler import AttributeHandler, REMOVED_ROW
+from attributes.attribute_table import AttributeTable
+from attributes.attribute_template import (AttributeTemplateException,
+                                           TEMPLATES, register_template)
+from attributes.tests.helpers import AttrObj
+from attributes.tests.test_row_store import FakeObject
+
+
+GOBLIN = [
+    {"name": "strength", "base": 8, "min": 0, "max": 20},
+    {"name": "agility", "base": 12, "min": 0, "max": 20},
+    {"name": "health", "base": 30, "min": 0, "max": 30}
+]
+
+
+class AttributeTemplateTestCase(TestCase):
+
+    def setUp(self):
+        register_template("TEST_GOBLIN", GOBLIN)
+        self.handler = AttributeHandler(AttrObj(), template="TEST_GOBLIN")
+
+    def test_reads_from_template(self):
+        self.assertEqual(len(self.handler), 3)
+        self.assertIn("agility", self.handler)
+        self.assertEqual(self.handler.agility.cur_val, 12)
+
+    def test_template_is_not_shared_state(self):
+        other = AttributeHandler(AttrObj(), template="TEST_GOBLIN")
+        self.handler.strength.base = 15
+        self.assertEqual(other.strength.base, 8)
+        self.assertEqual(TEMPLATES.get("TEST_GOBLIN").get("strength")["base"],
+                         8)
+
+    def test_reads_do_not_copy(self):
+        other = AttributeHandler(AttrObj(), template="TEST_GOBLIN")
+        self.assertEqual(self.handler.strength.cur_val, 8)
+        self.assertEqual(other.strength.base, 8)
+        self.assertEqual(len(self.handler.all()), 3)
+        self.assertEqual(self.handler.attributes, {})
+        self.assertEqual(other.attributes, {})
+
+    def test_change_copies(self):
+        strength = self.handler.strength
+        strength.add_mod(desc="war cry", val=2, operator="+")
+        self.assertIn("strength", self.handler.attributes)
+        self.assertEqual(strength.cur_val, 10)
+        self.assertEqual(self.handler.strength.cur_val, 10)
+        self.assertEqual(TEMPLATES.get("TEST_GOBLIN").shared(
+                         "strength").cur_val, 8)
+        self.assertEqual(self.handler.attrobj.value, self.handler)
+
+    def test_table_does_not_copy(self):
+        other = AttributeHandler(AttrObj(), template="TEST_GOBLIN")
+        table = AttributeTable([self.handler, other], ["strength", "agility"])
+        self.addCleanup(table.close)
+        self.assertEqual(list(table.cur_vals("strength")), [8, 8])
+        self.assertEqual(len(self.handler.strength.modifiers), 0)
+        self.assertEqual(self.handler.attributes, {})
+        self.assertEqual(other.attributes, {})
+        self.handler.strength.add_mod(desc="war cry", val=2, operator="+")
+        self.assertEqual(list(table.cur_vals("strength")), [10, 8])
+        self.assertEqual(list(self.handler.attributes), ["strength"])
+        table.close()
+        self.assertEqual(self.handler.attributes["strength"]._watchers,
+                         [self.handler._attribute_changed])
+
+    def test_stores_only_overrides(self):
+        self.handler.agility.cur_val
+        self.handler.strength.base = 15
+        state = self.handler.__getstate__()
+        self.assertEqual(list(state['_serialized']), ["strength"])
+        handler = pickle.loads(pickle.dumps(self.handler, 2))
+        self.assertEqual(handler.strength.base, 15)
+        self.assertEqual(handler.agility.base, 12)
+
+    def test_footprint(self):
+        self.assertLess(len(pickle.dumps(self.handler, 2)), 400)
+
+    def test_remove_and_add_template_attribute(self):
+        self.handler.remove("health")
+        self.assertNotIn("health", self.handler)
+        handler = pickle.loads(pickle.dumps(self.handler, 2))
+        self.assertNotIn("health", handler)
+        handler.add(name="health", base=5, min=0, max=30)
+        self.assertEqual(handler.health.base, 5)
+
+    def test_rollback_restores_template_values(self):
+        try:
+            with self.handler.batch():
+                self.handler.strength.base = 1
+                self.handler.remove("health")
+                raise ValueError
+        except ValueError:
+            pass
+        self.assertEqual(self.handler.strength.base, 8)
+        self.assertEqual(self.handler.health.base, 30)
+
+    def test_unknown_template(self):
+        handler = AttributeHandler(AttrObj(), template="NO_SUCH_TEMPLATE")
+        with self.assertRaises(AttributeTemplateException):
+            handler.get("strength")
+
+    def test_rows_written_only_for_overrides(self):
+        obj = FakeObject()
+        handler = AttributeHandler.load_rows(obj, "stats",
+                                             template="TEST_GOBLIN")
+        handler.strength.base = 9
+        handler.strength.base = 8
+        handler.agility.base = 13
+        handler.remove("health")
+        self.assertEqual(obj.attributes.rows[("agility", "stats")]["base"],
+                         13)
+        self.assertNotIn(("strength", "stats"), obj.attributes.rows)
+        self.assertEqual(obj.attributes.rows[(REMOVED_ROW, "stats")],
+                         ["health"])
+        loaded = AttributeHandler.load_rows(obj, "stats",
+                                            template="TEST_GOBLIN")
+        self.assertEqual(sorted(loaded._names()), ["agility", "strength"])
+        self.assertEqual(loaded.agility.base, 13)
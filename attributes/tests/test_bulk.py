@@ -0,0 +1,121 @@
+"""
+Unit test for bulk operations over many objects.
+"""
+from django.test import TestCase
+from mock import Mock, patch
+from attributes.attribute_handler import AttributeHandler
+from attributes.bulk import bulk_apply
+from attributes.resource_handler import ResourceHandler
+from attributes.save_wrapper import collect, save
+from attributes.tests.helpers import bound
+from attributes.tests.test_row_store import FakeObject
+from attributes.tests.test_save_wrapper import RecordingAttrObj
+from attributes.write_behind import WRITE_BEHIND
+
+
+class Character(object):
+    def __init__(self, health):
+        self.resources = ResourceHandler(RecordingAttrObj())
+        self.resources.add(name="health", cur_val=health,
+                           min=bound("min", 0), max=bound("max", 100))
+        self.resources.add(name="mana", cur_val=health,
+                           min=bound("min", 0), max=bound("max", 100))
+        self.resources.attrobj.writes = []
+
+
+class BulkApplyTestCase(TestCase):
+
+    def setUp(self):
+        self.chars = [Character(health) for health in (10, 20, 30)]
+
+    def writes(self):
+        return [len(char.resources.attrobj.writes) for char in self.chars]
+
+    def test_applies_and_writes_once_per_object(self):
+        def restore(handler):
+            handler.health.restore()
+            handler.mana.restore()
+        result = bulk_apply(self.chars, "resources", restore)
+        self.assertEqual([char.resources.health.cur_val
+                          for char in self.chars], [100, 100, 100])
+        self.assertEqual(self.writes(), [1, 1, 1])
+        self.assertEqual((result.objects, result.written), (3, 3))
+
+    def test_unchanged_objects_are_not_written(self):
+        result = bulk_apply(self.chars, "resources",
+                            lambda handler: handler.health.cur_val)
+        self.assertEqual(self.writes(), [0, 0, 0])
+        self.assertEqual(result.written, 0)
+
+    def test_skips_objects_without_handler(self):
+        result = bulk_apply(self.chars + [object()], "resources",
+                            lambda handler: handler.health.deplete())
+        self.assertEqual((result.objects, result.skipped), (3, 1))
+
+    def test_failed_object_is_rolled_back(self):
+        def drain(handler):
+            handler.health.deplete()
+            if handler is self.chars[1].resources:
+                raise ValueError("boom")
+        with patch('attributes.bulk.logger'):
+            result = bulk_apply(self.chars, "resources", drain)
+        self.assertEqual(result.failed, 1)
+        self.assertEqual(self.chars[1].resources.health.cur_val, 20)
+        self.assertEqual(self.chars[2].resources.health.cur_val, 0)
+        self.assertEqual(self.writes(), [1, 0, 1])
+
+    def test_bypasses_write_behind(self):
+        WRITE_BEHIND.enabled = True
+        try:
+            bulk_apply(self.chars, "resources",
+                       lambda handler: handler.health.deplete())
+            self.assertEqual(WRITE_BEHIND.depth, 0)
+        finally:
+            WRITE_BEHIND.enabled = False
+        self.assertEqual(self.writes(), [1, 1, 1])
+
+    def test_written_objects_leave_write_behind_queue(self):
+        WRITE_BEHIND.enabled = True
+        try:
+            self.chars[0].resources.mana.deplete()
+            self.chars[1].resources.mana.deplete()
+            bulk_apply(self.chars[:1], "resources",
+                       lambda handler: handler.health.deplete())
+            self.assertEqual(self.writes(), [1, 0, 0])
+            self.assertEqual(WRITE_BEHIND.flush(), 1)
+        finally:
+            WRITE_BEHIND.enabled = False
+        self.assertEqual(self.writes(), [1, 1, 0])
+        self.assertEqual(self.chars[0].resources.attrobj.value.mana.cur_val, 0)
+
+    def test_report(self):
+        result = bulk_apply(self.chars, "resources",
+                            lambda handler: handler.health.deplete())
+        self.assertIn("applied to 3 objects", str(result))
+
+
+class BulkRowsTestCase(TestCase):
+
+    def test_failed_write_keeps_every_change(self):
+        objs = [FakeObject(), FakeObject()]
+        for obj in objs:
+            obj.stats = AttributeHandler.load_rows(obj, "stats")
+        objs[1].attributes.add = Mock(side_effect=IOError("deadlock"))
+        with self.assertRaises(IOError):
+            bulk_apply(objs, "stats", lambda handler: handler.add(
+                name="strength", base=10, min=0, max=100))
+        for obj in objs:
+            self.assertEqual(obj.stats._unwritten(), set(["strength"]))
+
+
+class CollectTestCase(TestCase):
+
+    def test_collects_instead_of_writing(self):
+        char = Character(10)
+        with collect() as collected:
+            char.resources.health.deplete()
+            save(char.resources)
+        self.assertEqual(list(collected.values()), [char.resources])
+        self.assertEqual(char.resources.attrobj.writes, [])
+        char.resources.health.restore()
+        self.assertEqual(len(char.resources.attrobj.writes), 1)
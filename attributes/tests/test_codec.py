@@ -0,0 +1,129 @@
+"""
+Unit test for the binary codec of serialized attributes and resources.
+"""
+import pickle
+from django.test import TestCase
+from attributes.attribute import Attribute
+from attributes.codec import (CodecError, decode_attributes,
+                              decode_resources, encode_attributes,
+                              encode_resources)
+from attributes.resource import Resource
+
+
+def serialized_attr(name="strength", mods=()):
+    return Attribute(None, name=name, base=10, min=0, max=100,
+                     modifiers=list(mods)).serialize()
+
+
+MODS = [
+    {"desc": "justice aura", "val": 2, "operator": "+", "dbref": 5,
+     "typeclass": "Script"},
+    {"desc": "the flu", "val": 0.5, "operator": "*", "dbref": None,
+     "typeclass": None, "expires_at": 4000000000.5},
+    {"desc": "justice aura", "val": -3, "operator": "-",
+     "dbref": 2 ** 40, "typeclass": "Object"}
+]
+
+
+class CodecTestCase(TestCase):
+
+    def test_attributes_round_trip(self):
+        attrs = [serialized_attr("strength", MODS), serialized_attr("agility")]
+        self.assertEqual(decode_attributes(encode_attributes(attrs)), attrs)
+
+    def test_resources_round_trip(self):
+        res = Resource(None, name="health", cur_val=40,
+                       min=serialized_attr("min"),
+                       max=serialized_attr("max", MODS),
+                       will_recharge=True, recharge_rate=1.5,
+                       recharge_interval=5).serialize()
+        self.assertEqual(decode_resources(encode_resources([res])), [res])
+
+    def test_decoded_dicts_rebuild_equal_objects(self):
+        attr = Attribute(None, **serialized_attr("strength", MODS))
+        decoded = decode_attributes(encode_attributes([attr.serialize()]))[0]
+        self.assertEqual(Attribute(None, **decoded), attr)
+
+    def test_values(self):
+        attr = serialized_attr()
+        for val in (None, True, False, 0, -128, 127, 128, -2 ** 31,
+                    2 ** 31, 2 ** 63 - 1, 0.25, "text"):
+            attr["base"] = val
+            decoded = decode_attributes(encode_attributes([attr]))[0]
+            self.assertEqual(decoded["base"], val)
+            self.assertEqual(type(decoded["base"]) is bool, type(val) is bool)
+
+    def test_integer_too_large(self):
+        attr = serialized_attr()
+        attr["base"] = 2 ** 64
+        with self.assertRaises(CodecError):
+            encode_attributes([attr])
+
+    def test_unsupported_type(self):
+        attr = serialized_attr()
+        attr["base"] = [10]
+        with self.assertRaises(CodecError):
+            encode_attributes([attr])
+        attr = serialized_attr("strength", MODS[:1])
+        attr["modifiers"][0]["desc"] = 12
+        with self.assertRaises(CodecError):
+            encode_attributes([attr])
+
+    def test_string_too_long(self):
+        with self.assertRaises(CodecError):
+            encode_attributes([serialized_attr("x" * 0x10000)])
+
+    def test_too_many_modifiers(self):
+        attr = serialized_attr()
+        attr["modifiers"] = MODS[:1] * 0x10000
+        with self.assertRaises(CodecError):
+            encode_attributes([attr])
+
+    def test_unknown_operator(self):
+        attr = serialized_attr("strength", MODS[:1])
+        attr["modifiers"][0]["operator"] = "/"
+        with self.assertRaises(CodecError):
+            encode_attributes([attr])
+
+    def test_corrupt_operator(self):
+        mod = dict(MODS[0])
+        add = encode_attributes([serialized_attr("strength", [mod])])
+        mod["operator"] = "*"
+        mul = encode_attributes([serialized_attr("strength", [mod])])
+        offset = [a == b for a, b in zip(bytearray(add),
+                                         bytearray(mul))].index(False)
+        data = add[:offset] + b"\x09" + add[offset + 1:]
+        with self.assertRaises(CodecError):
+            decode_attributes(data)
+
+    def test_strings_stored_once(self):
+        one = encode_attributes([serialized_attr("strength", MODS[:1])])
+        two = encode_attributes([serialized_attr("strength", MODS[:1] * 2)])
+        self.assertLess(len(two) - len(one), len("justice aura"))
+
+    def test_smaller_than_pickle(self):
+        attrs = [serialized_attr("attr{}".format(i), MODS) for i in range(10)]
+        self.assertLess(len(encode_attributes(attrs)),
+                        len(pickle.dumps(attrs, 2)))
+
+    def test_version_mismatch(self):
+        data = encode_attributes([serialized_attr()])
+        with self.assertRaises(CodecError):
+            decode_attributes(b"\x63" + data[1:])
+
+    def test_kind_mismatch(self):
+        data = encode_attributes([serialized_attr()])
+        with self.assertRaises(CodecError):
+            decode_resources(data)
+
+    def test_truncated(self):
+        data = encode_attributes([serialized_attr("strength", MODS)])
+        with self.assertRaises(CodecError):
+            decode_attributes(data[:-3])
+
+    def test_lazy_resource_round_trip(self):
+        res = Resource(None, name="mana", cur_val=10,
+                       min=serialized_attr("min"), max=serialized_attr("max"),
+                       will_recharge=True, lazy_recharge=True,
+                       updated_at=1500000000.25).serialize()
+        self.assertEqual(decode_resources(encode_resources([res])), [res])
@@ -0,0 +1,80 @@
+"""
+Unit test for timestamp based cooldowns.
+"""
+import pickle
+from django.test import TestCase
+from mock import patch
+from attributes.cooldown_handler import CooldownHandler
+from attributes.tests.test_save_wrapper import RecordingAttrObj
+
+NOW = 1500000000.0
+
+
+class Clock(object):
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class CooldownHandlerTestCase(TestCase):
+
+    def setUp(self):
+        self.clock = Clock(NOW)
+        patcher = patch('time.time', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.attrobj = RecordingAttrObj()
+        self.handler = CooldownHandler(self.attrobj)
+
+    def test_never_started_is_ready(self):
+        self.assertTrue(self.handler.ready("bash"))
+        self.assertEqual(self.handler.remaining("bash"), 0)
+        self.assertNotIn("bash", self.handler)
+
+    def test_start(self):
+        self.handler.start("bash", 10)
+        self.assertFalse(self.handler.ready("bash"))
+        self.assertIn("bash", self.handler)
+        self.clock.now += 4
+        self.assertEqual(self.handler.remaining("bash"), 6)
+        self.clock.now += 6
+        self.assertTrue(self.handler.ready("bash"))
+        self.assertEqual(len(self.handler), 0)
+
+    def test_restart_replaces(self):
+        self.handler.start("bash", 10)
+        self.handler.start("bash", 3)
+        self.assertEqual(self.handler.remaining("bash"), 3)
+
+    def test_end_and_clear(self):
+        self.handler.start("bash", 10)
+        self.handler.start("kick", 10)
+        self.handler.end("bash")
+        self.assertTrue(self.handler.ready("bash"))
+        self.handler.end("never started")
+        self.handler.clear()
+        self.assertEqual(len(self.handler), 0)
+
+    def test_all(self):
+        self.handler.start("bash", 10)
+        self.handler.start("kick", 2)
+        self.clock.now += 5
+        self.assertEqual(self.handler.all(), {"bash": 5})
+
+    def test_saves_on_change(self):
+        self.handler.start("bash", 10)
+        self.handler.end("bash")
+        self.assertEqual(self.attrobj.writes,
+                         [self.handler, self.handler])
+        self.handler.ready("bash")
+        self.assertEqual(len(self.attrobj.writes), 2)
+
+    def test_pickle_drops_expired(self):
+        self.handler.start("bash", 10)
+        self.handler.start("kick", 2)
+        self.clock.now += 5
+        restored = pickle.loads(pickle.dumps(self.handler))
+        self.assertEqual(restored._expires, {"bash": NOW + 10})
+        self.assertEqual(restored.remaining("bash"), 5)
@@ -0,0 +1,218 @@
+"""
+Unit test for persistent delays and the callback registry.
+"""
+from django.test import TestCase
+from mock import Mock, patch
+from attributes import delay_handler
+from attributes.callbacks import (CallbackRegistry,
+                                  CallbackRegistryException, CALLBACKS,
+                                  register_callback)
+from attributes.delay import Delay
+from attributes.delay_handler import (DelayHandler, DelayHandlerException,
+                                      rehydrate_delays)
+from attributes.timing_wheel import TimingWheel
+
+NOW = 1500000000.0
+FIRED = []
+
+
+@register_callback
+def end_stun(dbref):
+    FIRED.append(dbref)
+
+
+class Clock(object):
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class AttrObj(object):
+    def __init__(self, id, value=None):
+        self.id = id
+        self.value = value
+
+
+class CallbackRegistryTestCase(TestCase):
+
+    def test_register_by_dotted_name(self):
+        key = "attributes.tests.test_delay_handler.end_stun"
+        self.assertIn(key, CALLBACKS)
+        self.assertIs(CALLBACKS.get(key), end_stun)
+        self.assertEqual(CALLBACKS.key_for(end_stun), key)
+
+    def test_register_with_key(self):
+        registry = CallbackRegistry()
+        func = Mock(__name__="func", __module__="world")
+        registry.register(func, key="effects.func")
+        self.assertIs(registry.get("effects.func"), func)
+        self.assertNotIn("world.func", registry)
+
+    def test_unknown(self):
+        registry = CallbackRegistry()
+        self.assertRaises(CallbackRegistryException, registry.get, "nope")
+        self.assertRaises(CallbackRegistryException, registry.key_for,
+                          end_stun)
+
+
+class DelayHandlerTestCase(TestCase):
+
+    def setUp(self):
+        self.clock = Clock(NOW)
+        patcher = patch('time.time', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(delay_handler._LOADED.clear)
+        self.wheel = TimingWheel(resolution=1.0, clock=self.clock)
+        FIRED[:] = []
+
+    def advance(self, seconds):
+        self.clock.now += seconds
+        self.wheel.advance()
+
+    def test_add_persists_callback_key(self):
+        attrobj = AttrObj(1)
+        handler = DelayHandler(attrobj, wheel=self.wheel)
+        handler.add("stun", delay_in_seconds=5, callback=end_stun, retval=12)
+        handler.save()
+        self.assertEqual(attrobj.value, {"stun": {
+            "fire_at": NOW + 5,
+            "callback": "attributes.tests.test_delay_handler.end_stun",
+            "retval": 12}})
+
+    def test_add_existing_raises(self):
+        handler = DelayHandler(AttrObj(1), wheel=self.wheel)
+        handler.add("stun", delay_in_seconds=5, callback=end_stun)
+        self.assertRaises(DelayHandlerException, handler.add, "stun",
+                          delay_in_seconds=5, callback=end_stun)
+
+    def test_unregistered_callback_cannot_be_saved(self):
+        handler = DelayHandler(AttrObj(1), wheel=self.wheel)
+        handler.add("stun", delay_in_seconds=5, callback=lambda: None)
+        self.assertRaises(CallbackRegistryException, handler.save)
+
+    def test_fired_delay_is_forgotten(self):
+        attrobj = AttrObj(1)
+        handler = DelayHandler(attrobj, wheel=self.wheel)
+        handler.add("stun", delay_in_seconds=5, callback=end_stun, retval=12)
+        handler.add("slow", delay_in_seconds=50, callback=end_stun, retval=13)
+        self.advance(5)
+        self.assertEqual(FIRED, [12])
+        self.assertEqual(list(handler.all()), ["slow"])
+        self.assertEqual(list(attrobj.value), ["slow"])
+
+    def test_validate_and_clear(self):
+        attrobj = AttrObj(1)
+        handler = DelayHandler(attrobj, wheel=self.wheel)
+        for name in ("a", "b", "c"):
+            handler.add(name, delay_in_seconds=5, callback=end_stun)
+        handler.get("b").cancel()
+        handler.validate()
+        self.assertEqual(sorted(handler.all()), ["a", "c"])
+        handler.clear()
+        self.assertEqual(handler.all(), {})
+        self.assertEqual(attrobj.value, {})
+
+    def test_survives_reload(self):
+        attrobj = AttrObj(1)
+        handler = DelayHandler(attrobj, wheel=self.wheel)
+        handler.add("stun", delay_in_seconds=30, callback=end_stun, retval=12)
+        handler.save()
+        self.clock.now += 10
+        wheel = TimingWheel(resolution=1.0, clock=self.clock)
+        restored = DelayHandler.load(attrobj, wheel=wheel)
+        self.assertIs(DelayHandler.load(attrobj), restored)
+        self.assertEqual(restored.get("stun").get_time_remaining(), 20)
+        self.clock.now += 20
+        wheel.advance()
+        self.assertEqual(FIRED, [12])
+
+    def test_load_applies_wheel_to_cached_handler(self):
+        attrobj = AttrObj(1, {"stun": {
+            "fire_at": NOW + 5, "retval": 12,
+            "callback": "attributes.tests.test_delay_handler.end_stun"}})
+        with patch('attributes.delay.delay') as reactor_delay:
+            reactor_delay.return_value.getTime.return_value = NOW + 5
+            rehydrate_delays([attrobj])
+            handler = DelayHandler.load(attrobj, wheel=self.wheel)
+        reactor_delay.return_value.cancel.assert_called_once_with()
+        self.assertIs(handler.wheel, self.wheel)
+        self.assertEqual(handler.get("stun").get_time(), NOW + 5)
+        self.advance(5)
+        self.assertEqual(FIRED, [12])
+
+    def test_unload_cancels_and_forgets(self):
+        attrobj = AttrObj(1)
+        handler = DelayHandler.load(attrobj, wheel=self.wheel)
+        handler.add("stun", delay_in_seconds=5, callback=end_stun, retval=12)
+        handler.save()
+        DelayHandler.unload(attrobj)
+        self.assertNotIn(1, delay_handler._LOADED)
+        self.assertEqual(handler.all(), {})
+        self.advance(5)
+        self.assertEqual(FIRED, [])
+        self.assertEqual(len(self.wheel), 0)
+        DelayHandler.unload(None)
+
+    def test_loads_legacy_delays(self):
+        attrobj = AttrObj(1, {"stun": {"delay_in_seconds": 5,
+                                       "callback": end_stun, "retval": 3}})
+        handler = DelayHandler.load(attrobj, wheel=self.wheel)
+        self.assertEqual(handler.get("stun").get_time(), NOW + 5)
+
+
+class RehydrateDelaysTestCase(TestCase):
+
+    def setUp(self):
+        self.addCleanup(delay_handler._LOADED.clear)
+        FIRED[:] = []
+        self.scheduled = []
+        patcher = patch('attributes.delay.delay',
+                        Mock(side_effect=lambda *args: self.scheduled.append(
+                            args)))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = patch('time.time', Mock(return_value=NOW))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def serialized(self, fire_at, retval):
+        return {"fire_at": fire_at, "retval": retval,
+                "callback": "attributes.tests.test_delay_handler.end_stun"}
+
+    def test_overdue_delays_catch_up_in_batches(self):
+        attributes = [AttrObj(id, {
+            "stun": self.serialized(NOW - id, id),
+            "slow": self.serialized(NOW + 100, id)})
+                      for id in range(1, 6)]
+        overdue = rehydrate_delays(attributes, batch_size=2, interval=3)
+        self.assertEqual(overdue, 5)
+        stuns = sorted((args[0], args[2]) for args in self.scheduled
+                       if args[0] != 100)
+        # oldest first, two per batch
+        self.assertEqual(stuns, [(0, 4), (0, 5), (3, 2), (3, 3), (6, 1)])
+        self.assertEqual(sum(1 for args in self.scheduled if args[0] == 100),
+                         5)
+
+    def test_unregistered_key_dropped(self):
+        stale = dict(self.serialized(NOW - 5, 1), callback="world.gone")
+        attributes = [AttrObj(1, {"stale": stale,
+                                  "stun": self.serialized(NOW + 5, 1)}),
+                      AttrObj(2, {"stale": dict(stale, fire_at=NOW + 5),
+                                  "stun": self.serialized(NOW - 5, 2)})]
+        with patch('attributes.delay_handler.logger') as logger:
+            self.assertEqual(rehydrate_delays(attributes), 2)
+        self.assertEqual(logger.log_err.call_count, 2)
+        self.assertEqual(len(self.scheduled), 2)
+        for attrobj in attributes:
+            self.assertEqual(list(DelayHandler.load(attrobj).all()),
+                             ["stun"])
+
+    def test_loaded_once(self):
+        attrobj = AttrObj(1, {"stun": self.serialized(NOW + 5, 1)})
+        handler = DelayHandler.load(attrobj)
+        rehydrate_delays([attrobj])
+        self.assertEqual(len(self.scheduled), 1)
+        self.assertIs(DelayHandler.load(attrobj), handler)
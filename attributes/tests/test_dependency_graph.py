@@ -0,0 +1,101 @@
+"""
+Unit test for DependencyGraph and derived attributes.
+"""
+import pickle
+from django.test import TestCase
+from attributes.attribute_handler import AttributeHandler
+from attributes.dependency_graph import DependencyGraph, DependencyCycleError
+from attributes.tests.helpers import AttrObj
+
+
+def max_health(constitution, level):
+    return constitution * 10 + level * 5
+
+
+def double(val):
+    return val * 2
+
+
+class DependencyGraphTestCase(TestCase):
+
+    def setUp(self):
+        self.graph = DependencyGraph()
+        self.graph.add("max_health", ["constitution", "level"])
+        self.graph.add("regen", ["max_health"])
+        self.graph.add("carry", ["strength"])
+
+    def test_downstream_order(self):
+        self.assertEqual(self.graph.downstream("constitution"),
+                         ["max_health", "regen"])
+        self.assertEqual(self.graph.downstream("strength"), ["carry"])
+        self.assertEqual(self.graph.downstream("regen"), [])
+
+    def test_cycle_rejected(self):
+        self.assertRaises(DependencyCycleError, self.graph.add,
+                          "constitution", ["regen"])
+        self.assertRaises(DependencyCycleError, self.graph.add,
+                          "level", ["level"])
+        self.assertNotIn("constitution", self.graph)
+
+    def test_failed_redefinition_keeps_edges(self):
+        self.assertRaises(DependencyCycleError, self.graph.add,
+                          "max_health", ["regen"])
+        self.assertEqual(self.graph.inputs["max_health"],
+                         ("constitution", "level"))
+
+    def test_remove(self):
+        self.graph.remove("regen")
+        self.assertEqual(self.graph.downstream("level"), ["max_health"])
+
+
+class DerivedAttributeTestCase(TestCase):
+
+    def setUp(self):
+        self.handler = AttributeHandler(AttrObj())
+        self.handler.add(name="constitution", base=10, min=0, max=100)
+        self.handler.add(name="level", base=1, min=1, max=50)
+        self.handler.add(name="max_health", base=0, min=0, max=1000)
+        self.handler.add(name="regen", base=0, min=0, max=1000)
+        self.handler.derive("max_health", ["constitution", "level"],
+                            max_health)
+        self.handler.derive("regen", ["max_health"], double)
+
+    def test_initial_values(self):
+        self.assertEqual(self.handler.max_health.base, 105)
+        self.assertEqual(self.handler.regen.base, 210)
+
+    def test_input_change_propagates(self):
+        self.handler.level.base = 3
+        self.assertEqual(self.handler.max_health.base, 115)
+        self.assertEqual(self.handler.regen.base, 230)
+
+    def test_modifier_change_propagates(self):
+        self.handler.constitution.add_mod(desc="bear endurance", val=5,
+                                          operator="+")
+        self.assertEqual(self.handler.max_health.base, 155)
+        self.assertEqual(self.handler.regen.base, 310)
+
+    def test_unrelated_change_does_not_recompute(self):
+        self.handler.add(name="charisma", base=5, min=0, max=10)
+        misses = self.handler.constitution.cache_misses
+        self.handler.charisma.base = 6
+        self.assertEqual(self.handler.constitution.cache_misses, misses)
+
+    def test_cycle_rejected(self):
+        self.assertRaises(DependencyCycleError, self.handler.derive,
+                          "constitution", ["regen"], double)
+
+    def test_remove_input_rejected(self):
+        self.assertRaises(AttributeError, self.handler.remove, "level")
+        self.handler.remove("regen")
+        self.assertNotIn("regen", self.handler.derived)
+
+    def test_underive(self):
+        self.handler.underive("regen")
+        self.handler.level.base = 3
+        self.assertEqual(self.handler.regen.base, 210)
+
+    def test_pickle_round_trip(self):
+        handler = pickle.loads(pickle.dumps(self.handler, 2))
+        handler.level.base = 3
+        self.assertEqual(handler.regen.base, 230)
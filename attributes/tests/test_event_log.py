@@ -0,0 +1,113 @@
+"""
+Unit test for the resource event log.
+"""
+import pickle
+from django.test import TestCase
+from mock import Mock, patch
+from attributes.event_log import ResourceEventLog
+from attributes.resource_handler import ResourceHandler
+from attributes.tests.helpers import bound
+from attributes.tests.test_save_wrapper import RecordingAttrObj
+
+NOW = 1500000000.0
+
+
+class ResourceEventLogTestCase(TestCase):
+
+    def setUp(self):
+        self.log = ResourceEventLog(capacity=4)
+
+    def test_events_oldest_first(self):
+        self.log.record(1.0, "health", -5, 12)
+        self.log.record(2.0, "mana", -3)
+        self.assertEqual(list(self.log.events()),
+                         [(1.0, "health", -5, 12), (2.0, "mana", -3, None)])
+
+    def test_overwrites_oldest_when_full(self):
+        for second in range(6):
+            self.log.record(float(second), "health", -1, second)
+        self.assertEqual(len(self.log), 4)
+        self.assertEqual(self.log.recorded, 6)
+        self.assertEqual([event[0] for event in self.log.events()],
+                         [2.0, 3.0, 4.0, 5.0])
+
+    def test_filters(self):
+        self.log.record(1.0, "health", -5, 12)
+        self.log.record(2.0, "mana", -3)
+        self.log.record(3.0, "health", -2, 12)
+        self.assertEqual(len(list(self.log.events(resource="health"))), 2)
+        self.assertEqual(len(list(self.log.events(since=2.0))), 2)
+        self.assertEqual(list(self.log.events(resource="rage")), [])
+
+    def test_sum_by_source(self):
+        self.log.record(1.0, "health", -5, 12)
+        self.log.record(2.0, "health", -7, 13)
+        self.log.record(3.0, "health", -2, 12)
+        self.log.record(4.0, "health", 4)
+        self.assertEqual(self.log.sum_by_source(resource="health"),
+                         {12: -7, 13: -7, None: 4})
+        self.assertEqual(self.log.sum_by_source(since=2.0),
+                         {12: -2, 13: -7, None: 4})
+
+    def test_rate(self):
+        self.log.record(1.0, "health", -10, 12)
+        self.log.record(6.0, "health", -6, 12)
+        self.log.record(8.0, "health", -4, 13)
+        self.assertEqual(self.log.rate(5, 10.0, resource="health"), -2.0)
+        self.assertEqual(self.log.rate(10, 10.0, source=12), -1.6)
+        self.assertRaises(ValueError, self.log.rate, 0, 10.0)
+
+    def test_clear(self):
+        self.log.record(1.0, "health", -5, 12)
+        self.log.clear()
+        self.assertEqual(len(self.log), 0)
+        self.assertEqual(list(self.log.events()), [])
+
+
+class ResourceHandlerEventLogTestCase(TestCase):
+
+    def setUp(self):
+        patcher = patch('time.time', Mock(return_value=NOW))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.handler = ResourceHandler(RecordingAttrObj())
+        for name in ("health", "mana"):
+            self.handler.add(name=name, cur_val=50, min=bound("min", 0),
+                             max=bound("max", 100))
+
+    def test_disabled_by_default(self):
+        self.handler.health.change(-5, source=12)
+        self.assertIsNone(self.handler.event_log)
+
+    def test_records_changes(self):
+        event_log = self.handler.enable_event_log(capacity=8)
+        self.handler.health.change(-5, source=12)
+        self.handler.mana.cur_val = 80
+        self.handler.health.restore()
+        self.assertEqual(list(event_log.events()),
+                         [(NOW, "health", -5, 12), (NOW, "mana", 30, None),
+                          (NOW, "health", 55, None)])
+
+    def test_records_clamped_delta(self):
+        event_log = self.handler.enable_event_log()
+        self.handler.health.change(-80, source=12)
+        self.handler.health.change(-10, source=12)
+        self.assertEqual(event_log.sum_by_source(), {12: -50})
+
+    def test_spend_records_source(self):
+        event_log = self.handler.enable_event_log()
+        self.handler.spend({"health": 10, "mana": 20}, source=7)
+        self.assertEqual(event_log.sum_by_source(resource="mana"), {7: -20})
+
+    def test_not_pickled(self):
+        self.handler.enable_event_log()
+        self.handler.health.change(-5, source=12)
+        restored = pickle.loads(pickle.dumps(self.handler))
+        self.assertIsNone(restored.event_log)
+        self.assertEqual(restored.health.cur_val, 45)
+
+    def test_disable(self):
+        self.handler.enable_event_log()
+        self.handler.disable_event_log()
+        self.handler.health.change(-5)
+        self.assertIsNone(self.handler.event_log)
@@ -0,0 +1,90 @@
+"""
+Unit test for building attributes and resources on first access.
+"""
+import pickle
+from django.test import TestCase
+from attributes.attribute_handler import AttributeHandler
+from attributes.modifier_index import MODIFIER_INDEX
+from attributes.resource_handler import ResourceHandler
+from attributes.tests.helpers import AttrObj, bound
+
+
+def double(val):
+    return val * 2
+
+
+class LazyAttributeHandlerTestCase(TestCase):
+
+    def setUp(self):
+        handler = AttributeHandler(AttrObj())
+        handler.add(**bound("strength", 10))
+        handler.add(**bound("agility", 12))
+        handler.add(**bound("carry", 0))
+        handler.derive("carry", ["strength"], double)
+        self.handler = pickle.loads(pickle.dumps(handler, 2))
+
+    def test_nothing_built_on_load(self):
+        self.assertEqual(self.handler.attributes, {})
+        self.assertEqual(len(self.handler), 3)
+        self.assertIn("agility", self.handler)
+
+    def test_built_on_access(self):
+        self.assertEqual(self.handler.agility.cur_val, 12)
+        self.assertEqual(list(self.handler.attributes), ["agility"])
+        self.assertIs(self.handler.get("agility"), self.handler.agility)
+
+    def test_derived_built_on_propagation(self):
+        self.handler.strength.base = 20
+        self.assertEqual(self.handler.carry.base, 40)
+        self.assertNotIn("agility", self.handler.attributes)
+
+    def test_remove_without_building(self):
+        self.handler.remove("agility")
+        self.assertNotIn("agility", self.handler)
+        self.assertRaises(AttributeError, self.handler.get, "agility")
+
+    def test_all_builds_everything(self):
+        self.assertEqual(len(self.handler.all()), 3)
+        self.assertEqual(len(self.handler.attributes), 3)
+
+    def test_pickle_keeps_unbuilt_and_changes(self):
+        self.handler.strength.base = 15
+        handler = pickle.loads(pickle.dumps(self.handler, 2))
+        self.assertEqual(handler.strength.base, 15)
+        self.assertEqual(handler.agility.base, 12)
+        self.assertEqual(handler.carry.base, 30)
+
+    def test_sourced_modifiers_built_on_load(self):
+        self.handler.agility.add_mod(desc="aura", val=1, operator="+",
+                                     dbref=4242, typeclass="Object")
+        handler = pickle.loads(pickle.dumps(self.handler, 2))
+        self.assertEqual(list(handler.attributes), ["agility"])
+        owners = [owner for owner, _ in MODIFIER_INDEX.get(4242)]
+        self.assertIn(handler.attributes["agility"], owners)
+
+
+class LazyResourceHandlerTestCase(TestCase):
+
+    def setUp(self):
+        handler = ResourceHandler(AttrObj())
+        for name in ("health", "mana"):
+            handler.add(name=name, cur_val=50, min=bound("min", 0),
+                        max=bound("max", 100))
+        self.handler = pickle.loads(pickle.dumps(handler, 2))
+
+    def test_built_on_access(self):
+        self.assertEqual(self.handler.resources, {})
+        self.assertEqual(len(self.handler), 2)
+        self.assertEqual(self.handler.mana.cur_val, 50)
+        self.assertEqual(list(self.handler.resources), ["mana"])
+
+    def test_rollback_keeps_unbuilt(self):
+        try:
+            with self.handler.batch():
+                self.handler.remove("health")
+                self.handler.mana.cur_val = 10
+                raise ValueError
+        except ValueError:
+            pass
+        self.assertEqual(self.handler.mana.cur_val, 50)
+        self.assertEqual(self.handler.health.cur_val, 50)
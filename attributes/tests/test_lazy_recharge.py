@@ -0,0 +1,90 @@
+"""
+Unit test for resources recharged lazily from the time elapsed.
+"""
+import pickle
+from django.test import TestCase
+from mock import patch
+from attributes.observer_constants import Crossing
+from attributes.resource import Resource
+from attributes.tests.helpers import AttrObj, bound
+
+NOW = 1500000000.0
+
+
+class LazyRechargeTestCase(TestCase):
+
+    def setUp(self):
+        patcher = patch('time.time', return_value=NOW)
+        self.time = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.mana = Resource(AttrObj(), name="mana", cur_val=10,
+                             min=bound("min", 0), max=bound("max", 100),
+                             recharge_interval=5, recharge_rate=2,
+                             will_recharge=True, lazy_recharge=True)
+
+    def elapse(self, seconds):
+        self.time.return_value += seconds
+
+    def test_closed_form(self):
+        self.elapse(4)
+        self.assertEqual(self.mana.cur_val, 10)
+        self.elapse(8)
+        self.assertEqual(self.mana.cur_val, 14)
+        self.elapse(1000)
+        self.assertEqual(self.mana.cur_val, 100)
+
+    def test_reads_do_not_write(self):
+        self.elapse(12)
+        self.mana.cur_val
+        self.assertEqual(self.mana._cur_val, 10)
+        self.assertEqual(self.mana._updated_at, NOW)
+
+    def test_recharging_reported_before_change(self):
+        crossings = []
+        self.mana.add_threshold(
+            0.25, lambda res, level, old, new: crossings.append((old, new)),
+            Crossing.RISING, percentage=True)
+        self.elapse(200)
+        self.mana.cur_val -= 5
+        self.assertEqual(crossings, [(0.1, 0.9)])
+
+    def test_change_keeps_progress_towards_next_interval(self):
+        self.elapse(12)
+        self.mana.cur_val -= 4
+        self.assertEqual(self.mana._cur_val, 10)
+        self.assertEqual(self.mana._updated_at, NOW + 10)
+        self.elapse(3)
+        self.assertEqual(self.mana.cur_val, 12)
+
+    def test_nothing_banked_at_max(self):
+        self.elapse(1000)
+        self.mana.cur_val = 50
+        self.elapse(4)
+        self.assertEqual(self.mana.cur_val, 50)
+
+    def test_persisted_settled(self):
+        self.elapse(12)
+        serialized = self.mana.serialize()
+        self.assertEqual(serialized["cur_val"], 14)
+        self.assertEqual(serialized["updated_at"], NOW + 10)
+        mana = pickle.loads(pickle.dumps(self.mana, 2))
+        self.elapse(3)
+        self.assertEqual(mana.cur_val, 16)
+        self.assertEqual(Resource(None, **serialized).cur_val, 16)
+
+    def test_toggle(self):
+        self.mana.toggle_recharge_off()
+        self.elapse(100)
+        self.assertEqual(self.mana.cur_val, 10)
+        self.mana.toggle_recharge_on()
+        self.assertEqual(self.mana.cur_val, 10)
+        self.elapse(5)
+        self.assertEqual(self.mana.cur_val, 12)
+
+    def test_not_lazy_by_default(self):
+        mana = Resource(AttrObj(), name="mana", cur_val=10,
+                        min=bound("min", 0), max=bound("max", 100),
+                        will_recharge=True)
+        self.elapse(1000)
+        self.assertEqual(mana.cur_val, 10)
+        self.assertNotIn("updated_at", mana.serialize())
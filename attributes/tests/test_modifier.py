@@ -1,6 +1,7 @@
 """
 Unit test for modifiers.
 """
+import pickle
 from django.test import TestCase
 from attributes.modifier import (Modifier, MultiplyModifier, SubtractModifier,
                                 AddModifier)
@@ -104,3 +105,24 @@ class ModifierTestCase(TestCase):
 
     def test_serialize_multi(self):
         self.assertEqual(self.multi_mod.serialize(), self.MULTI_SERIAL)
+
+    def test_slotted(self):
+        self.assertFalse(hasattr(self.add_mod, "__dict__"))
+
+    def test_desc_shared(self):
+        mod = AddModifier(desc="".join(list(self.DESC)), val=self.MOD_VAL)
+        self.assertIs(mod.desc, self.add_mod.desc)
+
+    def test_pickle_round_trip(self):
+        self.add_mod.id = 7
+        mod = pickle.loads(pickle.dumps(self.add_mod, 2))
+        self.assertEqual(mod, self.add_mod)
+        self.assertEqual(mod.id, 7)
+        self.assertIs(mod.desc, self.add_mod.desc)
+
+    def test_unpickle_dict_state(self):
+        mod = AddModifier.__new__(AddModifier)
+        mod.__setstate__({"desc": self.DESC, "val": self.MOD_VAL,
+                          "dbref": self.DBREF, "typeclass": self.TYPECLASS})
+        self.assertEqual(mod, self.add_mod)
+        self.assertIsNone(mod.id)
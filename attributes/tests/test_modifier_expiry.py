@@ -0,0 +1,129 @@
+"""
+Unit test for timed modifiers and the shared expiry schedule.
+"""
+import gc
+import pickle
+import time
+from django.test import TestCase
+from mock import Mock, patch
+from attributes.attribute import Attribute
+from attributes.attribute_handler import AttributeHandler
+from attributes.modifier import Modifier
+from attributes.modifier_expiry import ModifierExpiry
+from attributes.tests.test_row_store import FakeObject
+
+
+# far enough in the future that reads never expire anything on their own
+LATER = time.time() + 10000
+
+
+def attribute(mods=()):
+    return Attribute(Mock(), name="strength", base=10, min=0, max=100,
+                     modifiers=list(mods))
+
+
+class TimedModifierTestCase(TestCase):
+
+    def test_serialize_only_when_timed(self):
+        mod = Modifier.factory(desc="war cry", val=5, operator="+")
+        self.assertNotIn("expires_at", mod.serialize())
+        mod = Modifier.factory(desc="war cry", val=5, operator="+",
+                               expires_at=100.0)
+        self.assertEqual(mod.serialize()["expires_at"], 100.0)
+        self.assertEqual(pickle.loads(pickle.dumps(mod, 2)).expires_at, 100.0)
+
+    def test_legacy_state(self):
+        mod = Modifier.factory(desc="war cry", val=5, operator="+")
+        mod.__setstate__(("war cry", 5, None, None, 3))
+        self.assertIsNone(mod.expires_at)
+        self.assertEqual(mod.id, 3)
+
+    def test_duration(self):
+        attr = attribute()
+        before = time.time()
+        mod = attr.modifiers.add(desc="war cry", val=5, operator="+",
+                                 duration=30)
+        self.assertTrue(before + 30 <= mod.expires_at <= time.time() + 30)
+
+    def test_expired_on_read(self):
+        attr = attribute()
+        attr.add_mod(desc="war cry", val=5, operator="+", duration=1000)
+        attr.add_mod(desc="stun", val=3, operator="-",
+                     expires_at=time.time() + 1000)
+        self.assertEqual(attr.cur_val, 12)
+        with patch('time.time', return_value=time.time() + 2000):
+            self.assertEqual(attr.cur_val, 10)
+            self.assertEqual(len(attr.modifiers), 0)
+            self.assertEqual(attr.modifiers.aggregates(), (1, 0))
+
+    def test_expire(self):
+        attr = attribute([
+            {"desc": "a", "val": 1, "operator": "+",
+             "expires_at": LATER + 10.0},
+            {"desc": "b", "val": 2, "operator": "+",
+             "expires_at": LATER + 20.0},
+            {"desc": "c", "val": 4, "operator": "+"}
+        ])
+        attr.modifiers.remove(attr.get_mod("b"))
+        self.assertEqual(attr.modifiers.expire(now=LATER + 15.0), 1)
+        self.assertEqual(attr.modifiers.expire(now=LATER + 25.0), 0)
+        self.assertEqual([mod.desc for mod in attr.modifiers.all()], ["c"])
+
+    def test_pickle_reschedules(self):
+        attr = Attribute(None, name="strength", base=10, min=0, max=100,
+                         modifiers=[{"desc": "a", "val": 1, "operator": "+",
+                                     "expires_at": LATER}])
+        attr = pickle.loads(pickle.dumps(attr, 2))
+        self.assertEqual(attr.cur_val, 11)
+        self.assertEqual(attr.modifiers.expire(now=LATER), 1)
+        self.assertEqual(attr.cur_val, 10)
+
+
+class ModifierExpiryTestCase(TestCase):
+
+    def setUp(self):
+        self.expiry = ModifierExpiry()
+        patcher = patch('attributes.modifier_handler.MODIFIER_EXPIRY',
+                        self.expiry)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_sweep(self):
+        attrs = [attribute([{"desc": "a", "val": 1, "operator": "+",
+                             "expires_at": LATER + 10.0 + i}])
+                 for i in range(3)]
+        self.assertEqual(len(self.expiry), 3)
+        self.assertEqual(self.expiry.next_expiry(), LATER + 10.0)
+        with patch('attributes.modifier_expiry.save') as save:
+            self.assertEqual(self.expiry.sweep(now=LATER + 11.0), 2)
+        self.assertEqual(save.call_count, 2)
+        self.assertEqual([attr.cur_val for attr in attrs], [10, 10, 11])
+        self.assertEqual(len(self.expiry), 1)
+        self.assertEqual(self.expiry.swept, 2)
+
+    def test_sweep_saves_each_attribute_once(self):
+        attr = attribute([{"desc": "a", "val": 1, "operator": "+",
+                    "expires_at": LATER + 10.0},
+                   {"desc": "b", "val": 1, "operator": "+",
+                    "expires_at": LATER + 10.5}])
+        with patch('attributes.modifier_expiry.save') as save:
+            self.assertEqual(self.expiry.sweep(now=LATER + 11.0), 2)
+        self.assertEqual(save.call_count, 1)
+        self.assertEqual(attr.cur_val, 10)
+
+    def test_sweep_writes_rows(self):
+        obj = FakeObject()
+        handler = AttributeHandler.load_rows(obj, "stats")
+        handler.add(name="strength", base=10, min=0, max=100)
+        handler.strength.add_mod(desc="a", val=1, operator="+",
+                                 expires_at=LATER + 10.0)
+        self.assertEqual(self.expiry.sweep(now=LATER + 11.0), 1)
+        row = obj.attributes.rows[("strength", "stats")]
+        self.assertEqual(row["modifiers"], [])
+
+    def test_unloaded_handlers_are_skipped(self):
+        attribute([{"desc": "a", "val": 1, "operator": "+",
+                    "expires_at": LATER + 10.0}])
+        gc.collect()
+        self.assertEqual(self.expiry.sweep(now=LATER + 11.0), 0)
+        self.assertEqual(len(self.expiry), 0)
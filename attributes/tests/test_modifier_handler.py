@@ -62,10 +62,10 @@ class ModifierHandlerTestCase(TestCase):
         return mod_list
 
     def test_initial_state(self):
-        self.assertIn(self.add_mod, self.handler._raw_modifiers)
-        self.assertIn(self.sub_mod, self.handler._raw_modifiers)
-        self.assertIn(self.multi_mod, self.handler._raw_modifiers)
-        self.assertIn(self.multi_float_mod, self.handler._raw_modifiers)
+        self.assertIn(self.add_mod, self.handler.all())
+        self.assertIn(self.sub_mod, self.handler.all())
+        self.assertIn(self.multi_mod, self.handler.all())
+        self.assertIn(self.multi_float_mod, self.handler.all())
         dict_mod_values = self.unpack_modifiers(self.handler)
         self.assertIn(self.add_mod, dict_mod_values)
         self.assertIn(self.sub_mod, dict_mod_values)
@@ -116,7 +116,7 @@ class ModifierHandlerTestCase(TestCase):
         mod = self.handler.get(self.ADD_MOD['desc'])
         self.handler.remove(mod)
         self.assertNotIn(mod, self.handler.modifiers.values())
-        self.assertNotIn(mod, self.handler._raw_modifiers)
+        self.assertNotIn(mod, self.handler.all())
 
     def test_all(self):
         mod_list = [self.add_mod, self.sub_mod, self.multi_mod,
@@ -130,3 +130,95 @@ class ModifierHandlerTestCase(TestCase):
                         * self.FLOAT_VAL 
                         + self.BASE_VAL 
                         - self.BASE_VAL)
+
+    def test_get_mod_val_cached(self):
+        self.handler.get_modified_val(self.BASE_VAL)
+        self.handler.get_modified_val(self.BASE_VAL)
+        self.assertEqual(self.handler.cache_hits, 1)
+        self.assertEqual(self.handler.cache_misses, 1)
+
+    def test_get_mod_val_cache_keyed_on_base(self):
+        self.handler.get_modified_val(self.BASE_VAL)
+        self.assertEqual(self.handler.get_modified_val(1), 
+                        1 * self.BASE_VAL * self.FLOAT_VAL)
+        self.assertEqual(self.handler.cache_misses, 2)
+
+    def test_add_invalidates_cache(self):
+        self.handler.get_modified_val(self.BASE_VAL)
+        self.handler.add(**self.ADD_MOD)
+        self.assertEqual(self.handler.get_modified_val(self.BASE_VAL),
+                        self.BASE_VAL 
+                        * self.BASE_VAL 
+                        * self.FLOAT_VAL 
+                        + self.BASE_VAL)
+
+    def test_remove_invalidates_cache(self):
+        self.handler.get_modified_val(self.BASE_VAL)
+        self.handler.remove(self.handler.get(self.ADD_MOD['desc']))
+        self.assertEqual(self.handler.get_modified_val(self.BASE_VAL),
+                        self.BASE_VAL 
+                        * self.BASE_VAL 
+                        * self.FLOAT_VAL 
+                        - self.BASE_VAL)
+
+    def test_change_notifies_owner(self):
+        owner = Mock()
+        handler = ModifierHandler([], owner=owner)
+        handler.add(**self.ADD_MOD)
+        owner._invalidate.assert_called_once_with()
+
+    def test_get_mod_val_after_removing_all(self):
+        for mod in self.handler.all():
+            self.handler.remove(mod)
+        self.assertEqual(self.handler.get_modified_val(self.BASE_VAL),
+                        self.BASE_VAL)
+
+    def test_get_mod_val_with_zero_multiplier(self):
+        zero_mod = dict(self.MULTI_MOD, val=0, desc="paralysis")
+        self.handler.add(**zero_mod)
+        self.assertEqual(self.handler.get_modified_val(self.BASE_VAL), 0)
+        self.handler.remove(self.handler.get("paralysis"))
+        self.assertEqual(self.handler.get_modified_val(self.BASE_VAL),
+                        self.BASE_VAL 
+                        * self.BASE_VAL 
+                        * self.FLOAT_VAL 
+                        + self.BASE_VAL 
+                        - self.BASE_VAL)
+
+    def test_get_mod_val_many_modifiers(self):
+        handler = ModifierHandler([self.ADD_MOD] * 50 + [self.MULTI_MOD] * 3)
+        self.assertEqual(handler.get_modified_val(2),
+                        2 * 10 ** 3 + 50 * self.BASE_VAL)
+
+    def test_add_assigns_unique_ids(self):
+        ids = [mod.id for mod in self.handler.all()]
+        self.assertEqual(len(set(ids)), len(self.RAW_MODS))
+
+    def test_remove_id(self):
+        mod = self.handler.get(self.SUB_MOD['desc'])
+        self.assertEqual(self.handler.remove_id(mod.id), mod)
+        self.assertNotIn(mod, self.handler.all())
+        self.assertRaises(AttributeError, self.handler.get,
+                          self.SUB_MOD['desc'])
+        self.assertRaises(AttributeError, self.handler.remove_id, mod.id)
+
+    def test_remove_equal_copy(self):
+        self.handler.remove(self.sub_mod)
+        self.assertNotIn(self.sub_mod, self.handler.all())
+        self.assertEqual(len(self.handler), len(self.RAW_MODS) - 1)
+
+    def test_remove_missing(self):
+        self.handler.remove(self.sub_mod)
+        self.assertRaises(AttributeError, self.handler.remove, self.sub_mod)
+
+    def test_filter_returns_first_added(self):
+        self.handler.add(**self.MULTI_MOD)
+        first = self.handler.get(self.MULTI_MOD['desc'], dbref=3)
+        self.assertEqual(first.id, min(mod.id for mod in self.handler.all()
+                                      if mod == self.multi_mod))
+
+    def test_filter_no_match(self):
+        self.assertRaises(AttributeError, self.handler.get,
+                          self.MULTI_MOD['desc'], dbref=1)
+        self.assertRaises(AttributeError, self.handler.get,
+                          self.MULTI_MOD['desc'], dbref=3, typeclass='Script')
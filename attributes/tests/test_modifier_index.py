@@ -0,0 +1,140 @@
+"""
+Unit test for ModifierIndex.
+"""
+import gc
+import pickle
+from django.test import TestCase
+from mock import Mock
+from attributes.attribute import Attribute
+from attributes.attribute_handler import AttributeHandler
+from attributes.modifier_index import MODIFIER_INDEX
+from attributes.tests.test_row_store import FakeObject
+
+
+class ModifierIndexTestCase(TestCase):
+    SWORD = 1234
+    AURA = 77
+    SWORD_MOD = {
+                'desc': "sharp sword",
+                'val': 5,
+                'dbref': SWORD,
+                'typeclass': 'Object',
+                'operator': '+'
+    }
+    AURA_MOD = {
+                'desc': "justice aura",
+                'val': 2,
+                'dbref': AURA,
+                'typeclass': 'Script',
+                'operator': '*'
+    }
+
+    def setUp(self):
+        self.strength = Attribute(Mock(), name="strength", base=10, min=0,
+                                  max=100, modifiers=[self.SWORD_MOD,
+                                                      self.AURA_MOD])
+        self.agility = Attribute(Mock(), name="agility", base=10, min=0,
+                                 max=100, modifiers=[self.SWORD_MOD])
+
+    def tearDown(self):
+        MODIFIER_INDEX.purge(self.SWORD)
+        MODIFIER_INDEX.purge(self.AURA)
+        MODIFIER_INDEX.source_exists = None
+        MODIFIER_INDEX._purged.clear()
+        MODIFIER_INDEX._checked.clear()
+
+    def test_get(self):
+        owners = [owner for owner, mod_id in MODIFIER_INDEX.get(self.SWORD)]
+        self.assertEqual(len(owners), 2)
+        self.assertIn(self.strength, owners)
+        self.assertIn(self.agility, owners)
+
+    def test_get_filters_typeclass(self):
+        self.assertEqual(MODIFIER_INDEX.get(self.AURA, typeclass="Object"), [])
+        self.assertEqual(len(MODIFIER_INDEX.get(self.AURA,
+                                                typeclass="Script")), 1)
+
+    def test_remove_unregisters(self):
+        self.agility.remove_mod(self.agility.get_mod("sharp sword"))
+        owners = [owner for owner, mod_id in MODIFIER_INDEX.get(self.SWORD)]
+        self.assertEqual(owners, [self.strength])
+
+    def test_purge(self):
+        self.assertEqual(MODIFIER_INDEX.purge(self.SWORD), 2)
+        self.assertEqual(len(self.strength.modifiers), 1)
+        self.assertEqual(len(self.agility.modifiers), 0)
+        self.assertEqual(self.strength.cur_val, 20)
+        self.assertEqual(MODIFIER_INDEX.get(self.SWORD), [])
+        self.assertTrue(self.strength.attrobj.value is self.strength)
+
+    def test_purge_writes_rows(self):
+        obj = FakeObject()
+        handler = AttributeHandler.load_rows(obj, "stats")
+        handler.add(name="luck", base=1, min=0, max=10)
+        handler.luck.add_mod(**dict(self.SWORD_MOD, dbref=42))
+        self.assertEqual(MODIFIER_INDEX.purge(42), 1)
+        self.assertEqual(obj.attributes.rows[("luck", "stats")]["modifiers"],
+                         [])
+
+    def test_purge_wrong_typeclass(self):
+        self.assertEqual(MODIFIER_INDEX.purge(self.SWORD, typeclass="Script"),
+                         0)
+        self.assertEqual(len(MODIFIER_INDEX.get(self.SWORD)), 2)
+
+    def test_purged_source_dropped_on_load(self):
+        attr = Attribute(None, name="luck", base=0, min=0, max=10,
+                         modifiers=[dict(self.SWORD_MOD, dbref=42)])
+        stored = pickle.dumps(attr, 2)
+        MODIFIER_INDEX.purge(42, typeclass="Object")
+        loaded = pickle.loads(stored)
+        self.assertEqual(len(loaded.modifiers), 0)
+        self.assertEqual(loaded.cur_val, 0)
+        self.assertEqual(MODIFIER_INDEX.get(42), [])
+        rebuilt = Attribute(Mock(), name="luck", base=0, min=0, max=10,
+                            modifiers=[dict(self.SWORD_MOD, dbref=42)])
+        self.assertEqual(len(rebuilt.modifiers), 0)
+
+    def test_purge_wrong_typeclass_kept_on_load(self):
+        MODIFIER_INDEX.purge(42, typeclass="Script")
+        attr = Attribute(Mock(), name="luck", base=0, min=0, max=10,
+                         modifiers=[dict(self.SWORD_MOD, dbref=42)])
+        self.assertEqual(len(attr.modifiers), 1)
+        MODIFIER_INDEX.purge(42)
+
+    def test_source_added_again_is_kept_on_load(self):
+        aura = dict(self.AURA_MOD, dbref=42)
+        stored = pickle.dumps(Attribute(None, name="luck", base=0, min=0,
+                                        max=10, modifiers=[aura]), 2)
+        MODIFIER_INDEX.purge(42, typeclass="Script")
+        self.agility.add_mod(**aura)
+        self.assertEqual(len(pickle.loads(stored).modifiers), 1)
+        MODIFIER_INDEX.purge(42)
+
+    def test_purge_any_typeclass(self):
+        self.agility.add_mod(**dict(self.SWORD_MOD, typeclass="Character"))
+        self.assertEqual(MODIFIER_INDEX.purge(self.SWORD), 3)
+        self.assertEqual(len(self.agility.modifiers), 0)
+
+    def test_deleted_source_dropped_on_load(self):
+        MODIFIER_INDEX.source_exists = Mock(return_value=False)
+        attr = Attribute(Mock(), name="luck", base=0, min=0, max=10,
+                         modifiers=[dict(self.SWORD_MOD, dbref=42),
+                                    dict(self.SWORD_MOD, dbref=42,
+                                         desc="dull sword")])
+        self.assertEqual(len(attr.modifiers), 0)
+        MODIFIER_INDEX.source_exists.assert_called_once_with(42, "Object")
+
+    def test_existing_source_kept_on_load(self):
+        MODIFIER_INDEX.source_exists = Mock(return_value=True)
+        attr = Attribute(Mock(), name="luck", base=0, min=0, max=10,
+                         modifiers=[dict(self.SWORD_MOD, dbref=42)])
+        self.assertEqual(len(attr.modifiers), 1)
+        MODIFIER_INDEX.purge(42)
+
+    def test_collected_handler_dropped(self):
+        attr = Attribute(Mock(), name="temp", base=0, min=0, max=10)
+        attr.add_mod(**dict(self.SWORD_MOD, dbref=999))
+        self.assertEqual(len(MODIFIER_INDEX.get(999)), 1)
+        del attr
+        gc.collect()
+        self.assertNotIn(999, MODIFIER_INDEX.sources)
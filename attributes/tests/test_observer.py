@@ -0,0 +1,113 @@
+"""
+Unit test for coalesced change notifications.
+"""
+import pickle
+from django.test import TestCase
+from mock import Mock, patch
+from attributes.attribute import Attribute
+from attributes.observer import NOTIFIER
+from attributes.observer_constants import NotifyType
+from attributes.resource import Resource
+from attributes.resource_constants import AttributeType
+from attributes.tests.helpers import AttrObj, bound
+
+
+class ObserverTestCase(TestCase):
+
+    def setUp(self):
+        patcher = patch('attributes.observer.delay')
+        self.delay = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(NOTIFIER.flush)
+        self.attr = Attribute(AttrObj(), name="strength", base=10, min=0,
+                              max=100)
+        self.resource = Resource(AttrObj(), name="health", cur_val=50,
+                                 min=bound("min", 0), max=bound("max", 100))
+
+    def test_coalesced_per_tick(self):
+        callback = Mock()
+        self.attr.subscribe(callback)
+        for i in range(50):
+            self.attr.add_mod(desc="war cry", val=1, operator="+")
+        self.attr.base = 20
+        self.assertEqual(self.delay.call_count, 1)
+        self.assertFalse(callback.called)
+        self.assertEqual(NOTIFIER.flush(), 1)
+        callback.assert_called_once_with(self.attr, {
+            NotifyType.CUR_VAL: (10, 70),
+            NotifyType.BASE: (10, 20)
+        })
+
+    def test_changes_that_cancel_out_are_not_delivered(self):
+        callback = Mock()
+        self.attr.subscribe(callback)
+        self.attr.base = 15
+        self.attr.base = 10
+        self.assertEqual(NOTIFIER.flush(), 0)
+        self.assertFalse(callback.called)
+
+    def test_filtered_by_type(self):
+        base_callback = Mock()
+        max_callback = Mock()
+        self.attr.subscribe(base_callback, [NotifyType.BASE])
+        self.attr.subscribe(max_callback, [NotifyType.MAX])
+        self.attr.base = 12
+        NOTIFIER.flush()
+        base_callback.assert_called_once_with(self.attr, {
+            NotifyType.BASE: (10, 12)})
+        self.assertFalse(max_callback.called)
+
+    def test_old_values_since_last_delivery(self):
+        callback = Mock()
+        self.attr.subscribe(callback, [NotifyType.BASE])
+        self.attr.base = 12
+        NOTIFIER.flush()
+        self.attr.base = 14
+        NOTIFIER.flush()
+        callback.assert_called_with(self.attr, {NotifyType.BASE: (12, 14)})
+
+    def test_unsubscribe(self):
+        callback = Mock()
+        self.attr.subscribe(callback)
+        self.attr.unsubscribe(callback)
+        self.attr.base = 12
+        NOTIFIER.flush()
+        self.assertFalse(callback.called)
+        self.assertRaises(ValueError, self.attr.unsubscribe, callback)
+
+    def test_no_subscribers_no_scheduling(self):
+        self.attr.base = 12
+        self.assertFalse(self.delay.called)
+
+    def test_failing_subscriber_does_not_stop_others(self):
+        failing = Mock(side_effect=RuntimeError)
+        callback = Mock()
+        self.attr.subscribe(failing)
+        self.attr.subscribe(callback)
+        self.attr.base = 12
+        self.assertEqual(NOTIFIER.flush(), 2)
+        self.assertTrue(callback.called)
+
+    def test_resource(self):
+        callback = Mock()
+        self.resource.subscribe(callback)
+        self.resource.cur_val = 30
+        self.resource.add_mod(AttributeType.MAX, desc="vigor", val=20,
+                              operator="+")
+        NOTIFIER.flush()
+        callback.assert_called_once_with(self.resource, {
+            NotifyType.CUR_VAL: (50, 30),
+            NotifyType.MAX: (100, 120)
+        })
+
+    def test_subscriptions_not_pickled(self):
+        self.resource.subscribe(Mock())
+        resource = pickle.loads(pickle.dumps(self.resource, 2))
+        self.assertEqual(resource._subscribers, [])
+        callback = Mock()
+        resource.subscribe(callback)
+        resource.add_mod(AttributeType.MAX, desc="vigor", val=20,
+                         operator="+")
+        NOTIFIER.flush()
+        callback.assert_called_once_with(resource, {
+            NotifyType.MAX: (100, 120)})
@@ -0,0 +1,85 @@
+"""
+Unit test for the central regeneration ticker.
+"""
+import gc
+from django.test import TestCase
+from mock import Mock, patch
+from attributes.observer_constants import Crossing
+from attributes.regen import RegenTicker
+from attributes.resource import Resource
+from attributes.resource_handler import ResourceHandler
+from attributes.tests.helpers import bound
+
+NOW = 1500000000.0
+
+
+class RegenTickerTestCase(TestCase):
+
+    def setUp(self):
+        self.regen = RegenTicker()
+        for target, new in (('attributes.resource.REGEN', self.regen),
+                            ('time.time', Mock(return_value=NOW))):
+            patcher = patch(target, new)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.handler = ResourceHandler(Mock())
+        for name, interval in (("health", 5), ("mana", 5), ("stamina", 2)):
+            self.handler.add(name=name, cur_val=10, min=bound("min", 0),
+                             max=bound("max", 100), recharge_interval=interval,
+                             recharge_rate=3, will_recharge=True)
+        self.handler.add(name="rage", cur_val=10, min=bound("min", 0),
+                         max=bound("max", 100))
+
+    def test_registered_while_recharging(self):
+        self.assertEqual(len(self.regen), 3)
+        self.handler.health.toggle_recharge_off()
+        self.assertEqual(len(self.regen), 2)
+        self.handler.rage.toggle_recharge_on()
+        self.assertEqual(len(self.regen), 3)
+
+    def test_tick_advances_due_groups(self):
+        self.assertEqual(self.regen.tick(NOW + 1), 0)
+        self.assertEqual(self.regen.tick(NOW + 2), 1)
+        self.assertEqual(self.handler.stamina.cur_val, 13)
+        self.assertEqual(self.regen.tick(NOW + 5), 3)
+        self.assertEqual([self.handler.get(name).cur_val
+                          for name in ("health", "mana", "stamina")],
+                         [13, 13, 16])
+
+    def test_missed_intervals_caught_up(self):
+        self.regen.tick(NOW + 15)
+        self.assertEqual(self.handler.health.cur_val, 19)
+        self.regen.tick(NOW + 16)
+        self.assertEqual(self.handler.health.cur_val, 19)
+
+    def test_saves_each_handler_once(self):
+        with patch('attributes.regen.save') as save:
+            self.regen.tick(NOW + 5)
+        save.assert_called_once_with(self.handler)
+        with patch('attributes.regen.save') as save:
+            for resource in self.handler.all():
+                resource.restore()
+            self.regen.tick(NOW + 10)
+        self.assertFalse(save.called)
+
+    def test_thresholds_see_every_step(self):
+        callback = Mock()
+        self.handler.health.add_threshold(13, callback, Crossing.RISING)
+        self.regen.tick(NOW + 5)
+        callback.assert_called_once_with(self.handler.health, 13, 10, 13)
+
+    def test_interval_change_moves_group(self):
+        self.handler.health.recharge_interval = 7
+        self.regen.tick(NOW + 5)
+        self.assertEqual(self.handler.health.cur_val, 10)
+        self.regen.tick(NOW + 7)
+        self.assertEqual(self.handler.health.cur_val, 13)
+
+    def test_lazy_and_collected_resources_are_not_ticked(self):
+        Resource(None, name="mana", cur_val=10, min=bound("min", 0),
+                 max=bound("max", 100), will_recharge=True,
+                 lazy_recharge=True)
+        self.assertEqual(len(self.regen), 3)
+        self.handler = None
+        gc.collect()
+        self.assertEqual(len(self.regen), 0)
@@ -0,0 +1,66 @@
+"""
+Unit test for spending several resources at once.
+"""
+from django.test import TestCase
+from attributes.observer_constants import Crossing
+from attributes.resource_handler import (ResourceHandler,
+                                         ResourceHandlerException)
+from attributes.tests.helpers import bound
+from attributes.tests.test_save_wrapper import RecordingAttrObj
+
+
+class ResourceCostTestCase(TestCase):
+
+    def setUp(self):
+        self.attrobj = RecordingAttrObj()
+        self.handler = ResourceHandler(self.attrobj)
+        for name, cur_val, low in (("mana", 20, 0), ("stamina", 10, 0),
+                                   ("reagents", 3, 1)):
+            self.handler.add(name=name, cur_val=cur_val, min=bound("min", low),
+                             max=bound("max", 100))
+        self.attrobj.writes = []
+
+    def test_can_afford(self):
+        self.assertTrue(self.handler.can_afford({"mana": 20, "reagents": 2}))
+        self.assertFalse(self.handler.can_afford({"mana": 5, "reagents": 3}))
+
+    def test_shortfall(self):
+        self.assertEqual(self.handler.shortfall({"mana": 25, "stamina": 10,
+                                                 "reagents": 4}),
+                         {"mana": 5, "reagents": 2})
+        self.assertEqual(self.handler.shortfall({"mana": 1}), {})
+
+    def test_spend_deducts_all_and_saves_once(self):
+        self.handler.spend({"mana": 10, "stamina": 5, "reagents": 1})
+        self.assertEqual(self.handler.mana.cur_val, 10)
+        self.assertEqual(self.handler.stamina.cur_val, 5)
+        self.assertEqual(self.handler.reagents.cur_val, 2)
+        self.assertEqual(self.attrobj.writes, [self.handler])
+
+    def test_spend_fails_without_deducting(self):
+        with self.assertRaises(ResourceHandlerException) as ctx:
+            self.handler.spend({"mana": 10, "stamina": 11})
+        self.assertEqual(ctx.exception.shortfall, {"stamina": 1})
+        self.assertEqual(self.handler.mana.cur_val, 20)
+        self.assertEqual(self.handler.stamina.cur_val, 10)
+        self.assertEqual(self.attrobj.writes, [])
+
+    def test_spend_rejects_negative_cost(self):
+        with self.assertRaises(ResourceHandlerException):
+            self.handler.spend({"mana": -5})
+        self.assertEqual(self.handler.mana.cur_val, 20)
+
+    def test_spend_unknown_resource(self):
+        with self.assertRaises(AttributeError):
+            self.handler.spend({"mana": 1, "rage": 1})
+        self.assertEqual(self.handler.mana.cur_val, 20)
+
+    def test_spend_rolls_back_if_a_deduction_raises(self):
+        def explode(subject, level, old, new):
+            raise RuntimeError("boom")
+        self.handler.stamina.add_threshold(5, explode, Crossing.FALLING)
+        with self.assertRaises(RuntimeError):
+            self.handler.spend({"mana": 10, "stamina": 6})
+        self.assertEqual(self.handler.mana.cur_val, 20)
+        self.assertEqual(self.handler.stamina.cur_val, 10)
+        self.assertEqual(self.attrobj.writes, [])
@@ -0,0 +1,88 @@
+"""
+Unit test for storing an AttributeHandler as one row per attribute.
+"""
+from django.test import TestCase
+from attributes.attribute_handler import AttributeHandler, DERIVED_ROW
+
+
+def double(val):
+    return val * 2
+
+
+class FakeRow(object):
+    def __init__(self, key, value):
+        self.key = key
+        self.value = value
+
+
+class FakeEvenniaAttributes(object):
+    """Stand-in for an Evennia object's AttributeHandler."""
+    def __init__(self):
+        self.rows = {}
+        self.writes = []
+        self.deletes = []
+
+    def get(self, category=None, return_obj=False, return_list=False):
+        return [FakeRow(key, value) for (key, cat), value in self.rows.items()
+                if cat == category]
+
+    def add(self, key, value, category=None):
+        self.writes.append(key)
+        self.rows[(key, category)] = value
+
+    def remove(self, key, category=None):
+        self.deletes.append(key)
+        self.rows.pop((key, category), None)
+
+
+class FakeObject(object):
+    def __init__(self):
+        self.attributes = FakeEvenniaAttributes()
+
+
+class RowStoreTestCase(TestCase):
+
+    def setUp(self):
+        self.obj = FakeObject()
+        self.handler = AttributeHandler.load_rows(self.obj, "stats")
+        for name in ("strength", "agility", "wisdom", "carry"):
+            self.handler.add(name=name, base=10, min=0, max=100)
+        self.obj.attributes.writes = []
+
+    def test_add_writes_one_row(self):
+        self.handler.add(name="luck", base=1, min=0, max=10)
+        self.assertEqual(self.obj.attributes.writes, ["luck"])
+
+    def test_modifier_writes_only_changed_row(self):
+        self.handler.agility.add_mod(desc="haste", val=2, operator="+")
+        self.assertEqual(self.obj.attributes.writes, ["agility"])
+
+    def test_remove_deletes_row(self):
+        self.handler.remove("wisdom")
+        self.assertEqual(self.obj.attributes.writes, [])
+        self.assertEqual(self.obj.attributes.deletes, ["wisdom"])
+
+    def test_unsaved_changes_written_on_next_save(self):
+        self.handler.strength.base = 20
+        self.handler.agility.add_mod(desc="haste", val=2, operator="+")
+        self.assertEqual(sorted(self.obj.attributes.writes),
+                         ["agility", "strength"])
+
+    def test_derivations_stored(self):
+        self.handler.derive("carry", ["strength"], double)
+        self.assertIn(DERIVED_ROW, self.obj.attributes.writes)
+
+    def test_round_trip(self):
+        self.handler.derive("carry", ["strength"], double)
+        self.handler.agility.add_mod(desc="haste", val=2, operator="+")
+        handler = AttributeHandler.load_rows(self.obj, "stats")
+        self.assertEqual(len(handler), 4)
+        self.assertEqual(handler.agility.cur_val, 12)
+        handler.strength.base = 15
+        self.assertEqual(handler.carry.base, 30)
+
+    def test_batch_writes_changed_rows_once(self):
+        with self.handler.batch():
+            self.handler.agility.add_mod(desc="haste", val=2, operator="+")
+            self.handler.agility.add_mod(desc="slow", val=1, operator="-")
+        self.assertEqual(self.obj.attributes.writes, ["agility"])
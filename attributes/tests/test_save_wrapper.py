@@ -0,0 +1,122 @@
+"""
+Unit test for save routing and batched saves.
+"""
+from django.test import TestCase
+from attributes.attribute_handler import AttributeHandler
+from attributes.resource_handler import ResourceHandler
+from attributes.resource_constants import AttributeType
+
+
+class RecordingAttrObj(object):
+    """Stand-in for an Evennia Attribute that records every write."""
+    def __init__(self):
+        self.writes = []
+
+    @property
+    def value(self):
+        return self.writes[-1] if self.writes else None
+
+    @value.setter
+    def value(self, new_val):
+        self.writes.append(new_val)
+
+
+class BatchAttributeHandlerTestCase(TestCase):
+
+    def setUp(self):
+        self.attrobj = RecordingAttrObj()
+        self.handler = AttributeHandler(self.attrobj)
+        self.handler.add(name="strength", base=10, min=0, max=100)
+        self.handler.add(name="agility", base=10, min=0, max=100)
+        self.attrobj.writes = []
+
+    def test_attribute_save_writes_handler(self):
+        self.handler.strength.add_mod(desc="war cry", val=2, operator="+")
+        self.assertEqual(self.attrobj.writes, [self.handler])
+
+    def test_batch_coalesces_saves(self):
+        with self.handler.batch():
+            self.handler.strength.add_mod(desc="war cry", val=2, operator="+")
+            self.handler.agility.add_mod(desc="war cry", val=2, operator="+")
+            self.handler.add(name="luck", base=1, min=0, max=10)
+            self.assertEqual(self.attrobj.writes, [])
+        self.assertEqual(self.attrobj.writes, [self.handler])
+
+    def test_batch_without_changes_does_not_save(self):
+        with self.handler.batch():
+            self.handler.strength.cur_val
+        self.assertEqual(self.attrobj.writes, [])
+
+    def test_nested_batch_joins_outer(self):
+        with self.handler.batch():
+            with self.handler.strength.batch():
+                self.handler.strength.add_mod(desc="bless", val=2,
+                                              operator="*")
+            self.assertEqual(self.attrobj.writes, [])
+        self.assertEqual(len(self.attrobj.writes), 1)
+
+    def test_batch_rolls_back_on_exception(self):
+        strength = self.handler.strength
+        try:
+            with self.handler.batch():
+                strength.add_mod(desc="war cry", val=2, operator="+")
+                strength.base = 50
+                self.handler.remove("agility")
+                self.handler.add(name="luck", base=1, min=0, max=10)
+                raise ValueError("fizzle")
+        except ValueError:
+            pass
+        self.assertEqual(self.attrobj.writes, [])
+        self.assertIs(self.handler.strength, strength)
+        self.assertEqual(strength.cur_val, 10)
+        self.assertEqual(len(strength.modifiers), 0)
+        self.assertEqual(self.handler.agility.cur_val, 10)
+        self.assertIsNone(self.handler.get("luck", default=None))
+
+    def test_batch_ends_on_base_exception(self):
+        try:
+            with self.handler.batch():
+                self.handler.strength.add_mod(desc="war cry", val=2,
+                                              operator="+")
+                raise KeyboardInterrupt()
+        except KeyboardInterrupt:
+            pass
+        self.assertEqual(self.attrobj.writes, [])
+        self.handler.strength.add_mod(desc="bless", val=2, operator="*")
+        self.assertEqual(self.attrobj.writes, [self.handler])
+
+
+class BatchResourceHandlerTestCase(TestCase):
+    HEALTH = {
+        'name': "health",
+        'cur_val': 50,
+        'min': {'name': "health_min", 'base': 0, 'min': 0, 'max': 0},
+        'max': {'name': "health_max", 'base': 100, 'min': 0, 'max': 1000},
+    }
+
+    def setUp(self):
+        self.attrobj = RecordingAttrObj()
+        self.handler = ResourceHandler(self.attrobj)
+        self.handler.add(**self.HEALTH)
+        self.attrobj.writes = []
+
+    def test_batch_coalesces_saves(self):
+        with self.handler.batch():
+            self.handler.health.add_mod(AttributeType.MAX, desc="vigor",
+                                        val=20, operator="+")
+            self.handler.health.restore()
+        self.assertEqual(self.attrobj.writes, [self.handler])
+        self.assertEqual(self.handler.health.cur_val, 120)
+
+    def test_batch_rolls_back_on_exception(self):
+        try:
+            with self.handler.batch():
+                self.handler.health.deplete()
+                self.handler.health.add_mod(AttributeType.MAX, desc="vigor",
+                                            val=20, operator="+")
+                raise ValueError("fizzle")
+        except ValueError:
+            pass
+        self.assertEqual(self.attrobj.writes, [])
+        self.assertEqual(self.handler.health.cur_val, 50)
+        self.assertEqual(self.handler.health.max, 100)
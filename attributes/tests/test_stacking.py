@@ -0,0 +1,128 @@
+"""
+Unit test for stacking policies of same-desc modifiers.
+"""
+import pickle
+import random
+from django.test import TestCase
+from attributes.attribute import Attribute
+from attributes.modifier import Modifier, OP_ADD
+from attributes.stacking import (ADDITIVE, STACKING_POLICIES, STRONGEST,
+                                 CappedCount, DiminishingReturns, Stack)
+from attributes.tests.helpers import AttrObj
+
+
+def attribute():
+    return Attribute(AttrObj(), name="strength", base=10, min=0, max=1000)
+
+
+class StackTestCase(TestCase):
+
+    def test_capped_count_matches_brute_force(self):
+        rand = random.Random(7)
+        stack = Stack(CappedCount(3), OP_ADD)
+        live = {}
+        for mod_id in range(300):
+            if live and rand.random() < 0.4:
+                modifier = live.pop(rand.choice(sorted(live)))
+                stack.remove(modifier)
+            else:
+                modifier = Modifier.factory(desc="bleeding", operator="+",
+                                            val=rand.randint(-20, 20))
+                modifier.id = mod_id
+                live[mod_id] = modifier
+                stack.add(modifier)
+            strongest = sorted(live.values(),
+                               key=lambda mod: (abs(mod.val), mod.id))[-3:]
+            self.assertEqual(stack.bonus, sum(mod.val for mod in strongest))
+            self.assertEqual(len(stack), len(live))
+
+    def test_invalid_policies(self):
+        self.assertRaises(ValueError, CappedCount, 0)
+        self.assertRaises(ValueError, DiminishingReturns, 0)
+
+
+class StackingPolicyTestCase(TestCase):
+
+    def setUp(self):
+        self.attr = attribute()
+        self.addCleanup(STACKING_POLICIES.remove, "war cry")
+
+    def test_default_is_additive(self):
+        self.assertIs(STACKING_POLICIES.get("war cry"), ADDITIVE)
+        self.attr.add_mod(desc="war cry", val=2, operator="+")
+        self.attr.add_mod(desc="war cry", val=3, operator="+")
+        self.assertEqual(self.attr.cur_val, 15)
+
+    def test_strongest(self):
+        STACKING_POLICIES.set("war cry", STRONGEST)
+        self.attr.add_mod(desc="war cry", val=2, operator="+")
+        self.attr.add_mod(desc="war cry", val=5, operator="+")
+        self.attr.add_mod(desc="war cry", val=3, operator="+")
+        self.attr.add_mod(desc="bless", val=1, operator="+")
+        self.assertEqual(self.attr.cur_val, 16)
+        self.attr.remove_mod(self.attr.get_mod("war cry", val=5))
+        self.assertEqual(self.attr.cur_val, 14)
+
+    def test_capped_count(self):
+        STACKING_POLICIES.set("war cry", CappedCount(2))
+        for val in (1, 4, 2, 3):
+            self.attr.add_mod(desc="war cry", val=val, operator="+")
+        self.assertEqual(self.attr.cur_val, 17)
+
+    def test_stacks_per_operator(self):
+        STACKING_POLICIES.set("war cry", STRONGEST)
+        self.attr.add_mod(desc="war cry", val=2, operator="+")
+        self.attr.add_mod(desc="war cry", val=4, operator="+")
+        self.attr.add_mod(desc="war cry", val=1.5, operator="*")
+        self.attr.add_mod(desc="war cry", val=2, operator="*")
+        self.assertEqual(self.attr.cur_val, 24)
+
+    def test_multipliers_combine_bonuses(self):
+        STACKING_POLICIES.set("war cry", CappedCount(2))
+        for val in (1.5, 1.25, 1.1):
+            self.attr.add_mod(desc="war cry", val=val, operator="*")
+        self.assertAlmostEqual(self.attr.cur_val, 17.5)
+
+    def test_diminishing_returns(self):
+        STACKING_POLICIES.set("war cry", DiminishingReturns(10))
+        self.attr.add_mod(desc="war cry", val=10, operator="+")
+        self.assertAlmostEqual(self.attr.cur_val, 15)
+        for _ in range(9):
+            self.attr.add_mod(desc="war cry", val=10, operator="+")
+        self.assertAlmostEqual(self.attr.cur_val, 10 + 100 / 11.0)
+        self.assertLess(self.attr.cur_val, 20)
+
+    def test_policy_change_restacks_live_handler(self):
+        self.attr.add_mod(desc="war cry", val=2, operator="+")
+        STACKING_POLICIES.set("war cry", STRONGEST)
+        self.attr.add_mod(desc="war cry", val=5, operator="+")
+        self.assertEqual(self.attr.cur_val, 15)
+        self.attr.remove_mod(self.attr.get_mod("war cry", val=2))
+        self.assertEqual(self.attr.cur_val, 15)
+        self.attr.remove_mod(self.attr.get_mod("war cry", val=5))
+        self.assertEqual(self.attr.cur_val, 10)
+
+    def test_policy_removal_restacks_live_handler(self):
+        STACKING_POLICIES.set("war cry", STRONGEST)
+        self.attr.add_mod(desc="war cry", val=2, operator="+")
+        STACKING_POLICIES.remove("war cry")
+        self.attr.add_mod(desc="war cry", val=5, operator="+")
+        self.assertEqual(self.attr.cur_val, 17)
+        self.attr.remove_mod(self.attr.get_mod("war cry", val=2))
+        self.assertEqual(self.attr.cur_val, 15)
+
+    def test_policy_change_applies_on_read(self):
+        self.attr.add_mod(desc="war cry", val=2, operator="+")
+        self.attr.add_mod(desc="war cry", val=5, operator="+")
+        self.assertEqual(self.attr.cur_val, 17)
+        STACKING_POLICIES.set("war cry", STRONGEST)
+        self.assertEqual(self.attr.cur_val, 15)
+
+    def test_policy_applied_on_reload(self):
+        self.attr.add_mod(desc="war cry", val=2, operator="+")
+        self.attr.add_mod(desc="war cry", val=5, operator="+")
+        attr = pickle.loads(pickle.dumps(self.attr, 2))
+        STACKING_POLICIES.set("war cry", STRONGEST)
+        self.assertEqual(attr.cur_val, 15)
+        attr.remove_mod(attr.get_mod("war cry", val=5))
+        self.assertEqual(attr.cur_val, 12)
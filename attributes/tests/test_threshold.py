@@ -0,0 +1,80 @@
+"""
+Unit test for threshold crossing triggers.
+"""
+from django.test import TestCase
+from mock import Mock, call
+from attributes.attribute import Attribute
+from attributes.observer_constants import Crossing
+from attributes.resource import Resource
+from attributes.resource_constants import AttributeType
+from attributes.threshold import ThresholdSet
+from attributes.tests.helpers import AttrObj, bound
+
+
+class ThresholdSetTestCase(TestCase):
+
+    def setUp(self):
+        self.subject = object()
+        self.thresholds = ThresholdSet(self.subject, 50)
+        self.falling = Mock()
+        self.rising = Mock()
+        for level in (10, 25, 75):
+            self.thresholds.add(level, self.falling, Crossing.FALLING)
+            self.thresholds.add(level, self.rising, Crossing.RISING)
+
+    def test_fires_only_on_crossing(self):
+        self.assertEqual(self.thresholds.update(30), 0)
+        self.assertEqual(self.thresholds.update(25), 1)
+        self.falling.assert_called_once_with(self.subject, 25, 30, 25)
+        self.assertEqual(self.thresholds.update(20), 0)
+        self.assertFalse(self.rising.called)
+
+    def test_crossing_several_levels_nearest_first(self):
+        self.assertEqual(self.thresholds.update(0), 2)
+        self.assertEqual(self.falling.call_args_list,
+                         [call(self.subject, 25, 50, 0),
+                          call(self.subject, 10, 50, 0)])
+        self.assertEqual(self.thresholds.update(100), 3)
+        self.assertEqual([args[0][1] for args in self.rising.call_args_list],
+                         [10, 25, 75])
+
+    def test_remove(self):
+        self.thresholds.remove(25, self.falling)
+        self.thresholds.update(20)
+        self.assertFalse(self.falling.called)
+        self.thresholds.remove(25, self.rising)
+        self.assertEqual(self.thresholds._levels, [10, 75])
+        self.assertRaises(ValueError, self.thresholds.remove, 25,
+                          self.rising)
+
+    def test_invalid_direction(self):
+        self.assertRaises(ValueError, self.thresholds.add, 5, Mock(), 3)
+
+
+class SubjectThresholdTestCase(TestCase):
+
+    def test_attribute(self):
+        attr = Attribute(AttrObj(), name="fatigue", base=50, min=0, max=100)
+        callback = Mock()
+        attr.add_threshold(80, callback, Crossing.RISING)
+        attr.base = 70
+        attr.add_mod(desc="sprint", val=15, operator="+")
+        callback.assert_called_once_with(attr, 80, 70, 85)
+        attr.remove_threshold(80, callback)
+        attr.base = 0
+        attr.base = 90
+        self.assertEqual(callback.call_count, 1)
+
+    def test_resource_values_and_percentages(self):
+        health = Resource(AttrObj(), name="health", cur_val=100,
+                          min=bound("min", 0), max=bound("max", 100))
+        empty = Mock()
+        low = Mock()
+        health.add_threshold(0, empty, Crossing.FALLING)
+        health.add_threshold(0.25, low, Crossing.FALLING, percentage=True)
+        health.cur_val = 30
+        self.assertFalse(low.called)
+        health.add_mod(AttributeType.MAX, desc="vigor", val=50, operator="+")
+        low.assert_called_once_with(health, 0.25, 0.3, 0.2)
+        health.deplete()
+        empty.assert_called_once_with(health, 0, 30, 0)
@@ -0,0 +1,145 @@
+"""
+Unit test for the hierarchical timing wheel.
+"""
+import random
+from django.test import TestCase
+from mock import Mock, patch
+from attributes.delay import Delay
+from attributes.timing_wheel import TimingWheel, TimingWheelException
+
+
+class Clock(object):
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class TimingWheelTestCase(TestCase):
+
+    def setUp(self):
+        self.clock = Clock()
+        # a small wheel, so timers cascade and overflow quickly
+        self.wheel = TimingWheel(resolution=1.0, slots=4, levels=3,
+                                 clock=self.clock)
+        self.fired = []
+
+    def schedule(self, seconds, name):
+        return self.wheel.call_later(seconds, self.fired.append, name)
+
+    def advance_to(self, now):
+        self.clock.now = now
+        return self.wheel.advance()
+
+    def test_fires_when_due(self):
+        self.schedule(3, "a")
+        self.advance_to(1002.0)
+        self.assertEqual(self.fired, [])
+        self.assertEqual(self.advance_to(1003.0), 1)
+        self.assertEqual(self.fired, ["a"])
+        self.assertEqual(len(self.wheel), 0)
+
+    def test_fires_after_cascading_and_overflow(self):
+        for seconds in (1, 5, 17, 63, 64, 200):
+            self.schedule(seconds, seconds)
+        fired_at = {}
+        for second in range(1, 202):
+            self.advance_to(1000.0 + second)
+            for name in self.fired:
+                fired_at.setdefault(name, second)
+        self.assertEqual(fired_at, {1: 1, 5: 5, 17: 17, 63: 63, 64: 64,
+                                    200: 200})
+
+    def test_matches_brute_force(self):
+        rng = random.Random(7)
+        timers = [self.schedule(rng.randint(1, 150), name)
+                  for name in range(300)]
+        for second in range(1, 260):
+            if second < 150:
+                for timer in rng.sample(timers, 3):
+                    if timer.active():
+                        timer.reset(rng.randint(1, 100))
+            self.fired[:] = []
+            self.advance_to(1000.0 + second)
+            for name in self.fired:
+                self.assertEqual(timers[name].getTime(), 1000.0 + second)
+            self.assertEqual(len(self.wheel),
+                             sum(1 for timer in timers if timer.active()))
+        self.assertEqual(len(self.wheel), 0)
+
+    def test_cancel(self):
+        timer = self.schedule(3, "a")
+        timer.cancel()
+        self.assertFalse(timer.active())
+        self.advance_to(1010.0)
+        self.assertEqual(self.fired, [])
+        self.assertEqual(len(self.wheel), 0)
+        self.assertRaises(TimingWheelException, timer.cancel)
+
+    def test_delay_and_reset(self):
+        timer = self.schedule(3, "a")
+        timer.delay(10)
+        self.assertEqual(timer.getTime(), 1013.0)
+        self.advance_to(1005.0)
+        timer.reset(2)
+        self.assertEqual(timer.getTime(), 1007.0)
+        self.advance_to(1006.0)
+        self.assertEqual(self.fired, [])
+        self.advance_to(1007.0)
+        self.assertEqual(self.fired, ["a"])
+        self.assertFalse(timer.active())
+        self.assertRaises(TimingWheelException, timer.reset, 1)
+
+    def test_catches_up_missed_ticks(self):
+        self.schedule(2, "a")
+        self.schedule(9, "b")
+        self.assertEqual(self.advance_to(1020.0), 2)
+        self.assertEqual(self.fired, ["a", "b"])
+
+    def test_single_level_rejected(self):
+        self.assertRaises(TimingWheelException, TimingWheel, levels=1)
+
+    def test_long_clock_jump(self):
+        # spans 194 days, with a slot of the top level per 3 days
+        wheel = TimingWheel(resolution=1.0, clock=self.clock)
+        for seconds in (5, 3600, 86400 * 29, 86400 * 31):
+            wheel.call_later(seconds, self.fired.append, seconds)
+        self.clock.now += 86400 * 30
+        self.assertEqual(wheel.advance(), 3)
+        self.assertEqual(self.fired, [5, 3600, 86400 * 29])
+        self.clock.now += 86400 - 1
+        self.assertEqual(wheel.advance(), 0)
+        self.clock.now += 1
+        self.assertEqual(wheel.advance(), 1)
+
+    def test_failing_callback_does_not_stop_others(self):
+        self.wheel.call_later(1, Mock(side_effect=ValueError("boom")))
+        self.schedule(1, "a")
+        with patch('attributes.timing_wheel.logger') as logger:
+            self.advance_to(1001.0)
+        self.assertEqual(self.fired, ["a"])
+        self.assertTrue(logger.log_trace.called)
+
+
+class WheelDelayTestCase(TestCase):
+
+    def setUp(self):
+        self.clock = Clock()
+        self.wheel = TimingWheel(resolution=1.0, clock=self.clock)
+
+    def test_delay_on_wheel(self):
+        callback = Mock()
+        with patch('attributes.delay.time.time', self.clock):
+            delay = Delay(5, callback=callback, retval="done",
+                          wheel=self.wheel)
+            self.assertTrue(delay.is_active())
+            self.assertEqual(delay.retval, "done")
+            delay.delay_more(5)
+            self.assertEqual(delay.get_time_remaining(), 10)
+            delay.reset(2)
+            self.assertEqual(delay.get_time_remaining(), 2)
+        self.clock.now += 2
+        self.wheel.advance()
+        callback.assert_called_once_with("done")
+        self.assertFalse(delay.is_active())
@@ -0,0 +1,82 @@
+"""
+Unit test for write-behind persistence.
+"""
+from django.test import TestCase
+from mock import Mock, patch
+from attributes.attribute_handler import AttributeHandler
+from attributes.tests.test_row_store import FakeObject
+from attributes.tests.test_save_wrapper import RecordingAttrObj
+from attributes.write_behind import WRITE_BEHIND
+
+
+class BrokenAttrObj(object):
+    def _fail(self, new_val):
+        raise IOError("database went away")
+
+    value = property(lambda self: None, _fail)
+
+
+class WriteBehindTestCase(TestCase):
+
+    def setUp(self):
+        self.attrobj = RecordingAttrObj()
+        self.handler = AttributeHandler(self.attrobj)
+        WRITE_BEHIND.enabled = True
+
+    def tearDown(self):
+        WRITE_BEHIND.enabled = False
+        WRITE_BEHIND.flush()
+
+    def test_save_is_deferred(self):
+        self.handler.add(name="strength", base=10, min=0, max=100)
+        self.handler.strength.add_mod(desc="war cry", val=2, operator="+")
+        self.assertEqual(self.attrobj.writes, [])
+        self.assertEqual(WRITE_BEHIND.depth, 1)
+
+    def test_flush_writes_each_object_once(self):
+        other_attrobj = RecordingAttrObj()
+        other = AttributeHandler(other_attrobj)
+        self.handler.add(name="strength", base=10, min=0, max=100)
+        self.handler.add(name="agility", base=10, min=0, max=100)
+        other.add(name="strength", base=10, min=0, max=100)
+        self.assertEqual(WRITE_BEHIND.flush(), 2)
+        self.assertEqual(self.attrobj.writes, [self.handler])
+        self.assertEqual(other_attrobj.writes, [other])
+        self.assertEqual(WRITE_BEHIND.depth, 0)
+        self.assertEqual(WRITE_BEHIND.flush(), 0)
+
+    def test_metrics(self):
+        flushes = WRITE_BEHIND.flushes
+        self.handler.add(name="strength", base=10, min=0, max=100)
+        self.assertEqual(WRITE_BEHIND.metrics()['depth'], 1)
+        WRITE_BEHIND.flush()
+        metrics = WRITE_BEHIND.metrics()
+        self.assertEqual(metrics['depth'], 0)
+        self.assertEqual(metrics['flushes'], flushes + 1)
+        self.assertGreaterEqual(metrics['max_depth'], 1)
+        self.assertGreaterEqual(metrics['last_flush_latency'], 0)
+
+    def test_failed_flush_requeues(self):
+        broken = AttributeHandler(BrokenAttrObj())
+        broken.add(name="strength", base=10, min=0, max=100)
+        self.assertEqual(WRITE_BEHIND.flush(), 0)
+        self.assertEqual(WRITE_BEHIND.depth, 1)
+        WRITE_BEHIND._dirty.clear()
+
+    def test_rolled_back_flush_rewrites_every_object(self):
+        first, second = FakeObject(), FakeObject()
+        handlers = [AttributeHandler.load_rows(obj, "stats")
+                    for obj in (first, second)]
+        WRITE_BEHIND.flush()
+        for handler in handlers:
+            handler.add(name="strength", base=10, min=0, max=100)
+        second.attributes.add = Mock(side_effect=IOError("deadlock"))
+        with patch('attributes.write_behind.logger'):
+            self.assertEqual(WRITE_BEHIND.flush(), 0)
+        # the transaction rolled back the row written for the first handler
+        first.attributes.rows.clear()
+        first.attributes.writes = []
+        del second.attributes.add
+        self.assertEqual(WRITE_BEHIND.flush(), 2)
+        self.assertEqual(first.attributes.writes, ["strength"])
+        self.assertEqual(second.attributes.writes, ["strength"])
@@ -0,0 +1,103 @@
+"""
+ThresholdSet fires callbacks when a value crosses registered levels, such as
+health falling to 25% of its max, mana falling to 0 or fatigue rising to 80.
+
+Levels are kept sorted, so an update finds the levels crossed with a binary
+search and costs O(log k) in the number of levels, plus one call per crossed
+trigger. Levels are only fired when crossed, not on every update that leaves
+the value beyond them.
+
+A FALLING trigger fires when the value drops from above its level to or
+below it. A RISING trigger fires when the value climbs from below its level
+to or above it.
+"""
+from bisect import bisect_left, bisect_right
+from observer_constants import Crossing
+
+
+class ThresholdSet(object):
+    """
+    Properties:
+    subject (any) - object whose value is watched, passed to the callbacks
+    value (number) - value as of the last update
+    """
+    def __init__(self, subject, value):
+        self.subject = subject
+        self.value = value
+        self._levels = []
+        # level: [(callback, direction)]
+        self._triggers = {}
+
+    def add(self, level, callback, direction):
+        """Register a callback for a level.
+
+        Arguments:
+        level (number) - level to watch
+        callback (callable) - called with the subject, the level, the old
+                              value and the new value
+        direction (Crossing) - FALLING or RISING
+
+        Returns: None
+        """
+        if direction not in (Crossing.FALLING, Crossing.RISING):
+            raise ValueError("invalid crossing direction {}".format(direction))
+        triggers = self._triggers.get(level)
+        if triggers is None:
+            triggers = self._triggers[level] = []
+            self._levels.insert(bisect_left(self._levels, level), level)
+        triggers.append((callback, direction))
+
+    def remove(self, level, callback):
+        """Unregister every trigger of a callback on a level.
+
+        Arguments:
+        level (number) - watched level
+        callback (callable) - registered callback
+
+        Returns: None
+        """
+        triggers = [trigger for trigger in self._triggers.get(level, ())
+                    if trigger[0] != callback]
+        if len(triggers) == len(self._triggers.get(level, ())):
+            raise ValueError("{} has no threshold at {}".format(callback,
+                                                                level))
+        if triggers:
+            self._triggers[level] = triggers
+        else:
+            del self._triggers[level]
+            del self._levels[bisect_left(self._levels, level)]
+
+    def update(self, new_val):
+        """Record a new value, firing the triggers of every level crossed.
+
+        Arguments:
+        new_val (number) - new value
+
+        Returns: int - number of callbacks fired
+        """
+        old_val = self.value
+        self.value = new_val
+        if new_val == old_val or not self._levels:
+            return 0
+        levels = self._levels
+        if new_val < old_val:
+            # levels in [new_val, old_val), nearest first
+            crossed = reversed(levels[bisect_left(levels, new_val):
+                                      bisect_left(levels, old_val)])
+            direction = Crossing.FALLING
+        else:
+            # levels in (old_val, new_val], nearest first
+            crossed = levels[bisect_right(levels, old_val):
+                             bisect_right(levels, new_val)]
+            direction = Crossing.RISING
+        fired = 0
+        for level in list(crossed):
+            for callback, trigger_direction in list(self._triggers.get(level,
+                                                                       ())):
+                if trigger_direction == direction:
+                    fired += 1
+                    callback(self.subject, level, old_val, new_val)
+        return fired
+
+    def __len__(self):
+        return sum(len(triggers) for triggers in self._triggers.values())
@@ -0,0 +1,286 @@
+"""
+TimingWheel schedules callbacks on a hierarchical timing wheel, so a large
+number of Delays share a single reactor timer instead of each holding its own
+entry in the reactor's timer heap.
+
+Time is divided into ticks of a fixed resolution. Each level of the wheel is
+a ring of slots, and a slot of level n spans slots ** n ticks. A timer is
+placed in the lowest level whose range covers it, and moves down a level
+whenever the wheel reaches the slot it is in, until it fires from level 0.
+Inserting, cancelling and resetting a timer are O(1), and each tick fires
+every callback that became due. The wheel needs at least two levels, so timers
+beyond its range can be parked in the top level instead of firing early. When
+the clock jumps ahead by more than a ring of slots, e.g. after the process
+was suspended, the wheel skips straight to the next occupied slot rather than
+stepping through every tick.
+
+The wheel is advanced by a service started from
+server/conf/server_services_plugins.py, which ticks it once per resolution.
+
+Example:
+
+Delay(30, callback=cooldown_over, wheel=TIMING_WHEEL)
+"""
+import time
+from evennia.utils import logger
+
+
+class TimingWheelException(Exception):
+    def __init__(self, msg):
+        super(TimingWheelException, self).__init__(msg)
+        self.msg = msg
+
+
+class WheelTimer(object):
+    """
+    A scheduled callback, with the interface of a Twisted DelayedCall.
+
+    Properties:
+    func (callable) - callback to call when the timer fires
+    args (tuple) - positional arguments for the callback
+    kwargs (dict) - keyword arguments for the callback
+    time (float) - timestamp the timer fires at
+    """
+    __slots__ = ('func', 'args', 'kwargs', 'time', 'called', 'cancelled',
+                 '_wheel', '_slot')
+
+    def __init__(self, wheel, fire_at, func, args, kwargs):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.time = fire_at
+        self.called = False
+        self.cancelled = False
+        self._wheel = wheel
+        self._slot = None
+
+    def getTime(self):
+        """Get time in seconds from epoch of when the timer fires.
+
+        Arguments: None
+
+        Returns: float
+        """
+        return self.time
+
+    def active(self):
+        """Check if the timer is still waiting to fire.
+
+        Arguments: None
+
+        Returns: boolean
+        """
+        return not (self.called or self.cancelled)
+
+    def cancel(self):
+        """Stop the timer from firing.
+
+        Arguments: None
+
+        Returns: None
+        """
+        self._check_active()
+        self.cancelled = True
+        self._wheel._remove(self)
+
+    def delay(self, seconds):
+        """Fire the timer additional seconds later.
+
+        Arguments:
+        seconds (int or float) - additional delay
+
+        Returns: None
+        """
+        self._check_active()
+        self._wheel._move(self, self.time + seconds)
+
+    def reset(self, seconds):
+        """Fire the timer the given seconds from now.
+
+        Arguments:
+        seconds (int or float) - new delay
+
+        Returns: None
+        """
+        self._check_active()
+        self._wheel._move(self, self._wheel.clock() + seconds)
+
+    def _check_active(self):
+        if self.called:
+            raise TimingWheelException("timer was already called")
+        if self.cancelled:
+            raise TimingWheelException("timer was already cancelled")
+
+
+class TimingWheel(object):
+    """
+    Properties:
+    resolution (float) - seconds per tick
+    slots (int) - slots in each level
+    levels (int) - number of levels
+    clock (callable) - returns the current timestamp
+    fired (int) - number of callbacks fired
+    """
+    def __init__(self, resolution=0.1, slots=64, levels=4, clock=time.time):
+        if resolution <= 0 or slots < 2 or levels < 2:
+            raise TimingWheelException("invalid timing wheel dimensions")
+        self.resolution = resolution
+        self.slots = slots
+        self.levels = levels
+        self.clock = clock
+        self.fired = 0
+        self._wheels = [[set() for _ in range(slots)]
+                        for _ in range(levels)]
+        # ticks spanned by a slot of each level
+        self._spans = [slots ** level for level in range(levels + 1)]
+        self._tick = self._to_tick(clock())
+        self._count = 0
+
+    def call_later(self, seconds, func, *args, **kwargs):
+        """Schedule a callback.
+
+        Arguments:
+        seconds (int or float) - delay until the callback fires
+        func (callable) - callback to call
+        args, kwargs - arguments for the callback
+
+        Returns: WheelTimer
+        """
+        timer = WheelTimer(self, self.clock() + seconds, func, args, kwargs)
+        self._insert(timer)
+        self._count += 1
+        return timer
+
+    def advance(self, now=None):
+        """Fire every callback that became due, one tick at a time.
+
+        Arguments:
+        now (float) - current timestamp, defaults to the clock
+
+        Returns: int - number of callbacks fired
+        """
+        target = self._to_tick(self.clock() if now is None else now)
+        fired = 0
+        while self._tick < target:
+            if not self._count:
+                # nothing scheduled, skip straight to the target
+                self._tick = target
+                break
+            if target - self._tick > self.slots:
+                # a long gap, skip the ticks on which nothing happens
+                tick = self._next_occupied()
+                if tick > target:
+                    self._tick = target
+                    break
+                self._tick = tick
+            else:
+                self._tick += 1
+            self._cascade()
+            fired += self._fire()
+        return fired
+
+    def _next_occupied(self):
+        """Get the next tick that reaches a slot holding timers, in any
+        level.
+
+        Arguments: None
+
+        Returns: int
+        """
+        tick = self._tick
+        nearest = None
+        for level in range(self.levels):
+            span = self._spans[level]
+            block = tick // span
+            wheel = self._wheels[level]
+            for ahead in range(1, self.slots + 1):
+                reached = (block + ahead) * span
+                if nearest is not None and reached >= nearest:
+                    break
+                if wheel[(block + ahead) % self.slots]:
+                    nearest = reached
+                    break
+        return tick + 1 if nearest is None else nearest
+
+    def _to_tick(self, timestamp):
+        return int(timestamp // self.resolution)
+
+    def _insert(self, timer, earliest=None):
+        """Place a timer in the lowest level whose range covers it.
+
+        A timer that is already due fires on the next tick, unless an
+        earliest tick is given.
+        """
+        if earliest is None:
+            earliest = self._tick + 1
+        due = int(max(-(-timer.time // self.resolution), earliest))
+        delta = due - self._tick
+        level = 0
+        while level < self.levels - 1 and delta >= self._spans[level + 1]:
+            level += 1
+        span = self._spans[level]
+        if delta >= self._spans[level + 1]:
+            # beyond the range of the wheel, park it in the furthest slot of
+            # the top level, to be placed again when the wheel gets there
+            block = self._tick // span + self.slots - 1
+        else:
+            block = due // span
+        slot = self._wheels[level][block % self.slots]
+        slot.add(timer)
+        timer._slot = slot
+
+    def _remove(self, timer):
+        if timer._slot is not None:
+            timer._slot.discard(timer)
+            timer._slot = None
+            self._count -= 1
+
+    def _move(self, timer, fire_at):
+        if timer._slot is not None:
+            timer._slot.discard(timer)
+        timer.time = fire_at
+        self._insert(timer)
+
+    def _cascade(self):
+        """Move the timers of every higher level slot the wheel just reached
+        down to the levels below."""
+        top = 0
+        while top < self.levels - 1 and not self._tick % self._spans[top + 1]:
+            top += 1
+        # highest level first, so timers moved down land in slots that are
+        # yet to be reached
+        for level in range(top, 0, -1):
+            span = self._spans[level]
+            slot = self._wheels[level][(self._tick // span) % self.slots]
+            timers = list(slot)
+            slot.clear()
+            for timer in timers:
+                self._insert(timer, self._tick)
+
+    def _fire(self):
+        """Call every timer due on the current tick."""
+        slot = self._wheels[0][self._tick % self.slots]
+        if not slot:
+            return 0
+        timers = list(slot)
+        slot.clear()
+        for timer in timers:
+            timer._slot = None
+            timer.called = True
+            self._count -= 1
+        for timer in timers:
+            if timer.func is None:
+                continue
+            try:
+                timer.func(*timer.args, **timer.kwargs)
+            except Exception:
+                logger.log_trace("timing wheel callback {} "
+                                 "failed".format(timer.func))
+        self.fired += len(timers)
+        return len(timers)
+
+    def __len__(self):
+        return self._count
+
+
+TIMING_WHEEL = TimingWheel()
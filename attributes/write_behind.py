@@ -0,0 +1,160 @@
+"""
+Write-behind persistence for objects saved through save_wrapper.
+
+When enabled, save() no longer writes to the database immediately. The object
+is marked dirty instead, and every dirty object is written once per flush
+interval, in a single transaction, by a service started from
+server/conf/server_services_plugins.py. Anything still dirty is flushed in
+at_server_stop, so no changes are lost on reload or shutdown.
+
+Enable it in your settings file:
+
+NEXTRPI_WRITE_BEHIND = True
+NEXTRPI_WRITE_BEHIND_INTERVAL = 5  # seconds between flushes
+
+A crash between flushes loses at most one interval of changes.
+"""
+import time
+from collections import OrderedDict
+from django.db import transaction
+from evennia.utils import logger
+
+
+def write(obj):
+    """Write an object to the database immediately.
+
+    Objects that define _persist() write themselves, anything else is stored
+    whole in its Evennia Attribute.
+
+    Arguments:
+    obj (any) - object with an 'attrobj' member variable or a _persist method
+
+    Returns: None
+    """
+    persist = getattr(obj, '_persist', None)
+    if persist is not None:
+        persist()
+    else:
+        obj.attrobj.value = obj
+
+
+def write_all(objs):
+    """Write objects to the database in a single transaction.
+
+    Objects that only write what changed since their last write, such as
+    AttributeHandlers stored in rows, forget those changes as they write. If
+    the transaction fails, every object is given its changes back, since the
+    rollback undid the writes of those that succeeded too.
+
+    Arguments:
+    objs (iterable) - objects with an 'attrobj' member variable or a _persist
+                      method
+
+    Returns: None
+    """
+    pending = []
+    try:
+        with transaction.atomic():
+            for obj in objs:
+                unwritten = getattr(obj, '_unwritten', None)
+                if unwritten is not None:
+                    pending.append((obj, unwritten()))
+                write(obj)
+    except Exception:
+        for obj, changes in pending:
+            obj._requeue(changes)
+        raise
+
+
+class WriteBehindQueue(object):
+    """
+    Properties:
+    enabled (boolean) - if saves are deferred to the next flush
+    flushes (int) - number of flushes that wrote anything
+    writes (int) - number of objects written by all flushes
+    last_flush_latency (float) - seconds the last flush took
+    max_flush_latency (float) - seconds the slowest flush took
+    max_depth (int) - most objects ever waiting for a flush
+    """
+    def __init__(self):
+        self.enabled = False
+        self._dirty = OrderedDict()
+        self.flushes = 0
+        self.writes = 0
+        self.last_flush_latency = 0.0
+        self.max_flush_latency = 0.0
+        self.max_depth = 0
+
+    @property
+    def depth(self):
+        return len(self._dirty)
+
+    def mark(self, obj):
+        """Mark an object to be written on the next flush.
+
+        Arguments:
+        obj (any) - object with an 'attrobj' member variable
+
+        Returns: None
+        """
+        self._dirty[id(obj)] = obj
+        if len(self._dirty) > self.max_depth:
+            self.max_depth = len(self._dirty)
+
+    def discard(self, objs):
+        """Forget objects that were written outside of a flush.
+
+        Arguments:
+        objs (iterable) - written objects
+
+        Returns: None
+        """
+        for obj in objs:
+            self._dirty.pop(id(obj), None)
+
+    def flush(self):
+        """Write every dirty object in a single transaction.
+
+        If the transaction fails, the objects stay queued for the next flush.
+
+        Arguments: None
+
+        Returns: int - number of objects written
+        """
+        if not self._dirty:
+            return 0
+        pending, self._dirty = self._dirty, OrderedDict()
+        start = time.time()
+        try:
+            write_all(pending.values())
+        except Exception:
+            logger.log_trace("write-behind flush of {} objects "
+                             "failed".format(len(pending)))
+            pending.update(self._dirty)
+            self._dirty = pending
+            return 0
+        latency = time.time() - start
+        self.flushes += 1
+        self.writes += len(pending)
+        self.last_flush_latency = latency
+        self.max_flush_latency = max(self.max_flush_latency, latency)
+        return len(pending)
+
+    def metrics(self):
+        """Get the queue metrics.
+
+        Arguments: None
+
+        Returns: dict
+        """
+        return {
+                "depth": self.depth,
+                "max_depth": self.max_depth,
+                "flushes": self.flushes,
+                "writes": self.writes,
+                "last_flush_latency": self.last_flush_latency,
+                "max_flush_latency": self.max_flush_latency
+        }
+
+
+WRITE_BEHIND = WriteBehindQueue()
@@ -5,8 +5,10 @@ Commands describe the input the player can do to the game.
 
 """
 
+import time
 from evennia import Command as BaseCommand
-# from evennia import default_cmds
+from evennia import default_cmds
+from attributes.resource_handler import ResourceHandler
 
 
 class Command(BaseCommand):
@@ -182,3 +184,98 @@ class Command(BaseCommand):
 #            else:
 #                self.character = None
 #
+
+
+class CmdResourceLog(default_cmds.MuxCommand):
+    """
+    inspect the resource event log of a character
+
+    Usage:
+      @resourcelog <character>[/<handler>]
+      @resourcelog/sum <character>[/<handler>]
+      @resourcelog/rate <character>[/<handler>] = <seconds>
+      @resourcelog/on <character>[/<handler>] [= <capacity>]
+      @resourcelog/off <character>[/<handler>]
+
+    Switches:
+      sum - total change of each resource by the source that caused it
+      rate - change of each resource per second over the last <seconds>
+      on - start logging changes, keeping at most <capacity> events
+      off - stop logging changes and forget the log
+
+    Without a switch, every event in the log is listed, oldest first. The
+    handler defaults to 'resources'.
+    """
+    key = "@resourcelog"
+    locks = "cmd:perm(Wizards)"
+    help_category = "Admin"
+
+    def func(self):
+        caller = self.caller
+        if not self.lhs:
+            caller.msg("Usage: @resourcelog[/switches] "
+                       "<character>[/<handler>]")
+            return
+        name, _, handler_name = self.lhs.partition("/")
+        target = caller.search(name.strip(), global_search=True)
+        if not target:
+            return
+        handler_name = handler_name.strip() or "resources"
+        handler = getattr(target, handler_name, None)
+        if not isinstance(handler, ResourceHandler):
+            caller.msg("{} has no resource handler {}.".format(target.key,
+                                                               handler_name))
+            return
+
+        if "on" in self.switches:
+            try:
+                capacity = int(self.rhs) if self.rhs else 256
+                handler.enable_event_log(capacity)
+            except ValueError:
+                caller.msg("Capacity must be a positive number.")
+                return
+            caller.msg("Logging up to {} resource events for {}.".format(
+                       capacity, target.key))
+            return
+        if "off" in self.switches:
+            handler.disable_event_log()
+            caller.msg("Stopped logging resource events for {}.".format(
+                       target.key))
+            return
+
+        event_log = handler.event_log
+        if event_log is None:
+            caller.msg("{} has no resource event log, enable it with "
+                       "@resourcelog/on.".format(target.key))
+            return
+        now = time.time()
+        if "sum" in self.switches:
+            lines = []
+            for resource in sorted(set(event[1] for event in
+                                       event_log.events())):
+                totals = event_log.sum_by_source(resource=resource)
+                for source in sorted(totals, key=lambda dbref: dbref or 0):
+                    lines.append("{:<16} {:<10} {:+g}".format(
+                        resource, "#{}".format(source) if source else "-",
+                        totals[source]))
+        elif "rate" in self.switches:
+            try:
+                window = float(self.rhs)
+                if window <= 0:
+                    raise ValueError
+            except (TypeError, ValueError):
+                caller.msg("Usage: @resourcelog/rate <character> = <seconds>")
+                return
+            lines = ["{:<16} {:+.2f}/s".format(resource, event_log.rate(
+                         window, now, resource=resource))
+                     for resource in sorted(set(event[1] for event in
+                                                event_log.events()))]
+        else:
+            lines = ["{:>8.1f}s ago {:<16} {:+g} {}".format(
+                         now - timestamp, resource, delta,
+                         "#{}".format(source) if source else "")
+                     for timestamp, resource, delta, source in
+                     event_log.events()]
+        caller.msg("Resource events of {} ({} of {} kept):\n{}".format(
+                   target.key, len(event_log), event_log.recorded,
+                   "\n".join(lines) or "none"))
@@ -15,6 +15,7 @@ own cmdsets by inheriting from them or directly from `evennia.CmdSet`.
 """
 
 from evennia import default_cmds
+from commands.command import CmdResourceLog
 
 class CharacterCmdSet(default_cmds.CharacterCmdSet):
     """
@@ -32,6 +33,7 @@ class CharacterCmdSet(default_cmds.CharacterCmdSet):
         #
         # any commands you add below will overload the default ones.
         #
+        self.add(CmdResourceLog())
 
 
 class PlayerCmdSet(default_cmds.PlayerCmdSet):
@@ -15,6 +15,21 @@ at_server_cold_start()
 at_server_cold_stop()
 
 """
+from django.conf import settings
+from evennia.objects.models import ObjectDB
+from evennia.scripts.models import ScriptDB
+from evennia.typeclasses.attributes import Attribute
+from attributes.delay_handler import rehydrate_delays
+from attributes.modifier_index import MODIFIER_INDEX
+from attributes.write_behind import WRITE_BEHIND
+
+
+def source_exists(dbref, typeclass):
+    """
+    Check if the source of a modifier still exists in the database.
+    """
+    model = ScriptDB if typeclass == "Script" else ObjectDB
+    return model.objects.filter(id=dbref).exists()
 
 
 def at_server_start():
@@ -22,7 +37,12 @@ def at_server_start():
     This is called every time the server starts up, regardless of
     how it was shut down.
     """
-    pass
+    MODIFIER_INDEX.source_exists = source_exists
+    # every character's delays, in one query
+    key = getattr(settings, "NEXTRPI_DELAY_ATTRIBUTE", "delays")
+    rehydrate_delays(Attribute.objects.filter(db_key=key),
+                     getattr(settings, "NEXTRPI_DELAY_CATCH_UP_BATCH", 50),
+                     getattr(settings, "NEXTRPI_DELAY_CATCH_UP_INTERVAL", 1))
 
 
 def at_server_stop():
@@ -30,7 +50,7 @@ def at_server_stop():
     This is called just before the server is shut down, regardless
     of it is for a reload, reset or shutdown.
     """
-    pass
+    WRITE_BEHIND.flush()
 
 
 def at_server_reload_start():
@@ -13,6 +13,12 @@ can be added to it). The function should not return anything. Plugin
 services are started last in the Server startup process.
 
 """
+from django.conf import settings
+from twisted.application.internet import TimerService
+from attributes.modifier_expiry import MODIFIER_EXPIRY
+from attributes.regen import REGEN
+from attributes.timing_wheel import TIMING_WHEEL
+from attributes.write_behind import WRITE_BEHIND
 
 
 def start_plugin_services(server):
@@ -21,4 +27,23 @@ def start_plugin_services(server):
 
     server - a reference to the main server application.
     """
-    pass
+    if getattr(settings, "NEXTRPI_WRITE_BEHIND", False):
+        WRITE_BEHIND.enabled = True
+        interval = getattr(settings, "NEXTRPI_WRITE_BEHIND_INTERVAL", 5)
+        flusher = TimerService(interval, WRITE_BEHIND.flush)
+        flusher.setName("nextrpi_write_behind")
+        flusher.setServiceParent(server.services)
+
+    interval = getattr(settings, "NEXTRPI_MODIFIER_SWEEP_INTERVAL", 1)
+    sweeper = TimerService(interval, MODIFIER_EXPIRY.sweep)
+    sweeper.setName("nextrpi_modifier_expiry")
+    sweeper.setServiceParent(server.services)
+
+    interval = getattr(settings, "NEXTRPI_REGEN_INTERVAL", 1)
+    ticker = TimerService(interval, REGEN.tick)
+    ticker.setName("nextrpi_regen")
+    ticker.setServiceParent(server.services)
+
+    wheel = TimerService(TIMING_WHEEL.resolution, TIMING_WHEEL.advance)
+    wheel.setName("nextrpi_timing_wheel")
+    wheel.setServiceParent(server.services)
@@ -7,7 +7,10 @@ is setup to be the "default" character type created by the default
 creation commands.
 
 """
+from django.conf import settings
 from evennia import DefaultCharacter
+from attributes.delay_handler import DelayHandler
+from attributes.modifier_index import MODIFIER_INDEX
 
 class Character(DefaultCharacter):
     """
@@ -29,4 +32,13 @@ class Character(DefaultCharacter):
     at_post_puppet - Echoes "PlayerName has entered the game" to the room.
 
     """
-    pass
+    def at_object_delete(self):
+        """
+        Remove every modifier this object applied, and cancel its delays,
+        before it is deleted.
+        """
+        MODIFIER_INDEX.purge(self.id)
+        DelayHandler.unload(self.attributes.get(
+            getattr(settings, "NEXTRPI_DELAY_ATTRIBUTE", "delays"),
+            return_obj=True))
+        return super(Character, self).at_object_delete()
@@ -10,7 +10,10 @@ the other types, you can do so by adding this as a multiple
 inheritance.
 
 """
+from django.conf import settings
 from evennia import DefaultObject
+from attributes.delay_handler import DelayHandler
+from attributes.modifier_index import MODIFIER_INDEX
 
 class Object(DefaultObject):
     """
@@ -159,4 +162,13 @@ class Object(DefaultObject):
                                  object speaks
 
      """
-    pass
+    def at_object_delete(self):
+        """
+        Remove every modifier this object applied, and cancel its delays,
+        before it is deleted.
+        """
+        MODIFIER_INDEX.purge(self.id)
+        DelayHandler.unload(self.attributes.get(
+            getattr(settings, "NEXTRPI_DELAY_ATTRIBUTE", "delays"),
+            return_obj=True))
+        return super(Object, self).at_object_delete()
@@ -13,6 +13,7 @@ just overloads its hooks to have it perform its function.
 """
 
 from evennia import DefaultScript
+from attributes.modifier_index import MODIFIER_INDEX
 
 
 class Script(DefaultScript):
@@ -88,4 +89,10 @@ class Script(DefaultScript):
       at_server_shutdown() - called at a full server shutdown.
 
     """
-    pass
+    def delete(self):
+        """
+        Remove every modifier this script applied before it is deleted.
+        Stopping the script, e.g. to restart it, keeps them.
+        """
+        MODIFIER_INDEX.purge(self.id, typeclass="Script")
+        return super(Script, self).delete()
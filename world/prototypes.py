@@ -34,6 +34,31 @@ Possible keywords are:
 
 See the `@spawn` command and `evennia.utils.spawner` for more info.
 
+Stat blocks shared by many spawned NPCs should not be prototype Attributes,
+since the spawner copies those onto every NPC. Register them once as an
+attribute template instead, and store only the template key on the NPC. Its
+AttributeHandler then reads from the shared template and stores only the
+stats that change, see `attributes.attribute_template`.
+
+    from attributes.attribute_template import register_template
+
+    register_template("GOBLIN", [
+        {"name": "strength", "base": 8, "min": 0, "max": 20},
+        {"name": "agility", "base": 12, "min": 0, "max": 20}
+    ])
+
+    GOBLIN = {
+     "key": "goblin grunt",
+     "stat_template": "GOBLIN"
+     }
+
+and in the NPC typeclass:
+
+    @lazy_property
+    def stats(self):
+        return AttributeHandler.load_rows(self, "stats",
+                                          template=self.db.stat_template)
+
 """
 
 #from random import randint